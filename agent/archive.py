@@ -0,0 +1,211 @@
+import asyncio
+import fnmatch
+import hashlib
+import io
+import os
+import pathlib
+import queue
+import tarfile
+import threading
+import uuid
+import zipfile
+from typing import AsyncIterator, Optional
+
+from agent.manifest import project_manifest
+from agent.storage import data_path
+
+ARCHIVE_FORMATS = {"zip": "application/zip", "tar.gz": "application/gzip"}
+ARCHIVE_CACHE_DIR = pathlib.Path(os.environ.get("ARCHIVE_CACHE_DIR") or data_path("archives"))
+# Least recently used archives are evicted once the cache grows past this size
+ARCHIVE_CACHE_MAX_BYTES = int(os.environ.get("ARCHIVE_CACHE_MAX_MB", "512")) * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Chunks buffered between the archive writer and the client; bounds memory per download
+MAX_PENDING_CHUNKS = 16
+_DONE = object()
+
+
+class ArchiveAborted(Exception):
+    """Raised inside the writer thread when the client stopped reading."""
+
+
+def _put(chunks: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocks until the reader takes `item`; returns False once the reader has gone away."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def select_files(entries: list[dict], include: Optional[list[str]] = None,
+                 exclude: Optional[list[str]] = None) -> list[dict]:
+    """Applies glob export filters to manifest entries; hidden files are never exported."""
+    selected = []
+    for entry in entries:
+        path = entry["path"]
+        if any(part.startswith(".") for part in path.split("/")):
+            continue
+        if include and not any(fnmatch.fnmatch(path, pattern) for pattern in include):
+            continue
+        if exclude and any(fnmatch.fnmatch(path, pattern) for pattern in exclude):
+            continue
+        selected.append(entry)
+    return selected
+
+
+def archive_key(etag: str, fmt: str, files: list[dict]) -> str:
+    """Cache key for one export: the manifest etag, then a digest of the exact files selected."""
+    digest = hashlib.sha256(fmt.encode("utf-8"))
+    for entry in files:
+        digest.update(f"\n{entry['path']}:{entry['hash']}".encode("utf-8"))
+    return f"{etag[:16]}-{digest.hexdigest()[:16]}"
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that hands fixed-size chunks to the streaming side and tees them to the cache file."""
+
+    def __init__(self, chunks: queue.Queue, cache_file, stop: threading.Event):
+        self.chunks = chunks
+        self.cache_file = cache_file
+        self.stop = stop
+        self.position = 0
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        size = len(data)
+        self._buffer += data
+        self.position += size
+        if len(self._buffer) >= CHUNK_SIZE:
+            self._emit()
+        return size
+
+    def _emit(self):
+        if not self._buffer:
+            return
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        self.cache_file.write(chunk)
+        if not _put(self.chunks, chunk, self.stop):
+            raise ArchiveAborted()
+
+    def flush(self):
+        self._emit()
+
+    def close(self):
+        self._buffer.clear()  # Unsent data is discarded; only an explicit flush emits it
+        super().close()
+
+
+def write_archive(root: pathlib.Path, files: list[dict], fmt: str, prefix: str, out):
+    """Writes `files` under the `prefix/` folder as a zip or gzipped tar to an unseekable stream."""
+    if fmt == "zip":
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for entry in files:
+                zf.write(root / entry["path"], f"{prefix}/{entry['path']}")
+    else:
+        with tarfile.open(fileobj=out, mode="w|gz") as tar:
+            for entry in files:
+                tar.add(root / entry["path"], f"{prefix}/{entry['path']}", recursive=False)
+    out.flush()
+
+
+def _evict(keep: pathlib.Path):
+    """Drops archives of older versions of the same project, then the least recently used until the cache fits."""
+    project, etag, _ = keep.name.rsplit("-", 2)
+    archives = []
+    for path in ARCHIVE_CACHE_DIR.iterdir():
+        if path == keep or path.suffix == ".tmp":
+            continue
+        parts = path.name.rsplit("-", 2)
+        if len(parts) == 3 and parts[0] == project and parts[1] != etag:
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        archives.append((stat.st_mtime, stat.st_size, path))
+    total = keep.stat().st_size + sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total <= ARCHIVE_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+class ProjectArchive:
+    """One export of a project: the selected files, and where the finished archive is cached."""
+
+    def __init__(self, root: pathlib.Path, fmt: str = "zip", include: Optional[list[str]] = None,
+                 exclude: Optional[list[str]] = None):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"format must be one of {tuple(ARCHIVE_FORMATS)}, got '{fmt}'")
+        manifest = project_manifest(root)
+        manifest.reload_if_changed()
+        self.root = pathlib.Path(root)
+        self.fmt = fmt
+        self.files = select_files(manifest.entries(), include, exclude)
+        self.key = archive_key(manifest.etag, fmt, self.files)
+        self.filename = f"{self.root.name}.{fmt}"
+        self.media_type = ARCHIVE_FORMATS[fmt]
+        self.cache_path = ARCHIVE_CACHE_DIR / f"{self.root.name}-{self.key}.{fmt}"
+
+    def cached(self) -> Optional[pathlib.Path]:
+        """The finished archive from an earlier download of the same files, if still cached."""
+        try:
+            os.utime(self.cache_path)  # mtime doubles as last use for eviction
+        except OSError:
+            return None
+        return self.cache_path
+
+    def _build(self, chunks: queue.Queue, stop: threading.Event):
+        ARCHIVE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_name(f"{self.cache_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(tmp, "wb") as cache_file:
+                write_archive(self.root, self.files, self.fmt, self.root.name, _ChunkWriter(chunks, cache_file, stop))
+            os.replace(tmp, self.cache_path)
+            _evict(self.cache_path)
+        except BaseException as e:
+            tmp.unlink(missing_ok=True)
+            if isinstance(e, ArchiveAborted):
+                try:
+                    chunks.put_nowait(e)  # Releases a reader thread still blocked on get()
+                except queue.Full:
+                    pass
+            else:
+                _put(chunks, e, stop)
+            return
+        _put(chunks, _DONE, stop)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yields the archive while it is built, caching it on disk once complete.
+
+        A writer thread compresses into a bounded queue, so memory stays constant whatever the
+        project size; if the client goes away the partial archive is discarded.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        stop = threading.Event()
+        writer = threading.Thread(target=self._build, args=(chunks, stop), daemon=True)
+        writer.start()
+        try:
+            while True:
+                item = await asyncio.to_thread(chunks.get)
+                if item is _DONE:
+                    print(f"--- ARCHIVE: cached {self.cache_path.name} ({len(self.files)} files) ---")
+                    return
+                if isinstance(item, BaseException):
+                    if isinstance(item, ArchiveAborted):
+                        return
+                    raise item
+                yield item
+        finally:
+            stop.set()
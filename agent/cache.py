@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from agent.storage import data_path
+
+CACHE_MODES = ("off", "on", "replay")
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no stored response."""
+
+
+class LLMCache:
+    """Content-addressed SQLite store of LLM responses keyed on model name and rendered prompt."""
+
+    def __init__(self, path: str, mode: str = "on", ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 1000):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"LLM cache mode must be one of {CACHE_MODES}, got '{mode}'")
+        self.path = str(path)
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+                CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """)
+        return self._conn
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _bump(self, conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO stats(name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """Returns the stored response, or None when missing or expired."""
+        if not self.enabled:
+            return None
+        key = self.key(model, prompt)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            # Replay runs must be reproducible, so stored entries never expire for them
+            if row and not self.replay_only and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits" if row else "misses")
+            conn.commit()
+        return row[0] if row else None
+
+    def delete(self, model: str, prompt: str):
+        """Drops a stored response, e.g. one that turned out not to parse."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses WHERE key = ?", (self.key(model, prompt),))
+            conn.commit()
+
+    def put(self, model: str, prompt: str, response: str):
+        if not self.enabled or self.replay_only:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses(key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.key(model, prompt), model, response, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._bump(conn, "writes")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "writes": counters.get("writes", 0),
+            "hit_rate": round(counters.get("hits", 0) / lookups, 4) if lookups else 0.0,
+        }
+
+
+llm_cache = LLMCache(
+    os.environ.get("LLM_CACHE_PATH") or data_path("llm_cache.sqlite3"),
+    mode=os.environ.get("LLM_CACHE_MODE", "on"),
+    ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1000)),
+)
+
+
+if __name__ == "__main__":
+    print(json.dumps(llm_cache.stats(), indent=2))
@@ -0,0 +1,84 @@
+import math
+import os
+import pathlib
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from agent.manifest import project_manifest
+from agent.overlay import workspace_overlay
+from agent.ratelimit import CHARS_PER_TOKEN, count_tokens
+from agent.symbols import symbol_index
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CODER_CONTEXT_TOKENS", "3000"))
+
+
+class PackedContext(BaseModel):
+    text: str = Field(description="The context block to append to the coder prompt")
+    tokens: int = Field(description="Estimated tokens in the packed context")
+    baseline_tokens: int = Field(description="Estimated tokens of reading every project file in full")
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.baseline_tokens - self.tokens)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keeps the head of a text within a token budget, noting how many lines were cut."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    head = text[:max(0, max_tokens * CHARS_PER_TOKEN)]
+    head = head[:head.rfind("\n")] if "\n" in head else head
+    omitted = text.count("\n") - head.count("\n")
+    return f"{head}\n... [truncated {omitted} more lines]"
+
+
+def pack_context(root: str, target: str, dependencies: list[str], budget: int = CONTEXT_TOKEN_BUDGET,
+                 run_id: Optional[str] = None) -> PackedContext:
+    """Packs the most relevant project context for one coder step into a token budget.
+
+    In priority order: symbol outlines of the other files, the target file's current content,
+    excerpts of the files the step depends on, and the names of the remaining files. Lower
+    priority sections are truncated or dropped once the budget is spent. Files are listed and
+    read through the run's workspace overlay, so the project is never walked.
+    """
+    root_path = pathlib.Path(root)
+    overlay = workspace_overlay(root_path)
+    relative = overlay.paths(run_id)
+    sizes = {entry["path"]: entry["size"] for entry in project_manifest(root_path).entries()}
+    baseline = sum(
+        math.ceil(sizes[path] / CHARS_PER_TOKEN) if path in sizes else count_tokens(overlay.read(path, run_id) or "")
+        for path in relative
+    )
+
+    sections = []
+    remaining = budget
+
+    def add(section: str):
+        nonlocal remaining
+        sections.append(section)
+        remaining -= count_tokens(section)
+
+    outlines = symbol_index(root_path).context_block(target)
+    if outlines:
+        add(truncate_to_tokens(outlines, remaining))
+
+    content = overlay.read(target, run_id) if remaining > 0 else None
+    if content is not None:
+        add(f"\n\n[CURRENT CONTENT OF {target}]\n" + truncate_to_tokens(content, remaining // 2))
+
+    for dep in dependencies:
+        if remaining <= 0 or dep == target:
+            continue
+        dep_content = overlay.read(dep, run_id)
+        if dep_content is None:
+            continue
+        excerpt = truncate_to_tokens(dep_content, remaining // 2)
+        add(f"\n\n[EXCERPT OF {dep}]\n{excerpt}")
+
+    others = [path for path in relative if path != target]
+    if remaining > 0 and others:
+        add("\n\n[PROJECT FILES]\n" + truncate_to_tokens("\n".join(others), remaining))
+
+    text = "".join(sections)
+    return PackedContext(text=text, tokens=count_tokens(text), baseline_tokens=baseline)
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from typing import Callable, Optional
+
+# Files larger than this are announced without their content; clients fetch them by hash
+LIVE_CONTENT_MAX_BYTES = 256 * 1024
+
+
+class RunEventBus:
+    """Fans out the live events of one run (such as file writes) to its subscribers.
+
+    Events may be published from any thread, including the worker threads LangChain runs
+    sync tools in; each callback is invoked on the event loop it subscribed from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: list[tuple[asyncio.AbstractEventLoop, Callable[[Optional[dict]], None]]] = []
+
+    def subscribe(self, callback: Callable[[Optional[dict]], None]) -> Callable[[], None]:
+        """Registers `callback` for every event and `None` once the run ends; returns an unsubscribe function."""
+        entry = (asyncio.get_running_loop(), callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, event: Optional[dict]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, callback in subscribers:
+            try:
+                loop.call_soon_threadsafe(callback, event)
+            except RuntimeError:
+                pass  # The subscriber's loop has shut down
+
+
+_buses: dict[str, RunEventBus] = {}
+_buses_lock = threading.Lock()
+
+
+def open_run_events(run_id: str) -> RunEventBus:
+    """Returns the event bus for a run, creating it when the run starts being streamed."""
+    with _buses_lock:
+        return _buses.setdefault(run_id, RunEventBus())
+
+
+def get_run_events(run_id: Optional[str]) -> Optional[RunEventBus]:
+    """The bus of a run that is being streamed, or None when nobody is listening."""
+    if not run_id:
+        return None
+    with _buses_lock:
+        return _buses.get(run_id)
+
+
+def close_run_events(run_id: str):
+    """Tells the subscribers the run has ended and drops its bus."""
+    with _buses_lock:
+        bus = _buses.pop(run_id, None)
+    if bus is not None:
+        bus.publish(None)
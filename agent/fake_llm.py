@@ -0,0 +1,195 @@
+import asyncio
+import json
+import math
+import re
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+FILE_TEMPLATES = {
+    ".html": """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{name}</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+    <main class="app-container">
+        <h1 id="appTitle" class="app-title">{name}</h1>
+        <button id="actionBtn" class="btn btn-primary">Start</button>
+        <ul id="itemList" class="item-list"></ul>
+    </main>
+    <script src="app.js"></script>
+</body>
+</html>
+""",
+    ".css": """:root {{ --accent: #6366f1; }}
+body {{ font-family: Inter, sans-serif; margin: 0; }}
+.app-container {{ max-width: 40rem; margin: 2rem auto; }}
+.app-title {{ font-size: 2rem; }}
+.btn {{ border-radius: 0.5rem; padding: 0.5rem 1rem; }}
+.btn-primary {{ background: var(--accent); color: #fff; }}
+.item-list {{ list-style: none; padding: 0; }}
+.item-list .item.done {{ opacity: 0.5; }}
+""",
+    ".js": """document.addEventListener('DOMContentLoaded', () => {{
+    const list = document.getElementById('itemList');
+    const button = document.getElementById('actionBtn');
+
+    function addItem(text) {{
+        const item = document.createElement('li');
+        item.className = 'item';
+        item.textContent = text;
+        item.addEventListener('click', () => item.classList.toggle('done'));
+        list.appendChild(item);
+    }}
+
+    button.addEventListener('click', () => addItem('{name} item ' + (list.children.length + 1)));
+}});
+""",
+    ".md": """# {name}
+
+Generated offline by the fake LLM.
+
+## Usage
+Open `index.html` in a browser.
+""",
+}
+
+
+def _last_text(messages: list[BaseMessage]) -> str:
+    content = messages[-1].content
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline stand-in for the Groq chat model.
+
+    Answers the planner, change planner and architect prompts with canned JSON and drives the
+    ReAct coder through one write_file call per step, so the whole graph runs without network access.
+    `latency` adds a fixed delay per call and `chunk_size` controls how responses stream.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.0
+    chunk_size: int = 64
+    files: list[str] = ["index.html", "style.css", "app.js", "README.md"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _plan(self, request: str) -> dict:
+        words = re.findall(r"[A-Za-z]+", request)[:4] or ["Demo"]
+        name = " ".join(w.capitalize() for w in words)
+        return {
+            "name": name,
+            "description": f"Offline plan for: {request}",
+            "techstack": "HTML, CSS, JavaScript",
+            "features": ["Responsive layout", "Interactive list", "Persistent state"],
+            "files": [{"path": f, "purpose": f"{f} for {name}"} for f in self.files],
+        }
+
+    def _task_plan(self) -> dict:
+        html = [f for f in self.files if f.endswith(".html")]
+        steps = []
+        for f in self.files:
+            depends_on = html if f.endswith((".css", ".js")) else []
+            steps.append({"filepath": f, "task_description": f"Implement {f}", "depends_on": depends_on})
+        return {"implementation_steps": steps}
+
+    def _change_plan(self, prompt: str) -> dict:
+        """Edits the stylesheets when the project has any, otherwise the first file."""
+        files = re.findall(r"^- (\S+) \(", prompt, re.MULTILINE)
+        targets = [f for f in files if f.endswith(".css")] or files[:1]
+        request = prompt.rsplit("Request:", 1)[-1].strip()
+        return {
+            "techstack": "HTML, CSS, JavaScript",
+            "implementation_steps": [{"filepath": f, "task_description": request, "depends_on": []} for f in targets],
+        }
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        text = _last_text(messages)
+        if "You are PLANNER" in text:
+            request = text.rsplit("Request:", 1)[-1].strip()
+            content = "```json\n" + json.dumps(self._plan(request), indent=2) + "\n```"
+        elif "You are CHANGE PLANNER" in text:
+            content = json.dumps(self._change_plan(text), indent=2)
+        elif "You are ARCHITECT" in text:
+            content = json.dumps(self._task_plan(), indent=2)
+        elif messages[-1].type == "tool":
+            content = "Done."
+        else:
+            match = re.search(r"CURRENT FILE: (\S+)", text)
+            path = match.group(1) if match else "index.html"
+            suffix = "." + path.rsplit(".", 1)[-1] if "." in path else ""
+            template = FILE_TEMPLATES.get(suffix, "{name}\n")
+            return self._with_usage(messages, AIMessage(content="", tool_calls=[{
+                "name": "write_file",
+                "args": {"path": path, "content": template.format(name="Demo App")},
+                "id": f"call_{zlib.crc32(path.encode()):08x}",
+            }]))
+        return self._with_usage(messages, AIMessage(content=content))
+
+    def _with_usage(self, messages: list[BaseMessage], message: AIMessage) -> AIMessage:
+        prompt_tokens = sum(math.ceil(len(str(m.content)) / 4) for m in messages)
+        output = message.content or json.dumps([call["args"] for call in message.tool_calls])
+        completion_tokens = math.ceil(len(output) / 4)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return message
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls or not message.content:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content,
+                tool_call_chunks=[{"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                                  for i, c in enumerate(message.tool_calls)],
+                usage_metadata=message.usage_metadata,
+            ))
+            return
+        text = message.content
+        for start in range(0, len(text), self.chunk_size):
+            last = start + self.chunk_size >= len(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=text[start:start + self.chunk_size],
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        yield from self._chunks(self._respond(messages))
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages)):
+            yield chunk
+            await asyncio.sleep(0)
@@ -1,189 +1,650 @@
+import asyncio
 import json
 import os
 import pathlib
 import re
+import shutil
+from contextlib import asynccontextmanager
 from datetime import datetime
-from agent.tools import set_project_root
+from typing import AsyncIterator
 from dotenv import load_dotenv
 from langchain.globals import set_verbose, set_debug
-from langchain_groq.chat_models import ChatGroq
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.constants import END
 from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import create_react_agent
+from agent.cache import llm_cache, CacheMissError
+from agent.context import pack_context
+from agent.journal import STEP_JOURNAL, StepJournal
+from agent.json_stream import JSONStreamParser, ARRAY_ITEM
+from agent.manifest import project_manifest
+from agent.metrics import MetricsCallbackHandler, RunMetrics
+from agent.overlay import pinned_overlay
+from agent.project_index import PARTIAL_MARKER, project_index
 from agent.prompts import *
+from agent.routing import ROUTED_MODEL_KEY, router
+from agent.scheduler import MAX_CODER_CONCURRENCY, resolve_dependencies, ready_steps
+from agent.similarity import PLAN_REUSE_THRESHOLD, plan_hint, plan_index
 from agent.states import *
-from agent.tools import write_file, read_file, get_current_directory, list_files
+from agent.storage import data_path
+from agent.symbols import symbol_index
+from agent.tools import write_file, read_file, get_current_directory, list_files, project_config, safe_path_for_project
+from agent.validation import validate_project
 
 _ = load_dotenv()
 
-set_debug(True)
-set_verbose(True)
+# Full LangChain tracing to stdout is costly on every call, so it is opt-in
+if os.environ.get("LANGCHAIN_DEBUG", "").lower() in ("1", "true", "yes"):
+    set_debug(True)
+    set_verbose(True)
+
+# Targeted repair passes after the post-coding checks; 0 only reports the problems
+MAX_REPAIR_ROUNDS = int(os.environ.get("MAX_REPAIR_ROUNDS", "1"))
+
+
+class Completion:
+    """One streamed response of a route's model chain, served from the response cache when possible.
+
+    Nothing is stored while streaming: callers `save()` the response once it parsed and validated,
+    so a truncated or invalid answer is requested again on retry or resume instead of replayed.
+    Lookups use the route's primary model, so answers from a fallback model are never stored.
+    """
+
+    def __init__(self, prompt: str, route: str):
+        self.prompt = prompt
+        self.route = route
+        self.model_name = router.primary(route)
+        self.answered_by = None
+        self.cached = False
+        self._chunks: list[str] = []
+
+    async def stream(self) -> AsyncIterator[str]:
+        cached = await asyncio.to_thread(llm_cache.get, self.model_name, self.prompt)
+        if cached is not None:
+            self.cached = True
+            yield cached
+            return
+        if llm_cache.replay_only:
+            raise CacheMissError(f"No cached response for this prompt on {self.model_name} (LLM_CACHE_MODE=replay)")
+
+        async for chunk in router.model(self.route).astream(self.prompt):
+            self.answered_by = chunk.response_metadata.get(ROUTED_MODEL_KEY, self.answered_by)
+            self._chunks.append(chunk.content)
+            yield chunk.content
+
+    async def save(self):
+        """Stores a freshly streamed response after the caller has validated it."""
+        if self.answered_by not in (None, self.model_name):
+            print(f"--- CACHE: not storing the {self.route} answer of fallback model {self.answered_by} ---")
+            return
+        if not self.cached and self._chunks:
+            await asyncio.to_thread(llm_cache.put, self.model_name, self.prompt, "".join(self._chunks))
+
+    async def discard(self):
+        """Drops a cached response that failed validation, so the next attempt asks the model again."""
+        if self.cached:
+            await asyncio.to_thread(llm_cache.delete, self.model_name, self.prompt)
+
+
+def _claim_workspace(name: str) -> pathlib.Path:
+    """Creates a fresh timestamped project folder for the given project name."""
+    project_name = name.strip().replace(" ", "_")
+    project_name = re.sub(r'[^a-zA-Z0-9_]', '', project_name)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-model_name = os.environ.get("GROQ_MODEL_NAME", "openai/gpt-oss-120b")
-llm = ChatGroq(model=model_name)
+    # Concurrent runs of the same prompt can land on the same second, so claim the folder exclusively
+    pathlib.Path("projects").mkdir(exist_ok=True)
+    suffix = 1
+    while True:
+        folder_name = project_name if suffix == 1 else f"{project_name}_{suffix}"
+        project_path = pathlib.Path(f"projects/{folder_name}_{timestamp}")
+        try:
+            project_path.mkdir()
+            return project_path.resolve()
+        except FileExistsError:
+            suffix += 1
 
 
-def planner_agent(state: GraphState) -> dict:
+async def planner_agent(state: GraphState) -> dict:
     """Takes the user prompt and creates a high-level JSON plan."""
     user_prompt = state.user_prompt
     print(f"--- PLANNER: Processing '{user_prompt}' ---")
 
-    response = llm.invoke(planner_prompt(user_prompt))
-    response_text = response.content
-
+    match = await asyncio.to_thread(plan_index.best_match, user_prompt)
+    if match is not None and match.score >= PLAN_REUSE_THRESHOLD:
+        print(f"--- PLANNER: Reusing the plan of {match.folder} (similarity {match.score:.2f}) ---")
+        plan = Plan.model_validate(match.plan)
+        return {"plan": plan, "project_path": str(_claim_workspace(plan.name)), "plan_source": match.folder}
+    example = None
+    if match is not None:
+        print(f"--- PLANNER: Using {match.folder} as an example (similarity {match.score:.2f}) ---")
+        example = plan_hint(match.plan)
+
+    # The workspace is claimed as soon as the streamed plan reveals its name
+    parser = JSONStreamParser(watch=[("name",)])
+    project_path = None
+    completion = Completion(planner_prompt(user_prompt, example), "planner")
     try:
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-
-        plan_json = json.loads(response_text)
-        resp = Plan.model_validate(plan_json)
+        async for chunk in completion.stream():
+            for _, value in parser.feed(chunk):
+                if project_path is None and isinstance(value, str) and value.strip():
+                    project_path = _claim_workspace(value)
+
+        resp = Plan.model_validate(parser.result())
+    except (CacheMissError, asyncio.CancelledError):
+        if project_path is not None:
+            shutil.rmtree(project_path, ignore_errors=True)
+        raise
     except Exception as e:
+        if project_path is not None:
+            shutil.rmtree(project_path, ignore_errors=True)
+        await completion.discard()
         print(f"--- ERROR: Planner agent failed to parse JSON. ---")
-        print(f"Raw LLM Output:\n{response_text}")
+        print(f"Raw LLM Output:\n{parser.text}")
         print(f"Error: {e}")
         raise ValueError("Planner did not return valid JSON.")
+    await completion.save()
 
-    return {"plan": resp}
+    if project_path is None:
+        return {"plan": resp}
+    return {"plan": resp, "project_path": str(project_path)}
 
 
-def create_project_workspace(state: GraphState) -> dict:
-    """Creates the physical folder on disk for the project."""
-    project_name = state.plan.name.strip().replace(" ", "_")
-    project_name = re.sub(r'[^a-zA-Z0-9_]', '', project_name)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+def _run_id(config: RunnableConfig) -> str | None:
+    return (config or {}).get("configurable", {}).get("thread_id")
+
 
-    project_path_str = f"projects/{project_name}_{timestamp}"
-    project_path = pathlib.Path(project_path_str)
-    project_path.mkdir(parents=True, exist_ok=True)
+def create_project_workspace(state: GraphState, config: RunnableConfig) -> dict:
+    """Creates the physical folder on disk for the project, unless the planner already did."""
+    if state.project_path and pathlib.Path(state.project_path).is_dir():
+        project_path = pathlib.Path(state.project_path)
+    else:
+        project_path = _claim_workspace(state.plan.name)
 
-    set_project_root(str(project_path.resolve()))
+    project_index.record_workspace(str(project_path), state.plan.name, state.user_prompt, _run_id(config))
+    print(f"--- WORKSPACE: Created at {project_path} ---")
+    return {"project_path": str(project_path)}
 
-    print(f"--- WORKSPACE: Created at {project_path.resolve()} ---")
-    return {"project_path": str(project_path.resolve())}
+
+def _describe_files(root: pathlib.Path) -> str:
+    """One line per project file with its size and symbol outline, for the change planner."""
+    manifest = project_manifest(root)
+    manifest.reload_if_changed()
+    index = symbol_index(root)
+    lines = []
+    for entry in manifest.entries():
+        outline = index.outline(entry["path"])
+        line = f"- {entry['path']} ({entry['size']} bytes)"
+        lines.append(f"{line}: {outline.split(': ', 1)[1]}" if outline else line)
+    return "\n".join(lines) or "(no files)"
+
+
+async def change_planner_agent(state: GraphState, config: RunnableConfig) -> dict:
+    """Plans an edit of an existing project, selecting only the files the request affects.
+
+    Every other file is carried over untouched, without any LLM call.
+    """
+    root = pathlib.Path(state.project_path)
+    if not root.is_dir():
+        raise ValueError(f"Project folder not found: {state.project_path}")
+    print(f"--- CHANGE PLANNER: '{state.user_prompt}' on {root.name} ---")
+
+    meta = project_index.record_edit(str(root), state.user_prompt, _run_id(config))
+    files = await asyncio.to_thread(_describe_files, root)
+    baseline = await asyncio.to_thread(validate_project, str(root))
+    parser = JSONStreamParser()
+    completion = Completion(change_planner_prompt(state.user_prompt, files), "change_planner")
+    try:
+        async for chunk in completion.stream():
+            parser.feed(chunk)
+        change = ChangePlan.model_validate(parser.result())
+    except (CacheMissError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        await completion.discard()
+        print(f"--- ERROR: Change planner failed to parse JSON. ---")
+        print(f"Raw LLM Output:\n{parser.text}")
+        print(f"Error: {e}")
+        raise ValueError("Change planner did not return valid JSON.")
+    await completion.save()
+
+    steps = []
+    for step in change.implementation_steps:
+        try:
+            target = safe_path_for_project(root, step.filepath)
+        except ValueError:
+            print(f"--- CHANGE PLANNER: Skipping {step.filepath}, outside the project ---")
+            continue
+        if target.name.startswith(".") or any(s.filepath == step.filepath for s in steps):
+            continue
+        steps.append(ImplementationTask(
+            filepath=step.filepath,
+            task_description=edit_task(step.task_description, target.is_file()),
+            depends_on=step.depends_on,
+        ))
+    print(f"--- CHANGE PLANNER: Changing {len(steps)} file(s): {', '.join(s.filepath for s in steps) or 'none'} ---")
+
+    task_plan = TaskPlan(implementation_steps=steps)
+    plan = Plan(
+        name=meta.get("name") or root.name,
+        description=state.user_prompt,
+        techstack=change.techstack,
+        features=[],
+        files=[File(path=s.filepath, purpose=s.task_description) for s in steps],
+    )
+    return {
+        "plan": plan,
+        "task_plan": task_plan,
+        "coder_state": CoderState(task_plan=task_plan),
+        "validation_baseline": baseline,
+    }
 
 
-def architect_agent(state: GraphState) -> dict:
+class _PipelinedCoder:
+    """Starts each coder step as soon as its dependencies are done, up to MAX_CODER_CONCURRENCY at once.
+
+    The architect feeds it steps while it is still streaming the rest of the task list, and the
+    coder node uses it to finish whatever steps are left. Steps the run's journal already records
+    as done, from before an interruption, count as completed without running again.
+    """
+
+    def __init__(self, state: GraphState, run_id: str | None, journal: StepJournal | None = None,
+                 completed: list[int] = (), failed: list[int] = ()):
+        self.state = state
+        self.run_id = run_id
+        self.journal = journal
+        self.tasks: list[ImplementationTask] = []
+        self.running: dict[int, asyncio.Task] = {}
+        self.completed: list[int] = list(completed)
+        self.failed: list[int] = list(failed)
+        self.tokens_saved: dict[str, int] = {}
+        self.closed = False
+
+    def add(self, task: ImplementationTask):
+        self.tasks.append(task)
+        self._schedule()
+
+    def extend(self, tasks: list[ImplementationTask]):
+        """Adds a complete task list at once, so inferred dependencies see every step before any starts."""
+        self.tasks.extend(tasks)
+        self._schedule()
+
+    def _schedule(self):
+        capacity = MAX_CODER_CONCURRENCY - len(self.running)
+        if self.closed or capacity <= 0:
+            return
+        deps = resolve_dependencies(self.tasks)
+        while self.journal is not None:
+            ready = ready_steps(deps, self.completed, self.failed + list(self.running), capacity)
+            done_before = [idx for idx in ready if self.journal.is_done(self.tasks[idx])]
+            if not done_before:
+                break
+            for idx in done_before:
+                print(f"--- CODER: {self.tasks[idx].filepath} was finished before the run was interrupted ---")
+            self.completed.extend(done_before)
+        for idx in ready_steps(deps, self.completed, self.failed + list(self.running), capacity):
+            print(f"--- CODER: Starting {self.tasks[idx].filepath} ({len(self.completed) + len(self.running) + 1}/{len(self.tasks)}) ---")
+            dependencies = [self.tasks[dep].filepath for dep in deps[idx]]
+            task = asyncio.create_task(
+                _run_coder_step(self.state, self.tasks[idx], dependencies, self.run_id, self.journal)
+            )
+            task.add_done_callback(lambda t, idx=idx: self._finished(idx, t))
+            self.running[idx] = task
+
+    def _finished(self, idx: int, task: asyncio.Task):
+        del self.running[idx]
+        ok = False
+        if not task.cancelled() and task.exception() is None:
+            ok, saved = task.result()
+            self.tokens_saved[self.tasks[idx].filepath] = saved
+        (self.completed if ok else self.failed).append(idx)
+        self._schedule()
+
+    async def wait(self):
+        """Waits until no step is running; steps unblocked along the way are started as they become ready."""
+        while self.running:
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+
+    async def drain(self):
+        """Stops scheduling new steps and waits for the ones already running."""
+        self.closed = True
+        await self.wait()
+
+    def cancel(self):
+        self.closed = True
+        for task in self.running.values():
+            task.cancel()
+
+
+async def architect_agent(state: GraphState, config: RunnableConfig) -> dict:
     """Takes the plan and breaks it down into specific file implementation tasks."""
     plan: Plan = state.plan
     print(f"--- ARCHITECT: Designing file structure for {plan.name} ---")
 
-    response = llm.invoke(architect_prompt(plan=plan.model_dump_json()))
-    response_text = response.content
-
+    parser = JSONStreamParser(watch=[("implementation_steps", ARRAY_ITEM)])
+    journal = await asyncio.to_thread(StepJournal.load, state.project_path, _run_id(config))
+    pipeline = _PipelinedCoder(state, _run_id(config), journal)
+    reused = await asyncio.to_thread(plan_index.get, state.plan_source) if state.plan_source else None
+    completion = Completion(architect_prompt(plan=plan.model_dump_json()), "architect")
     try:
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-
-        task_plan_json = json.loads(response_text)
-        resp = TaskPlan.model_validate(task_plan_json)
+        if journal.task_plan is not None:
+            print("--- ARCHITECT: Resuming with the task plan saved before the interruption ---")
+            resp = journal.task_plan
+            pipeline.extend(resp.implementation_steps)
+        elif reused is not None:
+            print(f"--- ARCHITECT: Reusing the task plan of {state.plan_source} ---")
+            resp = TaskPlan.model_validate(reused["task_plan"])
+            for task in resp.implementation_steps:
+                pipeline.add(task)
+        else:
+            async for chunk in completion.stream():
+                for _, value in parser.feed(chunk):
+                    pipeline.add(ImplementationTask.model_validate(value))
+
+            resp = TaskPlan.model_validate(parser.result())
+    except (CacheMissError, asyncio.CancelledError):
+        pipeline.cancel()
+        raise
     except Exception as e:
+        pipeline.cancel()
+        await completion.discard()
         print(f"--- ERROR: Architect agent failed to parse JSON. ---")
-        print(f"Raw LLM Output:\n{response_text}")
+        print(f"Raw LLM Output:\n{parser.text}")
         print(f"Error: {e}")
         raise ValueError("Architect did not return valid JSON.")
+    await completion.save()
+    if journal.task_plan is None:
+        # Kept with the step progress, so a resume neither asks the architect again nor redoes finished steps
+        await asyncio.to_thread(journal.record_plan, resp)
+
+    await pipeline.drain()
+    coder_state = CoderState(
+        task_plan=resp,
+        current_step_idx=len(pipeline.completed),
+        completed_steps=pipeline.completed,
+        last_completed=list(pipeline.completed),
+        failed_steps=pipeline.failed,
+        context_tokens_saved=pipeline.tokens_saved,
+    )
+    return {"task_plan": resp, "coder_state": coder_state}
 
-    return {"task_plan": resp}
 
+CODER_TOOLS = [read_file, write_file, list_files, get_current_directory]
+_coder_agents: dict[str, CompiledStateGraph] = {}
 
-def coder_agent(state: GraphState) -> dict:
-    """Iteratively implements each file in the TaskPlan."""
-    coder_state: CoderState = state.coder_state
 
-    if coder_state is None:
-        coder_state = CoderState(task_plan=state.task_plan, current_step_idx=0)
+def _coder_prompt(state: dict, config: RunnableConfig) -> list:
+    """Prepends the system prompt for the run's tech stack, which arrives through the config."""
+    return [SystemMessage(coder_system_prompt(config["configurable"]["techstack"]))] + state["messages"]
 
-    steps = coder_state.task_plan.implementation_steps
 
-    if coder_state.current_step_idx >= len(steps):
-        print("--- CODER: All tasks completed. ---")
-        return {"coder_state": coder_state, "status": "DONE"}
+def get_coder_agent(variant: str, route: str = "default") -> CompiledStateGraph:
+    """Returns the shared ReAct coder for a prompt variant and model route, compiling it on first use.
+
+    The compiled agent holds no per-run data: the workspace and tech stack are injected
+    through the config on each call, so one instance serves every step of every run.
+    """
+    key = f"{variant}:{route}"
+    react_agent = _coder_agents.get(key)
+    if react_agent is None:
+        react_agent = _coder_agents.setdefault(key, create_react_agent(
+            router.model(route), CODER_TOOLS, prompt=_coder_prompt, name=f"coder_{variant}"
+        ))
+    return react_agent
 
-    current_task = steps[coder_state.current_step_idx]
-    print(f"--- CODER: Working on file ({coder_state.current_step_idx + 1}/{len(steps)}): {current_task.filepath} ---")
 
+async def _run_coder_step(state: GraphState, current_task: ImplementationTask,
+                          dependencies: list[str], run_id: str | None = None,
+                          journal: StepJournal | None = None) -> tuple[bool, int]:
+    """Runs the ReAct coder for a single implementation step.
+
+    Returns whether it succeeded and how many prompt tokens the packed context saved
+    compared with reading every project file in full. A successful step is recorded in
+    `journal` once its files are on disk.
+    """
     tech_stack = state.plan.techstack
-    system_prompt = coder_system_prompt(tech_stack)
+    tool_config = project_config(state.project_path, techstack=tech_stack, run_id=run_id, step=current_task.filepath)
 
     # --- CONTEXT INJECTION (Prevents Hallucinations) ---
-    # If writing CSS/JS, we inject the IDs and Classes found in HTML
-    context_injection = ""
-    if current_task.filepath.endswith(".js") or current_task.filepath.endswith(".css"):
-        html_content = read_file("index.html")
-        if html_content and "ERROR" not in html_content:
-            # Extract IDs
-            ids = re.findall(r'id=["\']([^"\']+)["\']', html_content)
-            # Extract Classes
-            classes = re.findall(r'class=["\']([^"\']+)["\']', html_content)
-
-            # Flatten class lists (handle "btn btn-primary")
-            all_classes = []
-            for c in classes:
-                all_classes.extend(c.split())
-
-            unique_ids = list(set(ids))
-            unique_classes = list(set(all_classes))
-
-            if unique_ids or unique_classes:
-                context_injection = (
-                    f"\n\n[CONTEXT INJECTION] \n"
-                    f"To ensure consistency, use these EXACT selectors found in index.html:\n"
-                    f"IDs: {unique_ids}\n"
-                    f"CSS Classes: {unique_classes}\n"
-                    f"Do NOT invent new IDs or classes that are not listed above."
-                )
+    # Symbol outlines of the other files, the current target and dependency excerpts, within a token budget
+    packed = await asyncio.to_thread(pack_context, state.project_path, current_task.filepath, dependencies, run_id=run_id)
+    print(f"--- CONTEXT: {current_task.filepath} packed {packed.tokens} tokens (saved {packed.saved_tokens}) ---")
 
     user_prompt = (
         f"CURRENT FILE: {current_task.filepath}\n"
         f"TASK: {current_task.task_description}\n"
-        f"{context_injection}\n\n"
+        f"{packed.text}\n\n"
         "INSTRUCTIONS:\n"
-        "1. If the file exists, read it first using read_file().\n"
+        "1. The relevant project context is included above; only call read_file() for files it does not show.\n"
         "2. Write the COMPLETE code for this file using write_file().\n"
         "3. Do not leave placeholders."
     )
 
-    coder_tools = [read_file, write_file, list_files, get_current_directory]
-    react_agent = create_react_agent(llm, coder_tools)
+    react_agent = get_coder_agent(coder_prompt_variant(tech_stack), router.route_for_file(current_task.filepath))
+
+    # The tools stage writes in this overlay instance, which stays cached until the step has committed
+    with pinned_overlay(state.project_path) as overlay:
+        try:
+            await react_agent.ainvoke({
+                "messages": [
+                    {"role": "user", "content": user_prompt}
+                ]
+            }, {**tool_config, "configurable": {**tool_config["configurable"], "overlay": overlay},
+                "metadata": {"coder_file": current_task.filepath}})
+        except Exception as e:
+            print(f"--- CODER ERROR on {current_task.filepath}: {e} ---")
+            return False, packed.saved_tokens
+        finally:
+            # The step's writes were kept in memory; they land on disk together, each one atomically
+            committed = await asyncio.to_thread(overlay.commit, current_task.filepath, run_id)
+            print(f"--- OVERLAY: {current_task.filepath} committed {', '.join(committed) or 'no changes'} ---")
+    if journal is not None:
+        await asyncio.to_thread(journal.record_step, current_task)
+    return True, packed.saved_tokens
+
+
+async def coder_agent(state: GraphState, config: RunnableConfig) -> dict:
+    """Implements the remaining TaskPlan steps, starting each one as soon as its dependencies are done."""
+    coder_state: CoderState = state.coder_state
 
-    try:
-        react_agent.invoke({
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        })
-    except Exception as e:
-        print(f"--- CODER ERROR on {current_task.filepath}: {e} ---")
-        pass
+    if coder_state is None:
+        coder_state = CoderState(task_plan=state.task_plan, current_step_idx=0)
 
-    coder_state.current_step_idx += 1
+    steps = coder_state.task_plan.implementation_steps
+    deps = resolve_dependencies(steps)
+    batch = ready_steps(deps, coder_state.completed_steps, coder_state.failed_steps)
+
+    if not batch:
+        remaining = len(steps) - len(coder_state.completed_steps)
+        if remaining:
+            print(f"--- CODER: Stopped with {remaining} unfinished task(s); resume to retry them. ---")
+            project_index.record_status(state.project_path, "FAILED")
+            return {"coder_state": coder_state, "status": "FAILED"}
+        print("--- CODER: All tasks completed. ---")
+        return {"coder_state": coder_state, "status": "VALIDATING"}
+
+    print(f"--- CODER: {len(steps) - len(coder_state.completed_steps)} task(s) left, {len(batch)} ready ---")
+
+    # Each finished step starts the ones it unblocks, so no step waits for an unrelated slower one
+    journal = await asyncio.to_thread(StepJournal.load, state.project_path, _run_id(config))
+    pipeline = _PipelinedCoder(state, _run_id(config), journal, coder_state.completed_steps, coder_state.failed_steps)
+    try:
+        pipeline.extend(steps)
+        await pipeline.wait()
+    except asyncio.CancelledError:
+        pipeline.cancel()
+        raise
+
+    already_done = len(coder_state.completed_steps)
+    coder_state.completed_steps = pipeline.completed
+    coder_state.failed_steps = pipeline.failed
+    coder_state.context_tokens_saved.update(pipeline.tokens_saved)
+    coder_state.last_completed = pipeline.completed[already_done:]
+    coder_state.current_step_idx = len(coder_state.completed_steps)
 
     return {"coder_state": coder_state, "status": "IN_PROGRESS"}
 
 
+async def validator_agent(state: GraphState) -> dict:
+    """Runs the local consistency checks over the finished project and decides whether to repair it."""
+    report = await asyncio.to_thread(validate_project, state.project_path)
+    if state.validation_baseline is not None:
+        # Edits only repair problems they introduced, not ones the project already had
+        report = report.without(state.validation_baseline)
+    problems = sum(len(errors) for errors in report.errors.values())
+    if not report.ok and state.repair_round < MAX_REPAIR_ROUNDS:
+        print(f"--- VALIDATOR: {problems} problem(s) in {', '.join(report.errors)}; repairing ---")
+        return {"validation": report, "status": "REPAIRING"}
+
+    if report.ok:
+        print("--- VALIDATOR: All checks passed. ---")
+    else:
+        for path, errors in report.errors.items():
+            print(f"--- VALIDATOR: {path} still has problems: {'; '.join(errors)} ---")
+    (pathlib.Path(state.project_path) / PARTIAL_MARKER).unlink(missing_ok=True)
+    (pathlib.Path(state.project_path) / STEP_JOURNAL).unlink(missing_ok=True)
+    project_index.record_status(state.project_path, "DONE")
+    if report.ok and state.mode == "create" and not state.plan_source and state.task_plan is not None:
+        # Only plans that produced a clean project are offered to later prompts
+        await asyncio.to_thread(
+            plan_index.add, state.project_path, state.user_prompt, state.plan.model_dump(), state.task_plan.model_dump()
+        )
+    return {"validation": report, "status": "DONE"}
+
+
+async def repair_agent(state: GraphState, config: RunnableConfig) -> dict:
+    """Re-runs the coder only for the files that failed validation, with their errors attached."""
+    report = state.validation
+    print(f"--- REPAIR: Round {state.repair_round + 1}/{MAX_REPAIR_ROUNDS} for {len(report.errors)} file(s) ---")
+    await asyncio.gather(*(
+        _run_coder_step(
+            state,
+            ImplementationTask(filepath=path, task_description=repair_task(errors)),
+            report.related.get(path, []),
+            _run_id(config),
+        )
+        for path, errors in report.errors.items()
+    ))
+    return {"repair_round": state.repair_round + 1, "status": "VALIDATING"}
+
+
 graph = StateGraph(GraphState)
 
 graph.add_node("planner", planner_agent)
+graph.add_node("change_planner", change_planner_agent)
 graph.add_node("create_project_workspace", create_project_workspace)
 graph.add_node("architect", architect_agent)
 graph.add_node("coder", coder_agent)
+graph.add_node("validator", validator_agent)
+graph.add_node("repair", repair_agent)
 
 graph.add_edge("planner", "create_project_workspace")
 graph.add_edge("create_project_workspace", "architect")
 graph.add_edge("architect", "coder")
+graph.add_edge("change_planner", "coder")
 
 graph.add_conditional_edges(
     "coder",
-    lambda s: "END" if s.status == "DONE" else "coder",
+    lambda s: {"IN_PROGRESS": "coder", "VALIDATING": "validator"}.get(s.status, "END"),
     {
         "END": END,
-        "coder": "coder"
+        "coder": "coder",
+        "validator": "validator"
     }
 )
+graph.add_conditional_edges(
+    "validator",
+    lambda s: "repair" if s.status == "REPAIRING" else "END",
+    {
+        "END": END,
+        "repair": "repair"
+    }
+)
+graph.add_edge("repair", "validator")
+
+graph.set_conditional_entry_point(
+    lambda s: "change_planner" if s.mode == "edit" else "planner",
+    {
+        "planner": "planner",
+        "change_planner": "change_planner"
+    }
+)
+agent = graph.compile()
+
+CHECKPOINT_PATH = os.environ.get("CHECKPOINT_PATH") or str(data_path("checkpoints.sqlite3"))
+
+
+def run_config(run_id: str, recursion_limit: int = 100, metrics: RunMetrics | None = None) -> dict:
+    """Config for a checkpointed run; the run id doubles as the checkpoint thread id."""
+    config = {"recursion_limit": recursion_limit, "configurable": {"thread_id": run_id}}
+    if metrics is not None:
+        config["callbacks"] = [MetricsCallbackHandler(metrics)]
+    return config
+
+
+@asynccontextmanager
+async def checkpointed_agent() -> AsyncIterator:
+    """Yields the graph compiled with a SQLite checkpointer, saving state after every node."""
+    async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_PATH) as saver:
+        yield graph.compile(checkpointer=saver)
+
+
+async def prepare_resume(checkpointed, config: dict) -> GraphState:
+    """Readies a stored run so that `astream(None, config)` continues from its last completed node.
+
+    Planner/architect failures are retried automatically since the failed node is still pending.
+    A coder pass that ended FAILED is reopened with its failed steps cleared, so only the
+    unfinished steps run again in the existing project folder.
+    """
+    snapshot = await checkpointed.aget_state(config)
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint found for run '{config['configurable']['thread_id']}'")
+
+    state = GraphState.model_validate(snapshot.values)
+    if state.status == "FAILED" and state.coder_state is not None:
+        state.coder_state.failed_steps = []
+        await checkpointed.aupdate_state(
+            config, {"coder_state": state.coder_state, "status": "IN_PROGRESS"}, as_node="coder"
+        )
+        state.status = "IN_PROGRESS"
+    return state
+
+
+async def mark_cancelled(checkpointed, config: dict, reason: str) -> str | None:
+    """Flags the project folder of an interrupted run as partial and returns its path.
+
+    The checkpoint is left untouched, so the run can still be resumed from its last completed
+    node; the marker is removed once the coder finishes every step. An interrupted edit only
+    restores the project's status from before the edit, and the project is not flagged.
+    """
+    snapshot = await checkpointed.aget_state(config)
+    project_path = (snapshot.values or {}).get("project_path")
+    run_id = config["configurable"]["thread_id"]
+    if not project_path or not os.path.isdir(project_path):
+        return project_path
+    if not await asyncio.to_thread(project_index.record_cancelled, project_path, run_id):
+        print(f"--- CANCELLED: {reason}; edit of {project_path} stopped, previous status restored ---")
+        return project_path
+    marker = {
+        "run_id": run_id,
+        "reason": reason,
+        "cancelled_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    pathlib.Path(project_path, PARTIAL_MARKER).write_text(json.dumps(marker, indent=2), encoding="utf-8")
+    print(f"--- CANCELLED: {reason}; marked {project_path} as partial ---")
+    return project_path
+
+
+async def mark_failed(checkpointed, config: dict) -> str | None:
+    """Records the final status of a run that raised, so /history does not keep it IN_PROGRESS.
 
-graph.set_entry_point("planner")
-agent = graph.compile()
\ No newline at end of file
+    Returns the run's project path, if it got as far as having one.
+    """
+    snapshot = await checkpointed.aget_state(config)
+    project_path = (snapshot.values or {}).get("project_path")
+    if project_path:
+        await asyncio.to_thread(project_index.record_failure, project_path, config["configurable"]["thread_id"])
+    return project_path
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import pathlib
+import threading
+from typing import Optional
+
+from agent.overlay import atomic_write
+from agent.states import ImplementationTask, TaskPlan
+
+# Written into the project folder while a run is coding; removed once the run is validated
+STEP_JOURNAL = ".steps.json"
+
+
+def step_key(task: ImplementationTask) -> str:
+    """Identifies a step by its file and task, so a re-planned step with a different task runs again."""
+    return hashlib.sha256(f"{task.filepath}\n{task.task_description}".encode("utf-8")).hexdigest()[:16]
+
+
+class StepJournal:
+    """Progress of one run's coder steps, saved after every finished step.
+
+    The checkpointer only saves state when a node returns, while the architect and coder nodes
+    run many steps each. The journal records the architect's task plan and every committed step
+    as they happen, so a resumed run reuses the plan and only codes the steps that did not finish.
+    """
+
+    def __init__(self, project_path: str, run_id: Optional[str]):
+        self.path = pathlib.Path(project_path) / STEP_JOURNAL
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self.task_plan: Optional[TaskPlan] = None
+        self.done: set[str] = set()
+
+    @classmethod
+    def load(cls, project_path: str, run_id: Optional[str]) -> "StepJournal":
+        """The journal of `run_id`; empty when the folder holds no journal or one of another run."""
+        journal = cls(project_path, run_id)
+        try:
+            data = json.loads(journal.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return journal
+        if run_id is not None and data.get("run_id") == run_id:
+            if data.get("task_plan"):
+                journal.task_plan = TaskPlan.model_validate(data["task_plan"])
+            journal.done = set(data.get("done", []))
+        return journal
+
+    def is_done(self, task: ImplementationTask) -> bool:
+        return step_key(task) in self.done
+
+    def _save(self):
+        data = {
+            "run_id": self.run_id,
+            "task_plan": self.task_plan.model_dump() if self.task_plan else None,
+            "done": sorted(self.done),
+        }
+        atomic_write(self.path, json.dumps(data, indent=2).encode("utf-8"))
+
+    def record_plan(self, task_plan: TaskPlan):
+        if self.run_id is None:
+            return
+        with self._lock:
+            self.task_plan = task_plan
+            self._save()
+
+    def record_step(self, task: ImplementationTask):
+        if self.run_id is None:
+            return
+        with self._lock:
+            self.done.add(step_key(task))
+            self._save()
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,117 @@
+import json
+from typing import Any, Iterable
+
+ARRAY_ITEM = "*"
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "slot", "expect_key")
+
+    def __init__(self, kind: str, start: int, path: tuple):
+        self.kind = kind
+        self.start = start
+        self.path = path
+        self.slot = ARRAY_ITEM if kind == "[" else None
+        self.expect_key = kind == "{"
+
+
+class JSONStreamParser:
+    """Incrementally parses the first JSON object in streamed LLM output.
+
+    Text before the opening brace (prose, a ```json fence) is skipped. Values whose path is
+    watched are returned from `feed` as soon as they close, e.g. `("name",)` for a top-level
+    key or `("implementation_steps", "*")` for each element of an array.
+    """
+
+    def __init__(self, watch: Iterable[tuple] = ()):
+        self.watch = {tuple(path) for path in watch}
+        self._buf = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._root_start = None
+        self._root_end = None
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = None
+        self._scalar_start = None
+
+    @property
+    def done(self) -> bool:
+        return self._root_end is not None
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    def _value_path(self) -> tuple:
+        return tuple(frame.slot for frame in self._stack)
+
+    def _close_value(self, path: tuple, start: int, end: int, events: list):
+        if path in self.watch:
+            events.append((path, json.loads(self._buf[start:end])))
+
+    def feed(self, chunk: str) -> list[tuple[tuple, Any]]:
+        """Consumes a chunk of text and returns the watched (path, value) pairs it completed."""
+        self._buf += chunk
+        events = []
+        buf = self._buf
+
+        i = self._pos
+        while i < len(buf) and not self.done:
+            c = buf[i]
+
+            if self._root_start is None:
+                if c == "{":
+                    self._root_start = i
+                    self._stack.append(_Frame("{", i, ()))
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._stack[-1].slot = json.loads(buf[self._string_start:i + 1])
+                    else:
+                        self._close_value(self._value_path(), self._string_start, i + 1, events)
+                i += 1
+                continue
+
+            if self._scalar_start is not None and (c in ",]}" or c.isspace()):
+                self._close_value(self._value_path(), self._scalar_start, i, events)
+                self._scalar_start = None
+
+            top = self._stack[-1]
+            if c == '"':
+                self._in_string = True
+                self._string_is_key = top.kind == "{" and top.expect_key
+                self._string_start = i
+            elif c in "{[":
+                self._stack.append(_Frame(c, i, self._value_path()))
+            elif c in "}]":
+                frame = self._stack.pop()
+                self._close_value(frame.path, frame.start, i + 1, events)
+                if not self._stack:
+                    self._root_end = i + 1
+            elif c == ":":
+                top.expect_key = False
+            elif c == ",":
+                if top.kind == "{":
+                    top.expect_key = True
+            elif not c.isspace() and self._scalar_start is None:
+                self._scalar_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def result(self) -> Any:
+        """Returns the complete parsed object, raising ValueError if the stream ended early."""
+        if not self.done:
+            raise ValueError("Stream ended before the JSON object was complete")
+        return json.loads(self._buf[self._root_start:self._root_end])
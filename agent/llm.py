@@ -0,0 +1,26 @@
+import os
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from agent.ratelimit import RateLimitedChatModel
+
+LLM_PROVIDERS = ("groq", "fake")
+
+
+def build_llm(model_name: str) -> BaseChatModel:
+    """Builds the chat model for the configured provider.
+
+    `LLM_PROVIDER=fake` swaps in the deterministic offline model used by the benchmarks,
+    with `FAKE_LLM_LATENCY` seconds of simulated latency per call. Either model is wrapped
+    in the shared rate limiter, which owns retries.
+    """
+    provider = os.environ.get("LLM_PROVIDER", "groq")
+    if provider == "fake":
+        from agent.fake_llm import FakeChatModel
+        model = FakeChatModel(model_name=model_name, latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")))
+    elif provider == "groq":
+        from langchain_groq.chat_models import ChatGroq
+        model = ChatGroq(model=model_name, max_retries=0)
+    else:
+        raise ValueError(f"LLM_PROVIDER must be one of {LLM_PROVIDERS}, got '{provider}'")
+    return RateLimitedChatModel(inner=model)
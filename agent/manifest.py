@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+
+from agent.storage import RootCache
+
+MANIFEST_FILENAME = ".manifest.json"
+
+
+def _file_entry(root: pathlib.Path, rel: str, content: bytes | None = None) -> dict | None:
+    path = root / rel
+    try:
+        stat = path.stat()
+        if content is None:
+            content = path.read_bytes()
+    except OSError:
+        return None
+    return {
+        "path": rel,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": hashlib.sha256(content).hexdigest(),
+        "language": path.suffix.lstrip(".").lower(),
+    }
+
+
+class ProjectManifest:
+    """Per-project list of files with their size, mtime, content hash and language.
+
+    The manifest is persisted to `.manifest.json` in the project root and updated one file at
+    a time as the coder writes, so serving it never walks or reads the project. Its `etag`
+    changes whenever any entry does.
+    """
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root
+        self.path = root / MANIFEST_FILENAME
+        self._lock = threading.Lock()
+        self.files: dict[str, dict] = {}
+        self.etag = ""
+        self._loaded_mtime = None
+        self._load()
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.files, self.etag = data["files"], data["etag"]
+                self._loaded_mtime = self.path.stat().st_mtime
+                return
+            except (ValueError, KeyError, OSError):
+                pass
+        self.rebuild()
+
+    def reload_if_changed(self):
+        """Picks up writes made by another process, such as the CLI."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            self._load()
+
+    def rebuild(self):
+        """Scans the whole project once; used when no manifest has been written yet."""
+        files = {}
+        if self.root.is_dir():
+            for f in self.root.glob("**/*"):
+                if f.is_file() and not f.name.startswith("."):
+                    rel = f.relative_to(self.root).as_posix()
+                    entry = _file_entry(self.root, rel)
+                    if entry is not None:
+                        files[rel] = entry
+        with self._lock:
+            self.files = files
+            self._save()
+
+    def _save(self):
+        self.etag = hashlib.sha256(
+            "\n".join(f"{path}:{entry['hash']}" for path, entry in sorted(self.files.items())).encode("utf-8")
+        ).hexdigest()[:32]
+        if not self.root.is_dir():
+            return
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"etag": self.etag, "files": self.files}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._loaded_mtime = self.path.stat().st_mtime
+
+    def update(self, path: str, content: bytes | None = None):
+        """Records a file after it has been written, or drops it if it no longer exists.
+
+        Pass the bytes just written as `content` to hash them without reading the file back.
+        """
+        rel = pathlib.PurePosixPath(path).as_posix()
+        entry = _file_entry(self.root, rel, content)
+        with self._lock:
+            if entry is None:
+                if self.files.pop(rel, None) is not None:
+                    self._save()
+                return
+            if self.files.get(rel) == entry:
+                return
+            self.files[rel] = entry
+            self._save()
+
+    def current(self, path: str) -> dict | None:
+        """The entry for one file, re-hashed first if it changed on disk since it was recorded."""
+        rel = pathlib.PurePosixPath(path).as_posix()
+        entry = self.files.get(rel)
+        try:
+            stat = (self.root / rel).stat()
+        except OSError:
+            stat = None
+        if stat is None or entry is None or (stat.st_size, stat.st_mtime) != (entry["size"], entry["mtime"]):
+            self.update(rel)
+            entry = self.files.get(rel)
+        return entry
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return [self.files[path] for path in sorted(self.files)]
+
+
+MAX_CACHED_MANIFESTS = 256
+_manifests: RootCache[ProjectManifest] = RootCache(ProjectManifest, MAX_CACHED_MANIFESTS)
+
+
+def project_manifest(root: str | pathlib.Path) -> ProjectManifest:
+    """Returns the shared manifest for a project root, loading or building it on first use."""
+    return _manifests.get(root)
+
+
+def pinned_manifest(root: str | pathlib.Path):
+    """The shared manifest for a project root, never evicted while the `with` block runs."""
+    return _manifests.pinned(root)
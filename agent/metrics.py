@@ -0,0 +1,252 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+GRAPH_NODES = ("planner", "change_planner", "create_project_workspace", "architect", "coder", "validator", "repair")
+# USD per million tokens, for the cost estimate in run snapshots
+PROMPT_PRICE_PER_MTOK = float(os.environ.get("LLM_PROMPT_PRICE_PER_MTOK", "0.15"))
+COMPLETION_PRICE_PER_MTOK = float(os.environ.get("LLM_COMPLETION_PRICE_PER_MTOK", "0.75"))
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], _Histogram] = {}
+        self._help: dict[str, tuple[str, str]] = {}
+
+    def _describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "counter", help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._describe(name, "histogram", help_text)
+            self._histograms.setdefault(key, _Histogram()).observe(value)
+
+    def render(self) -> str:
+        def fmt_labels(labels: tuple, extra: tuple = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{fmt_labels(labels)} {value:g}")
+                    continue
+                for (metric, labels), hist in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt_labels(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{fmt_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RunMetrics:
+    """Timing, token and I/O totals for a single generation run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.nodes: dict[str, dict] = {}
+        self.llm = {"calls": 0, "latency_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "errors": 0, "retries": 0}
+        self.tools: dict[str, dict] = {}
+        self.bytes_written = 0
+
+    def _node(self, label: str) -> dict:
+        return self.nodes.setdefault(label, {
+            "wall_s": 0.0, "runs": 0, "llm_calls": 0, "llm_latency_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+        })
+
+    def record_node(self, label: str, seconds: float):
+        with self._lock:
+            node = self._node(label)
+            node["wall_s"] += seconds
+            node["runs"] += 1
+        registry.observe("codecompanion_node_duration_seconds", seconds, "Wall time per graph node or coder step",
+                         node=label.split(":", 1)[0])
+
+    def record_llm(self, label: str, seconds: float, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            for bucket in (self.llm, self._node(label)):
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+            self.llm["calls"] += 1
+            self.llm["latency_s"] += seconds
+            self._node(label)["llm_calls"] += 1
+            self._node(label)["llm_latency_s"] += seconds
+        node = label.split(":", 1)[0]
+        registry.observe("codecompanion_llm_latency_seconds", seconds, "LLM call latency", node=node)
+        registry.inc("codecompanion_llm_tokens_total", prompt_tokens, "LLM tokens", node=node, kind="prompt")
+        registry.inc("codecompanion_llm_tokens_total", completion_tokens, "LLM tokens", node=node, kind="completion")
+
+    def record_llm_error(self, label: str):
+        with self._lock:
+            self.llm["errors"] += 1
+        registry.inc("codecompanion_llm_errors_total", 1, "Failed LLM calls", node=label.split(":", 1)[0])
+
+    def record_retry(self, label: str):
+        with self._lock:
+            self.llm["retries"] += 1
+        registry.inc("codecompanion_llm_retries_total", 1, "Retried LLM calls", node=label.split(":", 1)[0])
+
+    def record_tool(self, tool: str, seconds: float, bytes_written: int = 0):
+        with self._lock:
+            stats = self.tools.setdefault(tool, {"calls": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            self.bytes_written += bytes_written
+        registry.inc("codecompanion_tool_calls_total", 1, "Agent tool calls", tool=tool)
+        registry.observe("codecompanion_tool_duration_seconds", seconds, "Agent tool call duration", tool=tool)
+        if bytes_written:
+            registry.inc("codecompanion_bytes_written_total", bytes_written, "Bytes written by write_file")
+
+    def snapshot(self) -> dict:
+        def rounded(values: dict) -> dict:
+            return {k: round(v, 4) if isinstance(v, float) else v for k, v in values.items()}
+
+        with self._lock:
+            return {
+                "elapsed_s": round(time.perf_counter() - self.started, 4),
+                "llm": rounded(self.llm),
+                "nodes": {label: rounded(values) for label, values in self.nodes.items()},
+                "tools": {name: rounded(values) for name, values in self.tools.items()},
+                "bytes_written": self.bytes_written,
+                "cost_usd": round(estimate_cost(self.llm["prompt_tokens"], self.llm["completion_tokens"]), 6),
+            }
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (prompt_tokens * PROMPT_PRICE_PER_MTOK + completion_tokens * COMPLETION_PRICE_PER_MTOK) / 1_000_000
+
+
+def _usage(response) -> tuple[int, int]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Feeds LangChain callbacks of one run into its RunMetrics.
+
+    Graph nodes are the direct children of the root graph run; coder steps are the ReAct
+    agent runs tagged with `coder_file` metadata. LLM calls are attributed to the coder step
+    they belong to, otherwise to the graph node that made them.
+    """
+
+    run_inline = True
+
+    def __init__(self, metrics: RunMetrics):
+        self.metrics = metrics
+        self._root: Optional[UUID] = None
+        self._starts: dict[UUID, tuple[float, str]] = {}
+        self._tools: dict[UUID, tuple[float, str, int]] = {}
+
+    @staticmethod
+    def _label(metadata: Optional[dict]) -> str:
+        metadata = metadata or {}
+        if metadata.get("coder_file"):
+            return f"coder:{metadata['coder_file']}"
+        return metadata.get("langgraph_node", "other")
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       metadata: Optional[dict] = None, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        if parent_run_id is None and self._root is None:
+            self._root = run_id
+        elif parent_run_id == self._root and name in GRAPH_NODES:
+            self._starts[run_id] = (time.perf_counter(), name)
+        elif name.startswith("coder_") and (metadata or {}).get("coder_file"):
+            self._starts[run_id] = (time.perf_counter(), self._label(metadata))
+
+    def _finish_chain(self, run_id: UUID):
+        started = self._starts.pop(run_id, None)
+        if started:
+            self.metrics.record_node(started[1], time.perf_counter() - started[0])
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._finish_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._finish_chain(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any):
+        self._starts[run_id] = (time.perf_counter(), self._label(metadata))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any):
+        self._starts[run_id] = (time.perf_counter(), self._label(metadata))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        started = self._starts.pop(run_id, None)
+        if started:
+            prompt_tokens, completion_tokens = _usage(response)
+            self.metrics.record_llm(started[1], time.perf_counter() - started[0], prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        started = self._starts.pop(run_id, None)
+        self.metrics.record_llm_error(started[1] if started else "other")
+
+    def on_retry(self, retry_state, *, run_id: UUID, **kwargs: Any):
+        started = self._starts.get(run_id)
+        self.metrics.record_retry(started[1] if started else "other")
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, inputs: Optional[dict] = None, **kwargs: Any):
+        name = (serialized or {}).get("name", "tool")
+        written = len((inputs or {}).get("content", "").encode("utf-8")) if name == "write_file" else 0
+        self._tools[run_id] = (time.perf_counter(), name, written)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        started = self._tools.pop(run_id, None)
+        if started:
+            self.metrics.record_tool(started[1], time.perf_counter() - started[0], started[2])
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs: Any):
+        started = self._tools.pop(run_id, None)
+        if started:
+            self.metrics.record_tool(started[1], time.perf_counter() - started[0])
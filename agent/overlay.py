@@ -0,0 +1,152 @@
+import hashlib
+import os
+import pathlib
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from agent.events import LIVE_CONTENT_MAX_BYTES, get_run_events
+from agent.manifest import pinned_manifest, project_manifest
+from agent.metrics import registry
+from agent.storage import RootCache
+from agent.symbols import pinned_symbol_index, symbol_index
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path: pathlib.Path, data: bytes):
+    """Writes through a hidden temp file in the same folder and renames it over `path`.
+
+    Readers see either the old file or the new one, never a partly written one.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class WorkspaceOverlay:
+    """In-memory layer over a project folder that the file tools read and write through.
+
+    Writes stay in memory until the coder step that made them commits, so a file the model
+    rewrites several times in one step reaches the disk once, and a write that matches the
+    current content (by hash) is dropped. Reads are served from memory after the first disk read
+    and listings come from the project manifest plus the pending writes, so the ReAct loop
+    never walks the project. Pending writes belong to one run, so two edit runs of the same
+    folder never see or commit each other's uncommitted files.
+    """
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root
+        self._lock = threading.Lock()
+        # Committed content this process has read or written, with its hash
+        self._cache: dict[str, tuple[str, str]] = {}
+        # Uncommitted writes: (run id, path) -> (step that wrote it last, content, hash)
+        self._pending: dict[tuple[Optional[str], str], tuple[Optional[str], str, str]] = {}
+
+    def _current_hash(self, rel: str, run_id: Optional[str]) -> Optional[str]:
+        pending = self._pending.get((run_id, rel))
+        if pending is not None:
+            return pending[2]
+        entry = project_manifest(self.root).current(rel)
+        return entry["hash"] if entry else None
+
+    def read(self, rel: str, run_id: Optional[str] = None) -> Optional[str]:
+        """The file as `run_id` sees it, including its uncommitted writes; None if it does not exist."""
+        with self._lock:
+            pending = self._pending.get((run_id, rel))
+            if pending is not None:
+                return pending[1]
+            cached = self._cache.get(rel)
+        # The manifest only stats the file, so a change made outside the run is still noticed
+        entry = project_manifest(self.root).current(rel)
+        if entry is None:
+            return None
+        if cached is not None and cached[1] == entry["hash"]:
+            return cached[0]
+        content = (self.root / rel).read_text(encoding="utf-8")
+        with self._lock:
+            self._cache[rel] = (content, _hash(content.encode("utf-8")))
+        return content
+
+    def write(self, rel: str, content: str, step: Optional[str] = None, run_id: Optional[str] = None) -> bool:
+        """Stages a write by `step` of `run_id`; returns False when the content is already there."""
+        digest = _hash(content.encode("utf-8"))
+        with self._lock:
+            if self._current_hash(rel, run_id) == digest:
+                registry.inc("codecompanion_overlay_writes_skipped_total", 1, "Tool writes dropped as identical to the current content")
+                return False
+            self._pending[(run_id, rel)] = (step, content, digest)
+        return True
+
+    def paths(self, run_id: Optional[str] = None) -> list[str]:
+        """Every visible file of the project, committed or pending for `run_id`."""
+        manifest = project_manifest(self.root)
+        manifest.reload_if_changed()
+        with self._lock:
+            paths = {entry["path"] for entry in manifest.entries()}
+            paths.update(rel for owner, rel in self._pending if owner == run_id)
+        return sorted(paths)
+
+    def commit(self, step: Optional[str] = None, run_id: Optional[str] = None) -> list[str]:
+        """Atomically writes the pending files of `step` and records them in the manifest and symbol index.
+
+        Live viewers of the run get one file event per committed file. Returns the committed paths.
+        """
+        with self._lock:
+            keys = [key for key, (owner, _, _) in self._pending.items() if key[0] == run_id and owner == step]
+            writes = {key[1]: self._pending.pop(key) for key in keys}
+        manifest = project_manifest(self.root)
+        events = get_run_events(run_id)
+        committed = []
+        for rel, (_, content, digest) in writes.items():
+            data = content.encode("utf-8")
+            previous = manifest.files.get(rel)
+            with self._lock:
+                self._cache[rel] = (content, digest)
+            if previous is not None and previous["hash"] == digest and (self.root / rel).is_file():
+                continue  # Rewritten back to what is already on disk
+            atomic_write(self.root / rel, data)
+            committed.append(rel)
+            symbol_index(self.root).update(rel, content)
+            manifest.update(rel, data)
+            registry.inc("codecompanion_overlay_committed_bytes_total", len(data), "Bytes committed to disk by the file tools")
+
+            # Live viewers of this run get the new file without re-fetching the project
+            entry = manifest.files.get(rel)
+            if events is not None and entry is not None:
+                event = {"type": "file", "previous_hash": previous["hash"] if previous else None, **entry}
+                if entry["size"] <= LIVE_CONTENT_MAX_BYTES:
+                    event["content"] = content
+                events.publish(event)
+        return committed
+
+
+MAX_CACHED_OVERLAYS = 64
+# Overlays holding pending writes are never evicted, so no write is lost
+_overlays: RootCache[WorkspaceOverlay] = RootCache(
+    WorkspaceOverlay, MAX_CACHED_OVERLAYS, busy=lambda overlay: bool(overlay._pending)
+)
+
+
+def workspace_overlay(root: str | pathlib.Path) -> WorkspaceOverlay:
+    """Returns the shared overlay for a project root, creating it on first use."""
+    return _overlays.get(root)
+
+
+@contextmanager
+def pinned_overlay(root: str | pathlib.Path) -> Iterator[WorkspaceOverlay]:
+    """The shared overlay for a project root, kept in the cache for as long as the block runs.
+
+    Coder steps hold on to this instance and hand it to the file tools through the run config,
+    so their staged writes and the final commit always go to the same overlay. The project's
+    manifest and symbol index stay cached too, so the commit updates the instances everyone reads.
+    """
+    with _overlays.pinned(root) as overlay, pinned_manifest(root), pinned_symbol_index(root):
+        yield overlay
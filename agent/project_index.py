@@ -0,0 +1,335 @@
+import argparse
+import base64
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import stat
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from agent.manifest import project_manifest
+from agent.storage import data_path
+
+PROJECTS_DIR = pathlib.Path("projects")
+# Written into each project so the index can be rebuilt from disk alone
+PROJECT_META = ".project.json"
+PARTIAL_MARKER = ".partial.json"
+SORT_ORDERS = {
+    "newest": ("created", "DESC"),
+    "oldest": ("created", "ASC"),
+    "name": ("name_key", "ASC"),
+    "name_desc": ("name_key", "DESC"),
+}
+MAX_PAGE_SIZE = 200
+_FOLDER_TIMESTAMP = re.compile(r"_(\d{8}_\d{6})(?:_\d+)?$")
+
+
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _display_name(folder: str) -> str:
+    parts = folder.split("_")
+    return " ".join(parts[:-2]) if len(parts) > 2 else folder
+
+
+def _disk_usage(root: pathlib.Path) -> tuple[int, int]:
+    """File count and total size of a project from `stat` alone, counting the files its manifest would."""
+    count = size = 0
+    for f in root.glob("**/*"):
+        if f.name.startswith("."):
+            continue
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            count += 1
+            size += st.st_size
+    return count, size
+
+
+class ProjectIndex:
+    """SQLite index of generated projects backing the paginated /history endpoint.
+
+    Rows are written when a workspace is created and updated when its run ends, so listing
+    projects never walks the `projects/` folder. `rebuild` recreates the index from disk, and
+    `ensure_built` does so once for an index that has never been built.
+    """
+
+    def __init__(self, path: str, projects_dir: pathlib.Path = PROJECTS_DIR):
+        self.path = str(path)
+        self.projects_dir = pathlib.Path(projects_dir)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._built = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    folder TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    prompt TEXT,
+                    run_id TEXT,
+                    status TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    file_count INTEGER NOT NULL DEFAULT 0,
+                    total_size INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS projects_created ON projects(created, folder);
+                CREATE INDEX IF NOT EXISTS projects_name ON projects(name_key, folder);
+                CREATE TABLE IF NOT EXISTS index_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+        return self._conn
+
+    @staticmethod
+    def _read_meta(root: pathlib.Path) -> dict:
+        try:
+            return json.loads((root / PROJECT_META).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(root: pathlib.Path, meta: dict):
+        (root / PROJECT_META).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    def _upsert(self, row: dict):
+        columns = ", ".join(row)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != "folder")
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f"INSERT INTO projects({columns}) VALUES ({', '.join('?' for _ in row)}) "
+                f"ON CONFLICT(folder) DO UPDATE SET {updates}",
+                tuple(row.values()),
+            )
+            conn.commit()
+
+    def record_workspace(self, project_path: str, name: str, prompt: str, run_id: Optional[str] = None):
+        """Registers a newly created workspace as IN_PROGRESS."""
+        root = pathlib.Path(project_path)
+        meta = self._read_meta(root) or {"created": time.time()}
+        meta.update(name=name, prompt=prompt, run_id=run_id, status="IN_PROGRESS")
+        self._write_meta(root, meta)
+        self._upsert(self._row(root, meta))
+
+    def record_edit(self, project_path: str, prompt: str, run_id: Optional[str] = None) -> dict:
+        """Marks an existing project IN_PROGRESS for an edit run, appends the request to its edit history and returns its metadata."""
+        root = pathlib.Path(project_path)
+        meta = self._read_meta(root) or {"created": self._created_from_disk(root)}
+        meta.setdefault("edits", []).append({
+            "prompt": prompt, "run_id": run_id, "at": time.time(), "previous_status": meta.get("status") or "DONE",
+        })
+        meta.update(run_id=run_id, status="IN_PROGRESS")
+        self._write_meta(root, meta)
+        self._upsert(self._row(root, meta))
+        return meta
+
+    def record_status(self, project_path: str, status: str):
+        """Stores a run's final status together with the project's current file count and size."""
+        root = pathlib.Path(project_path)
+        if not root.is_dir():
+            return
+        meta = self._read_meta(root)
+        meta["status"] = status
+        self._write_meta(root, meta)
+        self._upsert(self._row(root, meta))
+
+    def _edit_of_run(self, root: pathlib.Path, run_id: Optional[str]) -> Optional[dict]:
+        """The edit entry `run_id` added to the project, if it is an edit run."""
+        edits = self._read_meta(root).get("edits") or []
+        if edits and run_id is not None and edits[-1].get("run_id") == run_id:
+            return edits[-1]
+        return None
+
+    def record_failure(self, project_path: str, run_id: Optional[str] = None):
+        """Ends a run that raised: a failed edit restores the project's previous status, anything else is FAILED."""
+        root = pathlib.Path(project_path)
+        if not root.is_dir():
+            return
+        edit = self._edit_of_run(root, run_id)
+        self.record_status(project_path, (edit.get("previous_status") or "DONE") if edit else "FAILED")
+
+    def record_cancelled(self, project_path: str, run_id: Optional[str] = None) -> bool:
+        """Ends a cancelled run and returns whether its project should be flagged as partial.
+
+        A cancelled edit restores the project's previous status, so stopping an edit does not turn
+        a finished project into a partial one; anything else is CANCELLED.
+        """
+        root = pathlib.Path(project_path)
+        if not root.is_dir():
+            return False
+        edit = self._edit_of_run(root, run_id)
+        if edit:
+            self.record_status(project_path, edit.get("previous_status") or "DONE")
+            return False
+        self.record_status(project_path, "CANCELLED")
+        return True
+
+    def _row(self, root: pathlib.Path, meta: dict, usage: Optional[tuple[int, int]] = None) -> dict:
+        if usage is None:
+            files = project_manifest(root).entries()
+            usage = (len(files), sum(f["size"] for f in files))
+        name = meta.get("name") or _display_name(root.name)
+        return {
+            "folder": root.name,
+            "name": name,
+            "name_key": name.lower(),
+            "prompt": meta.get("prompt"),
+            "run_id": meta.get("run_id"),
+            "status": meta.get("status"),
+            "created": meta.get("created") or self._created_from_disk(root),
+            "updated": time.time(),
+            "file_count": usage[0],
+            "total_size": usage[1],
+        }
+
+    @staticmethod
+    def _created_from_disk(root: pathlib.Path) -> float:
+        match = _FOLDER_TIMESTAMP.search(root.name)
+        if match:
+            try:
+                return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+            except ValueError:
+                pass
+        return root.stat().st_mtime
+
+    def rebuild(self) -> int:
+        """Recreates the index from the project folders on disk and returns how many it found.
+
+        Only each folder's metadata file and `stat` results are read: no file is hashed and no
+        manifest is written into the projects.
+        """
+        rows = []
+        if self.projects_dir.is_dir():
+            for root in self.projects_dir.iterdir():
+                if not root.is_dir():
+                    continue
+                meta = self._read_meta(root)
+                if (root / PARTIAL_MARKER).exists():
+                    meta["status"] = "CANCELLED"
+                meta.setdefault("status", "DONE")
+                rows.append(self._row(root, meta, _disk_usage(root)))
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM projects")
+            for row in rows:
+                conn.execute(
+                    f"INSERT INTO projects({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                    tuple(row.values()),
+                )
+            conn.execute("INSERT OR REPLACE INTO index_state(key, value) VALUES ('rebuilt', ?)", (str(time.time()),))
+            conn.commit()
+            self._built = True
+        return len(rows)
+
+    @property
+    def built(self) -> bool:
+        """Whether the index has been rebuilt from disk at least once."""
+        if not self._built:
+            with self._lock:
+                row = self._connection().execute("SELECT 1 FROM index_state WHERE key = 'rebuilt'").fetchone()
+                self._built = row is not None
+        return self._built
+
+    def ensure_built(self) -> bool:
+        """Rebuilds the index the first time it is used, even with no projects yet; returns whether it rebuilt."""
+        if self.built:
+            return False
+        self.rebuild()
+        return True
+
+    def _drop_missing(self, items: list[dict]) -> list[dict]:
+        """Removes the rows of project folders that were deleted from disk and returns the others."""
+        missing = [item["folder"] for item in items if not (self.projects_dir / item["folder"]).is_dir()]
+        if missing:
+            with self._lock:
+                conn = self._connection()
+                conn.executemany("DELETE FROM projects WHERE folder = ?", [(folder,) for folder in missing])
+                conn.commit()
+        return [item for item in items if item["folder"] not in missing]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def page(self, limit: int = 50, cursor: Optional[str] = None, prefix: Optional[str] = None,
+             query: Optional[str] = None, sort: str = "newest") -> tuple[list[dict], Optional[str]]:
+        """Returns one page of projects and the cursor for the next page (None on the last page).
+
+        `prefix` matches the start of the project name and `query` any part of the name or prompt,
+        both case-insensitively. Pages are keyset-paginated, so deep pages cost the same as the first.
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"sort must be one of {tuple(SORT_ORDERS)}, got '{sort}'")
+        column, direction = SORT_ORDERS[sort]
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        where, params = [], []
+        if prefix:
+            where.append("name_key LIKE ? ESCAPE '\\'")
+            params.append(_escape_like(prefix.lower()) + "%")
+        if query:
+            where.append("(name_key LIKE ? ESCAPE '\\' OR lower(prompt) LIKE ? ESCAPE '\\')")
+            pattern = "%" + _escape_like(query.lower()) + "%"
+            params += [pattern, pattern]
+        if cursor:
+            where.append(f"({column}, folder) {'<' if direction == 'DESC' else '>'} (?, ?)")
+            params += _decode_cursor(cursor)
+
+        sql = "SELECT * FROM projects"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {column} {direction}, folder {direction} LIMIT ?"
+        with self._lock:
+            rows = self._connection().execute(sql, (*params, limit + 1)).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = _encode_cursor([last[column], last["folder"]])
+        items = self._drop_missing(items)
+        for item in items:
+            item.pop("name_key")
+        return items, next_cursor
+
+
+project_index = ProjectIndex(os.environ.get("PROJECT_INDEX_PATH") or data_path("projects.sqlite3"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the project index")
+    parser.add_argument("--rebuild", action="store_true", help="Recreate the index from the projects/ folder")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Indexed {project_index.rebuild()} project(s) from {PROJECTS_DIR}/")
+    else:
+        print(json.dumps({"path": project_index.path, "projects": project_index.count(),
+                          "built": project_index.built}, indent=2))
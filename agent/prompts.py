@@ -1,4 +1,7 @@
-def planner_prompt(user_prompt: str) -> str:
+def planner_prompt(user_prompt: str, example: str | None = None) -> str:
+    if example:
+        # A plan from a similar past request, reused as a one-shot example
+        user_prompt = f"{user_prompt}\n\nSIMILAR PAST PLAN (adapt it to this request):\n{example}"
     return f"""You are PLANNER. Convert request to JSON project plan.
 
 OUTPUT (JSON only, no other text):
@@ -26,27 +29,75 @@ def architect_prompt(plan: str) -> str:
 OUTPUT (JSON only):
 {{
   "implementation_steps": [
-    {{"filepath": "index.html", "task_description": "Create structure with semantic HTML, specific IDs and classes"}},
-    {{"filepath": "style.css", "task_description": "Style with modern design, variables, responsive layout"}},
-    {{"filepath": "app.js", "task_description": "Implement logic, match exact IDs/classes from HTML"}}
+    {{"filepath": "index.html", "task_description": "Create structure with semantic HTML, specific IDs and classes", "depends_on": []}},
+    {{"filepath": "style.css", "task_description": "Style with modern design, variables, responsive layout", "depends_on": ["index.html"]}},
+    {{"filepath": "app.js", "task_description": "Implement logic, match exact IDs/classes from HTML", "depends_on": ["index.html"]}},
+    {{"filepath": "README.md", "task_description": "Document features and usage", "depends_on": []}}
   ]
 }}
 
 ORDER: index.html → style.css → app.js
+DEPENDS_ON: list only the files a step must read first. Independent files run in parallel.
 Be specific: name exact classes, IDs, functions to use.
 
 Plan: {plan}"""
 
 
-def coder_system_prompt(techstack: str) -> str:
+def change_planner_prompt(request: str, files: str) -> str:
+    return f"""You are CHANGE PLANNER. An existing project must be changed as requested.
+Select ONLY the files that need to change (or be created) and describe the minimal edit for each.
+
+OUTPUT (JSON only):
+{{
+  "techstack": "HTML, CSS, JavaScript",
+  "implementation_steps": [
+    {{"filepath": "style.css", "task_description": "Change the .btn background to blue (#2563eb), keep everything else", "depends_on": []}}
+  ]
+}}
+
+RULES: Leave out every file the request does not affect. Name exact selectors, IDs and functions to change.
+Reuse existing IDs/classes; if a new one is needed in HTML and JS, include both files.
+
+PROJECT FILES:
+{files}
+
+Request: {request}"""
+
+
+def edit_task(description: str, exists: bool) -> str:
+    if not exists:
+        return f"Create this new file for a change to an existing project: {description}"
+    return (
+        f"Edit this existing file: {description}\n"
+        "Make the smallest change that does this; keep all other code, names and formatting exactly as they are."
+    )
+
+
+def repair_task(errors: list[str]) -> str:
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"""Automatic checks found these problems in this file:
+{problems}
+
+Fix every problem listed. Prefer using selectors and files that already exist in the other project files;
+keep everything else in this file unchanged and rewrite the complete file."""
+
+
+def coder_prompt_variant(techstack: str) -> str:
+    """Names the coder system prompt variant used for a tech stack."""
     if "react" in techstack.lower() or "typescript" in techstack.lower():
+        return "react"
+    return "web"
+
+
+def coder_system_prompt(techstack: str) -> str:
+    if coder_prompt_variant(techstack) == "react":
         return f"""You are CODER. Write production-ready React/TypeScript code.
 
 TOOLS: list_files(), read_file(path), write_file(path, content), get_current_directory()
 
 RULES:
-1. list_files() first to see structure
-2. read_file() before editing existing files
+1. Project files, outlines and current content are provided in the request; use list_files()/read_file() only for anything missing
+2. Keep existing code that the task does not ask to change
 3. TypeScript: proper types, interfaces, no 'any'
 4. React: functional components, hooks, proper dependencies
 5. Tailwind for styling, responsive with md:/lg: breakpoints
@@ -59,8 +110,8 @@ Write full, working, production-quality code."""
 TOOLS: list_files(), read_file(path), write_file(path, content), get_current_directory()
 
 RULES:
-1. list_files() first to see structure
-2. read_file() before editing existing files
+1. Project files, outlines and current content are provided in the request; use list_files()/read_file() only for anything missing
+2. Keep existing code that the task does not ask to change
 3. For JS/CSS: match EXACT IDs/classes from HTML
 4. Complete code only - no placeholders/TODOs
 5. Modern design: Inter font, soft shadows, rounded corners, hover states, responsive
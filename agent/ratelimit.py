@@ -0,0 +1,328 @@
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from tenacity import RetryCallState
+
+# Provider quotas; 0 disables a bucket. Groq counts prompt plus completion tokens towards TPM.
+LLM_RPM = int(os.environ.get("LLM_RPM", "30"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "60000"))
+# Tokens reserved for the completion before the real usage is known
+LLM_COMPLETION_ESTIMATE = int(os.environ.get("LLM_COMPLETION_ESTIMATE", "1024"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "60.0"))
+LLM_MIN_CONCURRENCY = int(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+# Calls slower than this multiple of the running average shrink the concurrency limit
+LLM_LATENCY_BACKOFF_FACTOR = float(os.environ.get("LLM_LATENCY_BACKOFF_FACTOR", "2.0"))
+
+CHARS_PER_TOKEN = 4
+_RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError")
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously.
+
+    Callers reserve capacity up front and the balance may go negative; the caller then waits
+    until its reservation is covered. Reservations are therefore served in arrival order and
+    the bucket works from any thread or event loop.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` from the bucket and returns the seconds to wait before using it."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float):
+        """Returns over-reserved tokens (positive) or charges an under-estimate (negative)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self, seconds: float):
+        """Empties the bucket for `seconds`, e.g. after the provider answered 429."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight LLM calls.
+
+    The limit grows by roughly one per round of successful calls and is cut when the provider
+    throttles or a call is much slower than the running average latency.
+    """
+
+    def __init__(self, minimum: int, maximum: int, latency_factor: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_factor = latency_factor
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.avg_latency: Optional[float] = None
+        self._waiters: deque[asyncio.Future] = deque()
+        # Waiters a releasing call has handed its slot to, until they wake up or are cancelled
+        self._handed: set[asyncio.Future] = set()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            await waiter  # The releasing call hands its slot over
+        except asyncio.CancelledError:
+            with self._lock:
+                handed = waiter in self._handed
+                self._handed.discard(waiter)
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if handed:
+                # Cancelled after a slot was handed over: pass it on instead of keeping it
+                self.release()
+            raise
+        with self._lock:
+            self._handed.discard(waiter)
+
+    def release(self):
+        with self._lock:
+            while self._waiters and self.in_flight <= int(self.limit):
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    self._handed.add(waiter)
+                    waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                    return
+            self.in_flight -= 1
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            if self.avg_latency is not None and seconds > self.avg_latency * self.latency_factor:
+                self.limit = max(self.minimum, self.limit * 0.75)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.avg_latency = seconds if self.avg_latency is None else 0.9 * self.avg_latency + 0.1 * seconds
+
+    def record_throttled(self):
+        with self._lock:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying; bad requests are not."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in _RETRYABLE_ERRORS
+
+
+def _retry_after(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateLimiter:
+    """Process-wide request and token budgets plus adaptive concurrency for every LLM call."""
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM, min_concurrency: int = LLM_MIN_CONCURRENCY,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, latency_factor: float = LLM_LATENCY_BACKOFF_FACTOR):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(min_concurrency, max_concurrency, latency_factor)
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's retry-after."""
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+        return max(delay, _retry_after(error))
+
+    def throttled(self, error: BaseException, delay: float):
+        if _status_code(error) == 429:
+            self.concurrency.record_throttled()
+            self.requests.drain(delay)
+
+
+llm_limiter = RateLimiter()
+
+
+def count_tokens(text: str) -> int:
+    """Token estimate for a text; the rate limiter and the coder context budget both use it."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(messages: list[BaseMessage]) -> int:
+    return sum(count_tokens(str(m.content)) for m in messages) + LLM_COMPLETION_ESTIMATE
+
+
+def _used_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """Wraps a chat model so every call goes through the shared limiter and retry policy.
+
+    Tool binding is forwarded to the wrapper itself, so ReAct agents built on it are limited too.
+    """
+
+    inner: BaseChatModel
+    limiter: Any = None
+    max_retries: int = LLM_MAX_RETRIES
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.inner._identifying_params
+
+    @property
+    def _limiter(self) -> RateLimiter:
+        return self.limiter or llm_limiter
+
+    def bind_tools(self, tools, **kwargs):
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**getattr(bound, "kwargs", {}))
+
+    async def _admit(self, estimate: int):
+        limiter = self._limiter
+        wait = max(limiter.requests.reserve(1), limiter.tokens.reserve(estimate))
+        if wait:
+            print(f"--- RATE LIMIT: waiting {wait:.1f}s for LLM quota ---")
+            await asyncio.sleep(wait)
+        await limiter.concurrency.acquire()
+
+    def _settle(self, estimate: int, used: Optional[int], started: float):
+        self._limiter.concurrency.record_latency(time.monotonic() - started)
+        if used is not None:
+            self._limiter.tokens.adjust(estimate - used)
+
+    async def _backoff(self, attempt: int, error: Exception, run_manager):
+        """Waits before the next attempt, or re-raises once the error is final."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+        delay = self._limiter.backoff(attempt, error)
+        self._limiter.throttled(error, delay)
+        print(f"--- LLM RETRY {attempt + 1}/{self.max_retries} in {delay:.1f}s: {type(error).__name__} ---")
+        if run_manager:
+            retry_state = RetryCallState(None, None, (), {})
+            retry_state.attempt_number = attempt + 1
+            retry_state.set_exception((type(error), error, error.__traceback__))
+            await run_manager.on_retry(retry_state)
+        await asyncio.sleep(delay)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        estimate = estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self._admit(estimate)
+            started = time.monotonic()
+            try:
+                result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                self._settle(estimate, _used_tokens(result.generations[0].message), started)
+                return result
+            except Exception as e:
+                error = e
+            finally:
+                self._limiter.concurrency.release()
+            await self._backoff(attempt, error, run_manager)
+            attempt += 1
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        estimate = estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await self._admit(estimate)
+            started = time.monotonic()
+            used = None
+            yielded = False
+            try:
+                async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    used = _used_tokens(chunk.message) or used
+                    yielded = True
+                    yield chunk
+                self._settle(estimate, used, started)
+                return
+            except Exception as e:
+                if yielded:
+                    # Output already reached the caller, so the call cannot be replayed
+                    raise
+                error = e
+            finally:
+                self._limiter.concurrency.release()
+            await self._backoff(attempt, error, run_manager)
+            attempt += 1
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        estimate = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            time.sleep(max(self._limiter.requests.reserve(1), self._limiter.tokens.reserve(estimate)))
+            try:
+                result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._limiter.backoff(attempt, e))
+                continue
+            used = _used_tokens(result.generations[0].message)
+            if used is not None:
+                self._limiter.tokens.adjust(estimate - used)
+            return result
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(max(self._limiter.requests.reserve(1), self._limiter.tokens.reserve(estimate_tokens(messages))))
+        yield from self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
@@ -0,0 +1,230 @@
+import os
+import pathlib
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from agent.llm import build_llm
+from agent.metrics import registry
+
+DEFAULT_MODEL = os.environ.get("GROQ_MODEL_NAME", "openai/gpt-oss-120b")
+# Short structured outputs and docs go here; code stays on DEFAULT_MODEL
+FAST_MODEL = os.environ.get("GROQ_FAST_MODEL_NAME", "llama-3.1-8b-instant")
+# Overrides, e.g. "planner=llama-3.1-8b-instant|openai/gpt-oss-120b;.css=openai/gpt-oss-20b"
+MODEL_ROUTES = os.environ.get("MODEL_ROUTES", "")
+# Prefer a later model in a chain while the preferred one is this many times slower
+LLM_LATENCY_ROUTING = os.environ.get("LLM_LATENCY_ROUTING", "").lower() in ("1", "true", "yes")
+LLM_LATENCY_ROUTING_FACTOR = float(os.environ.get("LLM_LATENCY_ROUTING_FACTOR", "2.0"))
+
+# Set in the response metadata of streamed chunks to the model of the chain that produced them
+ROUTED_MODEL_KEY = "routed_model"
+
+DEFAULT_ROUTES = {
+    "planner": [FAST_MODEL],
+    "change_planner": [FAST_MODEL],
+    "architect": [FAST_MODEL],
+    ".md": [FAST_MODEL],
+    ".txt": [FAST_MODEL],
+    "default": [DEFAULT_MODEL],
+}
+
+
+def parse_routes(spec: str, base: Optional[dict[str, list[str]]] = None) -> dict[str, list[str]]:
+    """Parses `route=model|fallback;...` and layers it over `base`.
+
+    Every chain ends with the default model, so a failing fast model always falls back to it.
+    """
+    routes = {key: list(chain) for key, chain in (base or DEFAULT_ROUTES).items()}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        key, sep, models = entry.partition("=")
+        chain = [m.strip() for m in models.split("|") if m.strip()]
+        if not sep or not key.strip() or not chain:
+            raise ValueError(f"MODEL_ROUTES entries look like 'planner=model|fallback', got '{entry}'")
+        routes[key.strip().lower()] = chain
+    default = routes.setdefault("default", [DEFAULT_MODEL])
+    for key, chain in routes.items():
+        for model in default:
+            if model not in chain:
+                chain.append(model)
+    return routes
+
+
+class ModelLatency:
+    """Exponentially weighted average response time of each model, shared by every route."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._averages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            previous = self._averages.get(model)
+            self._averages[model] = seconds if previous is None else (1 - self.alpha) * previous + self.alpha * seconds
+
+    def get(self, model: str) -> Optional[float]:
+        with self._lock:
+            return self._averages.get(model)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {model: round(seconds, 4) for model, seconds in self._averages.items()}
+
+
+model_latency = ModelLatency()
+
+
+class RoutedChatModel(BaseChatModel):
+    """Tries a chain of models in order, falling through to the next one when a call fails.
+
+    Each model is already wrapped in the rate limiter, so a model is only abandoned once its
+    own retries are exhausted. With `latency_aware`, a model that has recently been much slower
+    than another one in the chain is tried after it.
+    """
+
+    models: list[BaseChatModel]
+    model_names: list[str]
+    latency_aware: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"models": self.model_names}
+
+    def bind_tools(self, tools, **kwargs):
+        bound = self.models[0].bind_tools(tools, **kwargs)
+        return self.bind(**getattr(bound, "kwargs", {}))
+
+    def order(self) -> list[int]:
+        """Indexes of the models in the order they are tried for the next call."""
+        order = list(range(len(self.models)))
+        if not self.latency_aware:
+            return order
+        latencies = [model_latency.get(name) for name in self.model_names]
+        known = [seconds for seconds in latencies if seconds is not None]
+        if len(known) < 2:
+            return order
+        fastest = min(known)
+        return sorted(order, key=lambda i: latencies[i] is not None and latencies[i] > fastest * LLM_LATENCY_ROUTING_FACTOR)
+
+    def _succeeded(self, idx: int, started: float):
+        seconds = time.monotonic() - started
+        model_latency.record(self.model_names[idx], seconds)
+        registry.observe("codecompanion_model_latency_seconds", seconds, "LLM response time per model",
+                         model=self.model_names[idx])
+
+    def _fell_back(self, idx: int, error: Exception):
+        name = self.model_names[idx]
+        print(f"--- MODEL FALLBACK: {name} failed ({type(error).__name__}); trying the next model ---")
+        registry.inc("codecompanion_llm_fallbacks_total", 1, "LLM calls that fell back to the next model", model=name)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        order = self.order()
+        for position, idx in enumerate(order):
+            started = time.monotonic()
+            try:
+                result = await self.models[idx]._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if position == len(order) - 1:
+                    raise
+                self._fell_back(idx, e)
+                continue
+            self._succeeded(idx, started)
+            return result
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        order = self.order()
+        for position, idx in enumerate(order):
+            started = time.monotonic()
+            yielded = False
+            try:
+                async for chunk in self.models[idx]._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    yielded = True
+                    chunk.message.response_metadata[ROUTED_MODEL_KEY] = self.model_names[idx]
+                    yield chunk
+            except Exception as e:
+                if yielded or position == len(order) - 1:
+                    raise
+                self._fell_back(idx, e)
+                continue
+            self._succeeded(idx, started)
+            return
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        order = self.order()
+        for position, idx in enumerate(order):
+            started = time.monotonic()
+            try:
+                result = self.models[idx]._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if position == len(order) - 1:
+                    raise
+                self._fell_back(idx, e)
+                continue
+            self._succeeded(idx, started)
+            return result
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        idx = self.order()[0]
+        for chunk in self.models[idx]._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunk.message.response_metadata[ROUTED_MODEL_KEY] = self.model_names[idx]
+            yield chunk
+
+
+class ModelRouter:
+    """Maps graph nodes and coder file types to model chains.
+
+    Routes are keyed by node name (`planner`, `change_planner`, `architect`) or file extension
+    (`.md`); anything else uses `default`. One client is built per model name and shared by
+    every chain that lists it.
+    """
+
+    def __init__(self, routes: dict[str, list[str]], latency_aware: bool = LLM_LATENCY_ROUTING,
+                 build: Callable[[str], BaseChatModel] = build_llm):
+        self.routes = routes
+        self.latency_aware = latency_aware
+        self._build = build
+        self._clients: dict[str, BaseChatModel] = {}
+        self._models: dict[str, RoutedChatModel] = {}
+        self._lock = threading.Lock()
+
+    def route_for_file(self, path: str) -> str:
+        suffix = pathlib.PurePosixPath(path).suffix.lower()
+        return suffix if suffix in self.routes else "default"
+
+    def chain(self, route: str) -> list[str]:
+        return self.routes.get(route) or self.routes["default"]
+
+    def primary(self, route: str) -> str:
+        """The model a route prefers; responses are cached under its name."""
+        return self.chain(route)[0]
+
+    def model(self, route: str) -> RoutedChatModel:
+        """The shared chat model for a route, built on first use."""
+        with self._lock:
+            model = self._models.get(route)
+            if model is None:
+                chain = self.chain(route)
+                for name in chain:
+                    if name not in self._clients:
+                        self._clients[name] = self._build(name)
+                model = self._models[route] = RoutedChatModel(
+                    models=[self._clients[name] for name in chain],
+                    model_names=chain,
+                    latency_aware=self.latency_aware,
+                )
+            return model
+
+
+router = ModelRouter(parse_routes(MODEL_ROUTES))
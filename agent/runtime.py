@@ -0,0 +1,118 @@
+import asyncio
+import importlib
+import os
+import threading
+import time
+from types import ModuleType
+from typing import Optional
+
+# Build the graph, model clients and coder agents in the background as soon as the server starts
+WARM_ON_STARTUP = os.environ.get("WARM_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+# Seconds before a failed warm-up is tried again by a /ready probe; a run that loads the graph retries at once
+WARM_RETRY_S = float(os.environ.get("WARM_RETRY_S", "30"))
+# Coder prompt variants compiled ahead of the first run, one agent per variant and file route
+WARM_VARIANTS = ("web", "react")
+
+
+class GraphRuntime:
+    """Loads `agent.graph` on first use instead of at import time.
+
+    Importing the graph pulls in LangGraph and LangChain, reads the model settings and compiles
+    the workflow, which takes far longer than starting the web server. Until it is loaded, the
+    static UI and the project endpoints are served without it; a failure to load is reported to
+    the run that needed it rather than stopping the process.
+    """
+
+    def __init__(self, module: str = "agent.graph"):
+        self.module = module
+        self._graph: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+        # Separate from the import lock, so asking for a warm-up never waits for an import to finish
+        self._warm_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._failed_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.load_s: Optional[float] = None
+        self.warm_s: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.warm_s is not None
+
+    def load(self) -> ModuleType:
+        """Imports the graph module once; concurrent callers wait for the same import."""
+        if self._graph is not None:
+            return self._graph
+        with self._lock:
+            if self._graph is None:
+                started = time.perf_counter()
+                try:
+                    self._graph = importlib.import_module(self.module)
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.load_s = round(time.perf_counter() - started, 3)
+                self.error = None
+                print(f"--- RUNTIME: loaded {self.module} in {self.load_s}s ---")
+        return self._graph
+
+    async def aload(self) -> ModuleType:
+        """`load` without blocking the event loop; warms the rest in the background if that has not happened yet."""
+        graph = self._graph or await asyncio.to_thread(self.load)
+        if not self.ready and WARM_ON_STARTUP:
+            self.start_warmup(retry_now=True)
+        return graph
+
+    def warm(self) -> bool:
+        """Loads the graph and builds every model client and pooled coder agent a run can ask for."""
+        started = time.perf_counter()
+        try:
+            graph = self.load()
+            routes = graph.router.routes
+            for route in routes:
+                graph.router.model(route)
+            file_routes = [route for route in routes if route.startswith(".")] + ["default"]
+            for variant in WARM_VARIANTS:
+                for route in file_routes:
+                    graph.get_coder_agent(variant, route)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self._failed_at = time.monotonic()
+            print(f"--- RUNTIME: warm-up failed: {self.error} ---")
+            return False
+        self.error = None
+        self.warm_s = round(time.perf_counter() - started, 3)
+        print(f"--- RUNTIME: warm in {self.warm_s}s ({len(WARM_VARIANTS) * len(file_routes)} coder agents) ---")
+        return True
+
+    def start_warmup(self, retry_now: bool = False):
+        """Warms the runtime on a daemon thread and returns immediately.
+
+        Does nothing once warm or while a warm-up is running. A failed warm-up is started again
+        after WARM_RETRY_S seconds, or straight away with `retry_now`.
+        """
+        if self.ready:
+            return
+        with self._warm_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not retry_now and self._failed_at is not None and time.monotonic() - self._failed_at < WARM_RETRY_S:
+                return
+            self._thread = threading.Thread(target=self.warm, name="graph-warmup", daemon=True)
+            self._thread.start()
+
+    def status(self) -> dict:
+        if self.ready:
+            state = "ready"
+        elif self._thread is not None and self._thread.is_alive():
+            state = "warming"
+        elif self.error:
+            state = "error"
+        elif self._graph is not None:
+            state = "warming"
+        else:
+            state = "cold"
+        return {"status": state, "load_s": self.load_s, "warm_s": self.warm_s, "error": self.error}
+
+
+runtime = GraphRuntime()
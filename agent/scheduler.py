@@ -0,0 +1,61 @@
+import os
+import pathlib
+import posixpath
+
+from agent.states import ImplementationTask
+
+MAX_CODER_CONCURRENCY = int(os.environ.get("CODER_MAX_CONCURRENCY", "3"))
+
+
+def _normalize(path: str) -> str:
+    """Collapses `./` and `a/../` parts without touching dot-files such as `.env`."""
+    return posixpath.normpath(path.strip())
+
+
+def _inferred_dependencies(task: ImplementationTask, earlier: list[ImplementationTask]) -> list[str]:
+    """Stylesheets and scripts need the markup they target; everything else stands alone."""
+    suffix = pathlib.PurePosixPath(task.filepath).suffix.lower()
+    if suffix in (".css", ".js", ".jsx", ".ts", ".tsx"):
+        return [t.filepath for t in earlier if t.filepath.lower().endswith((".html", ".htm"))]
+    return []
+
+
+def resolve_dependencies(steps: list[ImplementationTask]) -> list[set[int]]:
+    """Map every step to the indexes of the steps that must finish before it starts.
+
+    Only edges pointing at earlier steps are kept, so the result is always acyclic.
+    Repeated steps on the same file are chained in their original order.
+    """
+    deps: list[set[int]] = []
+    last_index_for_path: dict[str, int] = {}
+
+    for idx, task in enumerate(steps):
+        earlier = steps[:idx]
+        wanted = task.depends_on if task.depends_on is not None else _inferred_dependencies(task, earlier)
+
+        step_deps = set()
+        for dep_path in wanted:
+            dep_idx = last_index_for_path.get(_normalize(dep_path))
+            if dep_idx is not None:
+                step_deps.add(dep_idx)
+
+        own_path = _normalize(task.filepath)
+        if own_path in last_index_for_path:
+            step_deps.add(last_index_for_path[own_path])
+
+        deps.append(step_deps)
+        last_index_for_path[own_path] = idx
+
+    return deps
+
+
+def ready_steps(deps: list[set[int]], completed: list[int], failed: list[int] = (),
+                limit: int = MAX_CODER_CONCURRENCY) -> list[int]:
+    """Returns up to `limit` pending steps whose dependencies have all completed.
+
+    Failed steps are not retried, and steps depending on them never become ready.
+    """
+    done = set(completed)
+    skip = done | set(failed)
+    ready = [idx for idx, step_deps in enumerate(deps) if idx not in skip and step_deps <= done]
+    return ready[:max(1, limit)]
@@ -0,0 +1,206 @@
+import argparse
+import json
+import math
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from pydantic import BaseModel
+
+from agent.storage import data_path
+
+PROJECTS_DIR = pathlib.Path("projects")
+# Written into each finished project so the index can be rebuilt from disk alone
+PLAN_FILENAME = ".plan.json"
+# Prompts at least this similar reuse the stored plan and task plan without any LLM call
+PLAN_REUSE_THRESHOLD = float(os.environ.get("PLAN_REUSE_THRESHOLD", "0.9"))
+# Prompts at least this similar pass the stored plan to the planner as an example
+PLAN_HINT_THRESHOLD = float(os.environ.get("PLAN_HINT_THRESHOLD", "0.45"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Request boilerplate says nothing about which app is wanted
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "with", "that", "this", "it", "is", "be",
+    "me", "my", "i", "you", "can", "please", "using", "use", "build", "create", "make", "generate", "write",
+    "develop", "implement", "app", "application", "web", "website", "simple", "basic", "html", "css",
+    "javascript", "js",
+}
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Stemmed content words plus adjacent word pairs, so "todo list" and "list todo" differ slightly."""
+    words = [_stem(w) for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class PlanMatch(BaseModel):
+    folder: str
+    prompt: str
+    score: float
+    plan: dict
+    task_plan: dict
+
+
+class PlanIndex:
+    """TF-IDF index over the prompts of finished projects and the plans they were built from.
+
+    Plans are stored in SQLite and mirrored to `.plan.json` in each project; the vectors are
+    kept in memory and rebuilt whenever a plan is added, which is cheap for thousands of prompts.
+    """
+
+    def __init__(self, path: str, projects_dir: pathlib.Path = PROJECTS_DIR):
+        self.path = str(path)
+        self.projects_dir = pathlib.Path(projects_dir)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._rows: Optional[list[dict]] = None
+        self._postings: dict[str, list[tuple[int, float]]] = {}
+        self._idf: dict[str, float] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS plans (
+                    folder TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    plan TEXT NOT NULL,
+                    task_plan TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def _vectorize(self):
+        """Recomputes idf weights and the normalized document vectors; called with the lock held."""
+        if self._rows is None:
+            self._rows = [
+                {"folder": folder, "prompt": prompt}
+                for folder, prompt in self._connection().execute("SELECT folder, prompt FROM plans ORDER BY created")
+            ]
+        counts = [Counter(tokenize(row["prompt"])) for row in self._rows]
+        df = Counter(term for tf in counts for term in tf)
+        n = len(counts)
+        self._idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+        self._postings = {}
+        for doc, tf in enumerate(counts):
+            weights = {term: count * self._idf[term] for term, count in tf.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                self._postings.setdefault(term, []).append((doc, weight / norm))
+
+    def add(self, project_path: str, prompt: str, plan: dict, task_plan: dict):
+        """Stores the plans of a finished project and makes its prompt searchable."""
+        root = pathlib.Path(project_path)
+        record = {"prompt": prompt, "plan": plan, "task_plan": task_plan}
+        if root.is_dir():
+            (root / PLAN_FILENAME).write_text(json.dumps(record, indent=1), encoding="utf-8")
+        self._store(root.name, record, time.time())
+
+    def _store(self, folder: str, record: dict, created: float):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO plans(folder, prompt, plan, task_plan, created) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(folder) DO UPDATE SET prompt = excluded.prompt, plan = excluded.plan, "
+                "task_plan = excluded.task_plan",
+                (folder, record["prompt"], json.dumps(record["plan"]), json.dumps(record["task_plan"]), created),
+            )
+            conn.commit()
+            self._rows = None
+            self._postings = {}
+
+    def rebuild(self) -> int:
+        """Recreates the index from the `.plan.json` files of the projects on disk."""
+        with self._lock:
+            self._connection().execute("DELETE FROM plans")
+            self._connection().commit()
+            self._rows = None
+        found = 0
+        if self.projects_dir.is_dir():
+            for plan_file in self.projects_dir.glob(f"*/{PLAN_FILENAME}"):
+                try:
+                    record = json.loads(plan_file.read_text(encoding="utf-8"))
+                    self._store(plan_file.parent.name, record, plan_file.stat().st_mtime)
+                    found += 1
+                except (OSError, ValueError, KeyError):
+                    continue
+        return found
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+    def search(self, prompt: str, limit: int = 3) -> list[tuple[str, float]]:
+        """The most similar stored prompts as (folder, cosine similarity), best first."""
+        with self._lock:
+            if self._rows is None or not self._postings:
+                self._vectorize()
+            # Terms no stored prompt contains still count towards the query norm, with the highest idf
+            unseen = math.log(1 + len(self._rows)) + 1
+            tf = Counter(tokenize(prompt))
+            weights = {term: count * self._idf.get(term, unseen) for term, count in tf.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            if not norm:
+                return []
+            scores: dict[int, float] = {}
+            for term, weight in weights.items():
+                for doc, doc_weight in self._postings.get(term, ()):
+                    scores[doc] = scores.get(doc, 0.0) + weight / norm * doc_weight
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(self._rows[doc]["folder"], round(score, 4)) for doc, score in best]
+
+    def get(self, folder: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT prompt, plan, task_plan FROM plans WHERE folder = ?", (folder,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"prompt": row[0], "plan": json.loads(row[1]), "task_plan": json.loads(row[2])}
+
+    def best_match(self, prompt: str, threshold: float = PLAN_HINT_THRESHOLD) -> Optional[PlanMatch]:
+        """The closest past project if it is at least `threshold` similar, else None."""
+        for folder, score in self.search(prompt, limit=1):
+            if score >= threshold:
+                record = self.get(folder)
+                if record is not None:
+                    return PlanMatch(folder=folder, score=score, **record)
+        return None
+
+
+def plan_hint(plan: dict) -> str:
+    """Compact rendering of a past plan for the planner prompt."""
+    return json.dumps(
+        {key: plan[key] for key in ("name", "techstack", "features", "files") if key in plan},
+        separators=(",", ":"),
+    )
+
+
+plan_index = PlanIndex(os.environ.get("PLAN_INDEX_PATH") or data_path("plans.sqlite3"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, query or rebuild the plan similarity index")
+    parser.add_argument("--rebuild", action="store_true", help="Recreate the index from projects/*/.plan.json")
+    parser.add_argument("--query", metavar="PROMPT", help="Show the past prompts most similar to PROMPT")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Indexed {plan_index.rebuild()} plan(s) from {PROJECTS_DIR}/")
+    elif args.query:
+        for folder, score in plan_index.search(args.query, limit=5):
+            print(f"{score:.3f}  {folder}  {plan_index.get(folder)['prompt']!r}")
+    else:
+        print(json.dumps({"path": plan_index.path, "plans": plan_index.count()}, indent=2))
@@ -19,6 +19,7 @@ class Plan(BaseModel):
 class ImplementationTask(BaseModel):
     filepath: str = Field(description="The path to the file to be modified")
     task_description: str = Field(description="A detailed description of the task to be performed on the file, e.g. 'add user authentication', 'implement data processing logic', etc.")
+    depends_on: Optional[list[str]] = Field(None, description="Filepaths of other steps that must be written before this one; inferred from file types when omitted")
 
 
 class TaskPlan(BaseModel):
@@ -26,15 +27,54 @@ class TaskPlan(BaseModel):
     model_config = ConfigDict(extra="allow")
 
 
+class ChangePlan(BaseModel):
+    techstack: str = Field(description="The tech stack the existing project is written in")
+    implementation_steps: list[ImplementationTask] = Field(description="Only the files that must change or be created for the requested edit")
+    model_config = ConfigDict(extra="allow")
+
+
 class CoderState(BaseModel):
     task_plan: TaskPlan = Field(description="The plan for the task to be implemented")
-    current_step_idx: int = Field(0, description="The index of the current step in the implementation steps")
+    current_step_idx: int = Field(0, description="The number of implementation steps completed so far")
+    completed_steps: list[int] = Field(default_factory=list, description="Indexes of the implementation steps that have been completed")
+    last_completed: list[int] = Field(default_factory=list, description="Indexes of the steps completed by the most recent coder pass")
+    failed_steps: list[int] = Field(default_factory=list, description="Indexes of the steps whose coder run raised an error")
+    context_tokens_saved: dict[str, int] = Field(default_factory=dict, description="Prompt tokens saved per file by token-budgeted context packing")
     current_file_content: Optional[str] = Field(None, description="The content of the file currently being edited or created")
 
+class ValidationReport(BaseModel):
+    errors: dict[str, list[str]] = Field(default_factory=dict, description="Problems found by the local checks, by file")
+    related: dict[str, list[str]] = Field(default_factory=dict, description="Other files involved in each failing file's problems")
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def add(self, path: str, error: str, related: Optional[list[str]] = None):
+        self.errors.setdefault(path, []).append(error)
+        if related:
+            merged = self.related.setdefault(path, [])
+            merged.extend(r for r in related if r != path and r not in merged)
+
+    def without(self, baseline: "ValidationReport") -> "ValidationReport":
+        """The problems that are not already in `baseline`."""
+        report = ValidationReport()
+        for path, errors in self.errors.items():
+            for error in errors:
+                if error not in baseline.errors.get(path, []):
+                    report.add(path, error, self.related.get(path))
+        return report
+
+
 class GraphState(BaseModel):
-    user_prompt: str = Field(description="The initial user prompt")
+    user_prompt: str = Field(description="The initial user prompt, or the requested change in edit mode")
+    mode: str = Field("create", description="'create' builds a new project; 'edit' changes the existing project at project_path")
     plan: Optional[Plan] = Field(None, description="The project plan generated by the planner")
+    plan_source: Optional[str] = Field(None, description="Folder of the past project whose plan and task plan were reused")
     project_path: Optional[str] = Field(None, description="The root directory for the generated project")
     task_plan: Optional[TaskPlan] = Field(None, description="The detailed task plan from the architect")
     coder_state: Optional[CoderState] = Field(None, description="The current state of the coder agent")
-    status: Optional[str] = Field(None, description="The current status of the coding process, e.g., 'DONE'")
\ No newline at end of file
+    status: Optional[str] = Field(None, description="The current status of the coding process: 'IN_PROGRESS', 'VALIDATING', 'REPAIRING', 'DONE' or 'FAILED'")
+    validation: Optional[ValidationReport] = Field(None, description="The latest result of the post-coding checks")
+    validation_baseline: Optional[ValidationReport] = Field(None, description="Problems an edited project already had before the edit; these are not repaired")
+    repair_round: int = Field(0, description="How many targeted repair passes have run after validation")
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import pathlib
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, TypeVar
+
+DATA_DIR = pathlib.Path(os.environ.get("CODECOMPANION_DATA_DIR", ".codecompanion"))
+
+T = TypeVar("T")
+
+
+def data_path(name: str) -> pathlib.Path:
+    """Returns a path inside the local data directory, creating the directory on first use."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return DATA_DIR / name
+
+
+def safe_path_for_project(root: pathlib.Path, path: str) -> pathlib.Path:
+    p = (root / path).resolve()
+    if root.resolve() not in p.parents and root.resolve() != p:
+        raise ValueError("Attempt to access files outside the project root")
+    return p
+
+
+class RootCache(Generic[T]):
+    """Shared per-project-root instances, evicted least recently used first.
+
+    Instances pinned by a running step, or for which `busy` returns True, are never evicted, so
+    every user of a root gets the same instance and no two instances write the same metadata file.
+    """
+
+    def __init__(self, factory: Callable[[pathlib.Path], T], max_size: int,
+                 busy: Callable[[T], bool] | None = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.busy = busy
+        self._items: OrderedDict[str, T] = OrderedDict()
+        self._pins: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> T:
+        """Looks up or creates the instance for a resolved root; called with `_lock` held."""
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+            return item
+        if len(self._items) >= self.max_size:
+            idle = next((k for k, i in self._items.items()
+                         if not self._pins[k] and not (self.busy and self.busy(i))), None)
+            if idle is not None:
+                self._items.pop(idle)
+        item = self._items[key] = self.factory(pathlib.Path(key))
+        return item
+
+    def get(self, root: str | pathlib.Path) -> T:
+        with self._lock:
+            return self._get(str(pathlib.Path(root).resolve()))
+
+    @contextmanager
+    def pinned(self, root: str | pathlib.Path) -> Iterator[T]:
+        """The instance for a root, kept in the cache for as long as the block runs."""
+        key = str(pathlib.Path(root).resolve())
+        with self._lock:
+            item = self._get(key)
+            self._pins[key] += 1
+        try:
+            yield item
+        finally:
+            with self._lock:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import pathlib
+import re
+import threading
+
+from agent.manifest import project_manifest
+from agent.storage import RootCache
+
+INDEX_FILENAME = ".symbols.json"
+MARKUP_EXTENSIONS = (".html", ".htm")
+STYLE_EXTENSIONS = (".css",)
+SCRIPT_EXTENSIONS = (".js", ".mjs", ".jsx", ".ts", ".tsx")
+
+_ATTR_VALUE = r'\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>"\'`]+))'
+_ID_ATTR = re.compile(r'(?<![\w-])id' + _ATTR_VALUE, re.IGNORECASE)
+# `className` is how JSX spells the class attribute
+_CLASS_ATTR = re.compile(r'(?<![\w-])class(?:Name)?' + _ATTR_VALUE, re.IGNORECASE)
+_REFERENCE_ATTR = re.compile(r'(?<![\w-])(?:href|src)' + _ATTR_VALUE, re.IGNORECASE)
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_PRELUDE = re.compile(r"([^{}]+)\{")
+_SELECTOR_ID = re.compile(r"#(-?[A-Za-z_][\w-]*)")
+_SELECTOR_CLASS = re.compile(r"\.(-?[A-Za-z_][\w-]*)")
+
+_JS_STRING = r"""['"`]([^'"`]+)['"`]"""
+_JS_GET_BY_ID = re.compile(r"getElementById\(\s*" + _JS_STRING)
+_JS_QUERY = re.compile(r"querySelector(?:All)?\(\s*" + _JS_STRING)
+_JS_GET_BY_CLASS = re.compile(r"getElementsByClassName\(\s*" + _JS_STRING)
+_JS_CLASS_LIST = re.compile(r"classList\.(?:add|remove|toggle|contains|replace)\(([^)]*)\)")
+_JS_CLASS_NAME = re.compile(r"\.className\s*=\s*" + _JS_STRING)
+_JS_ID_PROPERTY = re.compile(r"\.id\s*=\s*" + _JS_STRING)
+_JS_SET_ATTRIBUTE = re.compile(r"""setAttribute\(\s*['"](id|class)['"]\s*,\s*""" + _JS_STRING)
+_JS_LITERAL = re.compile(r"""['"`]([^'"`]*)['"`]""")
+_JS_FUNCTION = re.compile(r"(export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*\(")
+_JS_ARROW = re.compile(
+    r"(export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"
+)
+_JS_EXPORT_LIST = re.compile(r"export\s*\{([^}]*)\}")
+
+
+def _attr_values(pattern: re.Pattern, text: str) -> list[str]:
+    return [next(group for group in match.groups() if group is not None) for match in pattern.finditer(text)]
+
+
+def _classes_from_attrs(text: str) -> set[str]:
+    classes = set()
+    for value in _attr_values(_CLASS_ATTR, text):
+        # Template placeholders such as ${state} and JSX expressions such as {styles.x} are not real class names
+        classes.update(c for c in value.split() if "{" not in c and "}" not in c)
+    return classes
+
+
+def _parse_markup(text: str) -> dict:
+    references = [
+        ref for ref in _attr_values(_REFERENCE_ATTR, text)
+        if ref and not re.match(r"^(?:[a-z]+:|//|#)", ref, re.IGNORECASE)
+    ]
+    return {
+        "ids": sorted(set(_attr_values(_ID_ATTR, text))),
+        "classes": sorted(_classes_from_attrs(text)),
+        "references": sorted(set(references)),
+    }
+
+
+def _parse_style(text: str) -> dict:
+    ids, classes = set(), set()
+    for prelude in _CSS_PRELUDE.findall(_CSS_COMMENT.sub("", text)):
+        prelude = prelude.strip()
+        if not prelude or prelude.startswith("@"):
+            continue
+        # Drop attribute selectors and url() so their contents are not read as ids/classes
+        prelude = re.sub(r"\[[^\]]*\]|\([^)]*\)", "", prelude)
+        ids.update(_SELECTOR_ID.findall(prelude))
+        classes.update(_SELECTOR_CLASS.findall(prelude))
+    return {"ids": sorted(ids), "classes": sorted(classes)}
+
+
+def _parse_script(text: str) -> dict:
+    ids_used = set(_JS_GET_BY_ID.findall(text))
+    classes_used = set()
+    for selector in _JS_QUERY.findall(text):
+        ids_used.update(_SELECTOR_ID.findall(selector))
+        classes_used.update(_SELECTOR_CLASS.findall(selector))
+    for names in _JS_GET_BY_CLASS.findall(text):
+        classes_used.update(names.split())
+
+    # Elements the script creates itself: properties, setAttribute and markup in template strings
+    ids_created = set(_JS_ID_PROPERTY.findall(text)) | set(_attr_values(_ID_ATTR, text))
+    classes_created = _classes_from_attrs(text)
+    for args in _JS_CLASS_LIST.findall(text):
+        classes_created.update(c for literal in _JS_LITERAL.findall(args) for c in literal.split())
+    for value in _JS_CLASS_NAME.findall(text):
+        classes_created.update(value.split())
+    for attr, value in _JS_SET_ATTRIBUTE.findall(text):
+        if attr == "id":
+            ids_created.add(value)
+        else:
+            classes_created.update(value.split())
+
+    functions, exports = set(), set()
+    for pattern in (_JS_FUNCTION, _JS_ARROW):
+        for exported, name in pattern.findall(text):
+            functions.add(name)
+            if exported:
+                exports.add(name)
+    for names in _JS_EXPORT_LIST.findall(text):
+        exports.update(n.split(" as ")[-1].strip() for n in names.split(",") if n.strip())
+
+    ids_created = {i for i in ids_created if "${" not in i}
+    return {
+        "ids_used": sorted(ids_used),
+        "classes_used": sorted(classes_used),
+        "ids_created": sorted(ids_created),
+        "classes_created": sorted(classes_created),
+        "functions": sorted(functions),
+        "exports": sorted(exports),
+    }
+
+
+def parse_symbols(path: str, content: str) -> dict | None:
+    """Extracts the selector and function symbols of a single file, or None for other file types."""
+    suffix = pathlib.PurePosixPath(path).suffix.lower()
+    if suffix in MARKUP_EXTENSIONS:
+        symbols = _parse_markup(content)
+        kind = "markup"
+    elif suffix in STYLE_EXTENSIONS:
+        symbols = _parse_style(content)
+        kind = "style"
+    elif suffix in SCRIPT_EXTENSIONS:
+        symbols = _parse_script(content)
+        kind = "script"
+    else:
+        return None
+    return {"kind": kind, "hash": hashlib.sha256(content.encode("utf-8")).hexdigest(), **symbols}
+
+
+def _format(label: str, values: list[str]) -> str | None:
+    return f"{label} [{', '.join(values)}]" if values else None
+
+
+class SymbolIndex:
+    """Per-project index of HTML ids/classes, CSS selectors and JS selector usage and functions.
+
+    The index is persisted to `.symbols.json` in the project root and updated one file at a
+    time as the coder writes, so reading it never requires rescanning the project. Each entry
+    keeps the size and mtime it was parsed at; on load, files changed or added since (as the
+    manifest lists them) are parsed again and deleted ones are dropped.
+    """
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root
+        self.path = root / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self.files: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                self.files = json.loads(self.path.read_text(encoding="utf-8"))["files"]
+                self._refresh()
+                return
+            except (ValueError, KeyError, OSError):
+                pass
+        self.rebuild()
+
+    def _parse_file(self, rel: str) -> dict | None:
+        """Symbols of a file on disk with the size and mtime they were parsed at; None if unreadable or not indexed."""
+        path = self.root / rel
+        try:
+            stat = path.stat()
+            symbols = parse_symbols(rel, path.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError):
+            return None
+        if symbols is not None:
+            symbols.update(size=stat.st_size, mtime=stat.st_mtime)
+        return symbols
+
+    def _refresh(self):
+        """Brings a loaded index up to date with files changed, added or deleted outside the file tools."""
+        paths = set(self.files) | {entry["path"] for entry in project_manifest(self.root).entries()}
+        changed = False
+        for rel in sorted(paths):
+            entry = self.files.get(rel)
+            try:
+                stat = (self.root / rel).stat()
+            except OSError:
+                stat = None
+            if entry is not None and stat is not None and (entry.get("size"), entry.get("mtime")) == (stat.st_size, stat.st_mtime):
+                continue
+            symbols = self._parse_file(rel) if stat is not None else None
+            if symbols is None:
+                changed |= self.files.pop(rel, None) is not None
+            else:
+                self.files[rel] = symbols
+                changed = True
+        if changed:
+            with self._lock:
+                self._save()
+
+    def rebuild(self):
+        """Scans the whole project once; used when no index has been written yet."""
+        files = {}
+        if self.root.is_dir():
+            for f in self.root.glob("**/*"):
+                if f.is_file() and not f.name.startswith("."):
+                    rel = f.relative_to(self.root).as_posix()
+                    symbols = self._parse_file(rel)
+                    if symbols is not None:
+                        files[rel] = symbols
+        with self._lock:
+            self.files = files
+            self._save()
+
+    def _save(self):
+        if not self.root.is_dir():
+            return
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"files": self.files}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def update(self, path: str, content: str):
+        """Re-indexes a single file after it has been written."""
+        symbols = parse_symbols(path, content)
+        if symbols is None:
+            return
+        rel = pathlib.PurePosixPath(path).as_posix()
+        try:
+            stat = (self.root / rel).stat()
+            symbols.update(size=stat.st_size, mtime=stat.st_mtime)
+        except OSError:
+            pass
+        with self._lock:
+            if self.files.get(rel) == symbols:
+                return
+            self.files[rel] = symbols
+            self._save()
+
+    def defined_ids(self) -> set[str]:
+        ids = set()
+        for symbols in self.files.values():
+            ids.update(symbols.get("ids", []) if symbols["kind"] == "markup" else symbols.get("ids_created", []))
+        return ids
+
+    def defined_classes(self) -> set[str]:
+        classes = set()
+        for symbols in self.files.values():
+            if symbols["kind"] == "markup":
+                classes.update(symbols.get("classes", []))
+            elif symbols["kind"] == "script":
+                classes.update(symbols.get("classes_created", []))
+        return classes
+
+    def outline(self, path: str) -> str | None:
+        """One-line summary of the symbols a file defines and uses."""
+        symbols = self.files.get(pathlib.PurePosixPath(path).as_posix())
+        if not symbols:
+            return None
+        if symbols["kind"] == "markup":
+            parts = [_format("ids", symbols["ids"]), _format("classes", symbols["classes"])]
+        elif symbols["kind"] == "style":
+            parts = [_format("styles ids", symbols["ids"]), _format("styles classes", symbols["classes"])]
+        else:
+            parts = [
+                _format("uses ids", symbols["ids_used"]),
+                _format("uses classes", symbols["classes_used"]),
+                _format("creates ids", symbols["ids_created"]),
+                _format("creates classes", symbols["classes_created"]),
+                _format("functions", symbols["functions"]),
+            ]
+        parts = [p for p in parts if p]
+        return f"{path}: " + "; ".join(parts) if parts else None
+
+    def context_block(self, target: str) -> str:
+        """Compact description of every other indexed file, for injection into a coder prompt."""
+        target = pathlib.PurePosixPath(target).as_posix()
+        with self._lock:
+            lines = [self.outline(path) for path in sorted(self.files) if path != target]
+        lines = [line for line in lines if line]
+        if not lines:
+            return ""
+        return (
+            "\n\n[CONTEXT INJECTION] \n"
+            "To ensure consistency, use these EXACT selectors and names from the other project files:\n"
+            + "\n".join(lines)
+            + "\nDo NOT invent new IDs or classes for elements defined elsewhere."
+        )
+
+
+MAX_CACHED_INDEXES = 256
+_indexes: RootCache[SymbolIndex] = RootCache(SymbolIndex, MAX_CACHED_INDEXES)
+
+
+def symbol_index(root: str | pathlib.Path) -> SymbolIndex:
+    """Returns the shared symbol index for a project root, loading or building it on first use."""
+    return _indexes.get(root)
+
+
+def pinned_symbol_index(root: str | pathlib.Path):
+    """The shared symbol index for a project root, never evicted while the `with` block runs."""
+    return _indexes.pinned(root)
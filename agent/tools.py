@@ -2,26 +2,33 @@ import pathlib
 import subprocess
 from typing import Tuple
 
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
-PROJECT_ROOT = pathlib.Path.cwd() / "generated_project"
+from agent.overlay import WorkspaceOverlay, workspace_overlay
+from agent.storage import safe_path_for_project
 
 
-def set_project_root(path: str):
-    global PROJECT_ROOT
-    PROJECT_ROOT = pathlib.Path(path)
-    PROJECT_ROOT.mkdir(parents=True, exist_ok=True)
+def project_config(project_root: str, **configurable) -> RunnableConfig:
+    """Builds the per-run config that binds the file tools to a workspace."""
+    return {"configurable": {"project_root": str(project_root), **configurable}}
 
 
-def safe_path_for_project(path: str) -> pathlib.Path:
-    p = (PROJECT_ROOT / path).resolve()
-    if PROJECT_ROOT.resolve() not in p.parents and PROJECT_ROOT.resolve() != p:
-        raise ValueError("Attempt to access files outside the project root")
-    return p
+def project_root_from_config(config: RunnableConfig) -> pathlib.Path:
+    root = (config or {}).get("configurable", {}).get("project_root")
+    if not root:
+        raise ValueError("No project_root configured for this run")
+    return pathlib.Path(root)
+
+
+def overlay_from_config(config: RunnableConfig) -> WorkspaceOverlay:
+    """The overlay a coder step pinned for its tools, else the shared one for the project root."""
+    overlay = (config or {}).get("configurable", {}).get("overlay")
+    return overlay if overlay is not None else workspace_overlay(project_root_from_config(config))
 
 
 @tool
-def write_file(path: str, content: str) -> str:
+def write_file(path: str, content: str, config: RunnableConfig) -> str:
     """Write content to a file at the specified path within the project directory.
 
     Args:
@@ -31,15 +38,20 @@ def write_file(path: str, content: str) -> str:
     Returns:
         Confirmation message with the file path
     """
-    p = safe_path_for_project(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w", encoding="utf-8") as f:
-        f.write(content)
+    root = project_root_from_config(config)
+    p = safe_path_for_project(root, path)
+    relpath = p.relative_to(root.resolve()).as_posix()
+    configurable = (config or {}).get("configurable", {})
+    overlay = overlay_from_config(config)
+    step, run_id = configurable.get("step"), configurable.get("run_id")
+    # Inside a coder step the write lands on disk when the step commits; otherwise right away
+    if overlay.write(relpath, content, step, run_id) and step is None:
+        overlay.commit(None, run_id)
     return f"WROTE:{p}"
 
 
 @tool
-def read_file(path: str) -> str:
+def read_file(path: str, config: RunnableConfig) -> str:
     """Read and return the content of a file at the specified path.
 
     Args:
@@ -48,40 +60,40 @@ def read_file(path: str) -> str:
     Returns:
         The content of the file, or empty string if file doesn't exist
     """
-    p = safe_path_for_project(path)
-    if not p.exists():
-        return ""
-    with open(p, "r", encoding="utf-8") as f:
-        return f.read()
+    root = project_root_from_config(config)
+    p = safe_path_for_project(root, path)
+    run_id = (config or {}).get("configurable", {}).get("run_id")
+    content = overlay_from_config(config).read(p.relative_to(root.resolve()).as_posix(), run_id)
+    return content if content is not None else ""
 
 
 @tool
-def get_current_directory() -> str:
+def get_current_directory(config: RunnableConfig) -> str:
     """Get the current project root directory path.
 
     Returns:
         The absolute path to the project root directory
     """
-    return str(PROJECT_ROOT)
+    return str(project_root_from_config(config))
 
 
 @tool
-def list_files() -> str:
+def list_files(config: RunnableConfig) -> str:
     """List all files in the project directory recursively.
 
     Returns:
         A newline-separated list of all file paths relative to the project root
     """
-    p = PROJECT_ROOT
+    p = project_root_from_config(config)
     if not p.is_dir():
         return f"ERROR: Project directory '{p}' does not exist."
 
-    files = [str(f.relative_to(p)) for f in p.glob("**/*") if f.is_file()]
+    files = overlay_from_config(config).paths((config or {}).get("configurable", {}).get("run_id"))
     return "\n".join(files) if files else "The project directory is empty."
 
 
 @tool
-def run_cmd(cmd: str, cwd: str = None, timeout: int = 30) -> Tuple[int, str, str]:
+def run_cmd(cmd: str, config: RunnableConfig, cwd: str = None, timeout: int = 30) -> Tuple[int, str, str]:
     """Execute a shell command in the project directory.
 
     Args:
@@ -92,11 +104,8 @@ def run_cmd(cmd: str, cwd: str = None, timeout: int = 30) -> Tuple[int, str, str
     Returns:
         A tuple of (return_code, stdout, stderr)
     """
-    cwd_dir = safe_path_for_project(cwd) if cwd else PROJECT_ROOT
+    root = project_root_from_config(config)
+    cwd_dir = safe_path_for_project(root, cwd) if cwd else root
     res = subprocess.run(cmd, shell=True, cwd=str(cwd_dir), capture_output=True, text=True, timeout=timeout)
     return res.returncode, res.stdout, res.stderr
 
-
-def init_project_root():
-    PROJECT_ROOT.mkdir(parents=True, exist_ok=True)
-    return str(PROJECT_ROOT)
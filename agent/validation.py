@@ -0,0 +1,235 @@
+import json
+import pathlib
+import posixpath
+import re
+import shutil
+import subprocess
+
+from agent.manifest import project_manifest
+from agent.states import ValidationReport
+from agent.symbols import MARKUP_EXTENSIONS, SCRIPT_EXTENSIONS, STYLE_EXTENSIONS, symbol_index
+
+NODE_CHECK_TIMEOUT = 10
+# Only references to files the coder writes are checked; missing images or fonts are not repairable
+_CHECKED_REFERENCES = MARKUP_EXTENSIONS + STYLE_EXTENSIONS + SCRIPT_EXTENSIONS + (".json",)
+_NODE_CHECKED = (".js", ".mjs", ".cjs")
+# JSX tags such as `</div>` read as regex literals to the bracket scanner, so those files are not scanned
+_SCANNED = _NODE_CHECKED + (".ts",)
+
+_JS_IMPORT = re.compile(
+    r"""(?:\bimport\s*(?:[^'"`;()]*?\bfrom\s*)?|\bimport\s*\(\s*|\bimportScripts\(\s*|\brequire\(\s*)['"]([^'"]+)['"]"""
+)
+_CSS_IMPORT = re.compile(r"""@import\s+(?:url\(\s*)?['"]?([^'")\s;]+)""")
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+_CLOSERS = {")": "(", "]": "[", "}": "{"}
+
+
+def _resolve(source: str, reference: str) -> str:
+    """Project-relative path of a reference made from `source`, without query or fragment."""
+    reference = re.split(r"[?#]", reference, maxsplit=1)[0]
+    if reference.startswith("/"):
+        return posixpath.normpath(reference.lstrip("/"))
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), reference))
+
+
+def _scan_js(text: str) -> str | None:
+    """Balances brackets, strings, comments and template literals; a stand-in when node is unavailable."""
+    stack: list[tuple[str, int]] = []
+    i, line, n = 0, 1, len(text)
+    last, word = "", ""
+    while i < n:
+        c = text[i]
+        if stack and stack[-1][0] == "`":
+            # Inside template literal text
+            if c == "\\":
+                i += 2
+                continue
+            if c == "\n":
+                line += 1
+            elif c == "`":
+                stack.pop()
+                last = "a"
+            elif text.startswith("${", i):
+                stack.append(("${", line))
+                last = "{"
+                i += 2
+                continue
+            i += 1
+            continue
+        if c == "\n":
+            line += 1
+            i += 1
+            continue
+        if c.isspace():
+            i += 1
+            continue
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                return f"line {line}: unterminated block comment"
+            line += text.count("\n", i, end)
+            i = end + 2
+            continue
+        if c in "'\"":
+            j = i + 1
+            while j < n and text[j] != c:
+                if text[j] == "\n":
+                    return f"line {line}: unterminated string literal"
+                j += 2 if text[j] == "\\" else 1
+            if j >= n:
+                return f"line {line}: unterminated string literal"
+            i, last = j + 1, "a"
+            continue
+        if c == "`":
+            stack.append(("`", line))
+            i += 1
+            continue
+        if c == "/" and (not last or last in _REGEX_PRECEDERS or word in _REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and (text[j] != "/" or in_class):
+                if text[j] == "\n":
+                    return f"line {line}: unterminated regular expression"
+                if text[j] == "\\":
+                    j += 1
+                elif text[j] == "[":
+                    in_class = True
+                elif text[j] == "]":
+                    in_class = False
+                j += 1
+            i, last, word = j + 1, "a", ""
+            continue
+        if c.isalnum() or c in "_$":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "_$"):
+                j += 1
+            word, last, i = text[i:j], "a", j
+            continue
+        if c in "([{":
+            stack.append((c, line))
+        elif c in _CLOSERS:
+            if not stack:
+                return f"line {line}: unexpected '{c}'"
+            opener, opened = stack.pop()
+            if opener == "${" and c == "}":
+                pass
+            elif opener != _CLOSERS[c]:
+                return f"line {line}: '{c}' does not match '{opener}' opened on line {opened}"
+        last, word = c, ""
+        i += 1
+    if stack:
+        opener, opened = stack[-1]
+        return f"line {opened}: '{opener}' is never closed"
+    return None
+
+
+def check_script_syntax(root: pathlib.Path, path: str) -> str | None:
+    """Parses a script with `node --check` when node is installed, else with the bracket scanner.
+
+    JSX and TSX files are left unchecked: node cannot parse them and the scanner would misread them.
+    """
+    target = root / path
+    node = shutil.which("node")
+    if node and target.suffix.lower() in _NODE_CHECKED:
+        try:
+            result = subprocess.run(
+                [node, "--check", path], cwd=root, capture_output=True, text=True, timeout=NODE_CHECK_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            result = None
+        if result is not None:
+            if result.returncode == 0:
+                return None
+            lines = result.stderr.strip().splitlines()
+            location = lines[0].rsplit(":", 1)[-1] if lines else "?"
+            message = next((l.strip() for l in lines if "Error" in l), "SyntaxError")
+            return f"line {location}: {message}"
+    if target.suffix.lower() not in _SCANNED:
+        return None
+    try:
+        return _scan_js(target.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError) as e:
+        return f"cannot be read: {e}"
+
+
+def validate_project(project_path: str) -> ValidationReport:
+    """Runs the local consistency checks over a generated project.
+
+    Checks that scripts only select ids/classes some file defines, that every href/src to a
+    project file resolves, that each stylesheet and script is loaded from somewhere, that
+    scripts parse and that JSON files are valid. Nothing here calls the LLM.
+    """
+    root = pathlib.Path(project_path)
+    manifest = project_manifest(root)
+    manifest.reload_if_changed()
+    files = {entry["path"] for entry in manifest.entries() if not entry["path"].startswith(".")}
+    index = symbol_index(root)
+    report = ValidationReport()
+
+    markup = sorted(p for p in files if p.endswith(MARKUP_EXTENSIONS))
+    styles = sorted(p for p in files if p.endswith(STYLE_EXTENSIONS))
+    scripts = sorted(p for p in files if p.endswith(SCRIPT_EXTENSIONS))
+    entry_page = "index.html" if "index.html" in files else (markup[0] if markup else None)
+
+    # Cross-file selector graph
+    if markup:
+        ids, classes = index.defined_ids(), index.defined_classes()
+        for path in scripts:
+            symbols = index.files.get(path) or {}
+            for missing in sorted(set(symbols.get("ids_used", [])) - ids):
+                report.add(path, f"selects id '#{missing}' but no HTML element or script defines it", markup)
+            for missing in sorted(set(symbols.get("classes_used", [])) - classes):
+                report.add(path, f"selects class '.{missing}' but no HTML element or script defines it", markup)
+
+    # Link, script and import references
+    loaded = set()
+    for path in markup:
+        for reference in (index.files.get(path) or {}).get("references", []):
+            target = _resolve(path, reference)
+            loaded.add(target)
+            if target.endswith(_CHECKED_REFERENCES) and target not in files:
+                report.add(path, f"references '{reference}' but {target} does not exist")
+    for path in scripts + styles:
+        try:
+            text = (root / path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        pattern = _CSS_IMPORT if path.endswith(STYLE_EXTENSIONS) else _JS_IMPORT
+        for reference in pattern.findall(text):
+            if not reference.startswith((".", "/")):
+                continue  # Packages and URLs
+            target = _resolve(path, reference)
+            loaded.add(target)
+            if target.endswith(_CHECKED_REFERENCES) and target not in files:
+                report.add(path, f"imports '{reference}' but {target} does not exist")
+    # Projects with a package.json also have scripts run by node rather than loaded by a page
+    check_scripts_loaded = "package.json" not in files
+    if entry_page:
+        base = posixpath.dirname(entry_page) or "."
+        for path in styles:
+            if path not in loaded:
+                href = posixpath.relpath(path, base)
+                report.add(entry_page, f'never loads {path}; add <link rel="stylesheet" href="{href}">', [path])
+        for path in scripts:
+            if check_scripts_loaded and path not in loaded and path.endswith((".js", ".mjs")):
+                src = posixpath.relpath(path, base)
+                report.add(entry_page, f'never loads {path}; add <script src="{src}"></script>', [path])
+
+    # Syntax
+    for path in scripts:
+        error = check_script_syntax(root, path)
+        if error:
+            report.add(path, f"does not parse: {error}")
+    for path in sorted(p for p in files if p.endswith(".json")):
+        try:
+            json.loads((root / path).read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError) as e:
+            report.add(path, f"cannot be read: {e}")
+        except ValueError as e:
+            report.add(path, f"is not valid JSON: {e}")
+
+    return report
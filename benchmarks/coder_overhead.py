@@ -0,0 +1,73 @@
+"""Micro-benchmark of coder per-step overhead outside the LLM.
+
+Runs the same coder step against the zero-latency fake chat model, once building a
+fresh ReAct agent per step (the old behaviour) and once through the shared
+agent pool, and reports the mean time spent per step in each mode.
+
+    python benchmarks/coder_overhead.py --steps 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from langchain.globals import set_debug, set_verbose
+from langgraph.prebuilt import create_react_agent
+
+import agent.graph as graph_module
+from agent.fake_llm import FakeChatModel
+from agent.routing import ModelRouter
+from agent.tools import project_config
+
+
+async def time_steps(steps: int, make_agent) -> list[float]:
+    samples = []
+    with tempfile.TemporaryDirectory() as workspace:
+        config = project_config(workspace, techstack="HTML, CSS, JavaScript")
+        for _ in range(steps):
+            started = time.perf_counter()
+            react_agent = make_agent()
+            await react_agent.ainvoke({"messages": [{"role": "user", "content": "CURRENT FILE: index.html"}]}, config)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+    }
+
+
+async def main(args):
+    # Console tracing would dominate the timings
+    set_debug(False)
+    set_verbose(False)
+    model = FakeChatModel()
+    graph_module.router = ModelRouter({"default": ["fake"]}, build=lambda name: model)
+
+    rebuilt = await time_steps(args.steps, lambda: create_react_agent(
+        model, graph_module.CODER_TOOLS, prompt=graph_module._coder_prompt
+    ))
+    pooled = await time_steps(args.steps, lambda: graph_module.get_coder_agent("web"))
+
+    report = {
+        "steps": args.steps,
+        "rebuild_per_step": summarize(rebuilt),
+        "pooled_per_step": summarize(pooled),
+        "saved_per_step_ms": round((statistics.fmean(rebuilt) - statistics.fmean(pooled)) * 1000, 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure coder per-step overhead")
+    parser.add_argument("--steps", type=int, default=50, help="Coder steps per mode (default: 50)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""Concurrent-generation load test against a running CodeCompanion server.
+
+Starts several /generate-stream requests at once and, while they run, keeps
+probing the read endpoints (/history and /project-files). Reports generation
+throughput and latency percentiles for the probes, which stay flat when the
+event loop is not blocked by the generations.
+
+    python server.py
+    python benchmarks/load_test.py --streams 4 --prompt "Create a ToDo App"
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples, default=0.0) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+    }
+
+
+async def run_stream(client: httpx.AsyncClient, prompt: str) -> dict:
+    started = time.perf_counter()
+    first_event = None
+    phase = None
+    async with client.stream("POST", "/generate-stream", json={"prompt": prompt}) as response:
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            phase = json.loads(line).get("phase")
+    return {"seconds": time.perf_counter() - started, "first_event": first_event, "final_phase": phase}
+
+
+async def probe(client: httpx.AsyncClient, path: str, samples: list[float], stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        history = (await client.get("/history")).json()["items"]
+        folder = history[0]["folder"] if history else ""
+
+        stop = asyncio.Event()
+        history_samples, files_samples = [], []
+        probes = [
+            asyncio.create_task(probe(client, "/history", history_samples, stop, args.interval)),
+            asyncio.create_task(probe(client, f"/project-files?folder={folder}", files_samples, stop, args.interval)),
+        ]
+
+        started = time.perf_counter()
+        streams = await asyncio.gather(*(run_stream(client, args.prompt) for _ in range(args.streams)))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await asyncio.gather(*probes)
+
+    completed = sum(1 for s in streams if s["final_phase"] == "complete")
+    report = {
+        "streams": args.streams,
+        "completed": completed,
+        "wall_seconds": round(elapsed, 2),
+        "generations_per_minute": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "stream_seconds": summarize([s["seconds"] for s in streams]),
+        "time_to_first_event": summarize([s["first_event"] for s in streams if s["first_event"] is not None]),
+        "history": summarize(history_samples),
+        "project_files": summarize(files_samples),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test concurrent generations")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--streams", "-n", type=int, default=4, help="Concurrent generations (default: 4)")
+    parser.add_argument("--prompt", default="Create a ToDo App")
+    parser.add_argument("--interval", type=float, default=0.05, help="Delay between read probes in seconds")
+    asyncio.run(main(parser.parse_args()))
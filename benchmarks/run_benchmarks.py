@@ -0,0 +1,248 @@
+"""Offline benchmark suite for the agent graph and the server endpoints.
+
+Everything runs against the deterministic fake LLM (LLM_PROVIDER=fake) inside a
+temporary working directory, so no network access or API key is needed:
+
+- graph throughput, sequential and concurrent
+- per-node latency of planner, workspace, architect and coder
+- /generate-stream time-to-first-event and total time
+- /history, /project-files and manifest latency over large project directories
+
+Results are written as JSON. Pass --compare with an earlier result file to flag
+regressions between versions (non-zero exit when a metric is worse than the
+tolerance allows).
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def latency_metrics(prefix: str, samples: list[float]) -> dict:
+    return {
+        f"{prefix}.p50_ms": round(percentile(samples, 50) * 1000, 3),
+        f"{prefix}.p99_ms": round(percentile(samples, 99) * 1000, 3),
+        f"{prefix}.mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+async def bench_graph(graph_module, runs: int, concurrency: int) -> dict:
+    node_samples: dict[str, list[float]] = {}
+    sequential = []
+    for i in range(runs):
+        started = last = time.perf_counter()
+        async for event in graph_module.agent.astream({"user_prompt": f"benchmark todo app {i}"}, {"recursion_limit": 100}):
+            now = time.perf_counter()
+            for node in event:
+                node_samples.setdefault(node, []).append(now - last)
+            last = now
+        sequential.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        graph_module.agent.ainvoke({"user_prompt": f"concurrent todo app {i}"}, {"recursion_limit": 100})
+        for i in range(concurrency)
+    ))
+    concurrent_elapsed = time.perf_counter() - started
+
+    metrics = latency_metrics("graph.sequential_run", sequential)
+    metrics["graph.sequential_runs_per_second"] = round(runs / sum(sequential), 3)
+    metrics["graph.concurrent_runs_per_second"] = round(concurrency / concurrent_elapsed, 3)
+    for node, samples in sorted(node_samples.items()):
+        metrics.update(latency_metrics(f"node.{node}", samples))
+    return metrics
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"") -> tuple[float | None, float, int]:
+    """Sends one request straight through the ASGI app.
+
+    Returns the time to the first non-empty body chunk, the total time and the status code.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    sent = False
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    started = time.perf_counter()
+    first_byte = None
+    status = 0
+
+    async def send(message):
+        nonlocal first_byte, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body") and first_byte is None:
+            first_byte = time.perf_counter() - started
+
+    await app(scope, receive, send)
+    disconnect.set()
+    return first_byte, time.perf_counter() - started, status
+
+
+async def bench_generate_stream(app, runs: int) -> dict:
+    first_events, totals = [], []
+    for i in range(runs):
+        body = json.dumps({"prompt": f"stream benchmark app {i}"}).encode()
+        first_byte, total, _ = await asgi_request(app, "POST", "/generate-stream", body)
+        first_events.append(first_byte or total)
+        totals.append(total)
+    return {
+        **latency_metrics("generate_stream.first_event", first_events),
+        **latency_metrics("generate_stream.total", totals),
+    }
+
+
+def populate_projects(projects_dir: pathlib.Path, history_size: int, project_files: int, file_kb: int) -> str:
+    """Creates many small project folders plus one large project and returns the large one's folder."""
+    projects_dir.mkdir(exist_ok=True)
+    for i in range(history_size):
+        folder = projects_dir / f"History_Project_{i}_20250101_{i % 240000:06d}"
+        folder.mkdir(exist_ok=True)
+        (folder / "index.html").write_text(f"<h1>Project {i}</h1>\n", encoding="utf-8")
+
+    large = projects_dir / "Large_Project_20250101_000000"
+    large.mkdir(exist_ok=True)
+    line = "// " + "x" * 60 + "\n"
+    body = line * max(1, file_kb * 1024 // len(line))
+    for i in range(project_files):
+        sub = large / f"module_{i % 20}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"file_{i}.js").write_text(body, encoding="utf-8")
+    return large.name
+
+
+async def bench_read_endpoints(app, folder: str, requests: int) -> dict:
+    history, search, files, manifest = [], [], [], []
+    for _ in range(requests):
+        history.append((await asgi_request(app, "GET", "/history"))[1])
+        search.append((await asgi_request(app, "GET", "/history?q=project_1&sort=name"))[1])
+        files.append((await asgi_request(app, "GET", f"/project-files?folder={folder}"))[1])
+        manifest.append((await asgi_request(app, "GET", f"/projects/{folder}/manifest"))[1])
+    return {
+        **latency_metrics("history", history),
+        **latency_metrics("history_search", search),
+        **latency_metrics("project_files", files),
+        **latency_metrics("project_manifest", manifest),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lists metrics that regressed by more than `tolerance` (lower is better except *_per_second)."""
+    regressions = []
+    for name, value in current.items():
+        before = baseline.get(name)
+        if not before or not value:
+            continue
+        higher_is_better = name.endswith("_per_second")
+        ratio = before / value if higher_is_better else value / before
+        marker = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            marker = "  <-- REGRESSION"
+        print(f"{name:45s} {before:>12.3f} -> {value:>12.3f}  x{ratio:.2f}{marker}")
+    return regressions
+
+
+async def main(args) -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        os.environ["LLM_PROVIDER"] = "fake"
+        os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+        os.environ["LLM_CACHE_MODE"] = "off"
+        # Provider quotas would throttle the fake model and hide the code under test
+        os.environ["LLM_RPM"] = os.environ["LLM_TPM"] = "0"
+        os.environ["CODECOMPANION_DATA_DIR"] = str(pathlib.Path(workdir) / ".codecompanion")
+
+        from langchain.globals import set_debug, set_verbose
+        import agent.graph as graph_module
+        import server
+
+        # Console tracing would dominate the timings
+        set_debug(False)
+        set_verbose(False)
+
+        metrics = {}
+        metrics.update(await bench_graph(graph_module, args.runs, args.concurrency))
+        metrics.update(await bench_generate_stream(server.app, args.runs))
+        large_folder = populate_projects(pathlib.Path("projects"), args.history_size, args.project_files, args.file_kb)
+        from agent.project_index import project_index
+        project_index.rebuild()
+        metrics.update(await bench_read_endpoints(server.app, large_folder, args.requests))
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "metrics": metrics,
+    }
+
+    output = pathlib.Path(args.output or REPO_ROOT / "benchmarks" / "results" / f"bench-{datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(json.dumps(metrics, indent=2))
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        baseline = json.loads(pathlib.Path(args.compare).read_text(encoding="utf-8"))["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks driven by the fake LLM")
+    parser.add_argument("--runs", type=int, default=10, help="Sequential graph and stream runs (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Graph runs started at once (default: 10)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--history-size", type=int, default=2000, help="Project folders for /history")
+    parser.add_argument("--project-files", type=int, default=300, help="Files in the large project")
+    parser.add_argument("--file-kb", type=int, default=4, help="Size of each file in the large project")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per read endpoint")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (default: 0.2)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,119 @@
+"""Import-time and cold-start budget for the server.
+
+Measures, in fresh interpreters, how long `import server` takes and how long a
+newly spawned uvicorn worker needs to answer `/history` (serving) and `/ready`
+(graph, model clients and coder agents warmed). Exits non-zero when a
+measurement exceeds its budget, so CI catches imports that creep back in.
+
+    python benchmarks/startup.py --repeat 5
+    python benchmarks/startup.py --import-budget 0.6 --serve-budget 0.9 --ready-budget 2
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_PROBE = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+
+
+def measure_import(env: dict) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list[dict]:
+    """Top-level modules of `import server` by cumulative import time (`python -X importtime`)."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=REPO_ROOT, env=env,
+                         capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        # Direct imports of the probe are indented by a single space
+        if len(parts) == 3 and parts[1].strip().isdigit() and parts[2].startswith("   ") and not parts[2].startswith("    "):
+            modules.append({"module": parts[2].strip(), "ms": round(int(parts[1]) / 1000, 1)})
+    return sorted(modules, key=lambda m: m["ms"], reverse=True)[:top]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, started: float, timeout: float, ok=lambda r: r.status_code == 200) -> float | None:
+    while time.perf_counter() - started < timeout:
+        try:
+            if ok(httpx.get(url, timeout=1.0)):
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_cold_start(env: dict, timeout: float) -> dict:
+    """Spawns a worker and times its first answers; `None` means it did not answer within `timeout`."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        serving = wait_for(f"{base}/history?limit=1", started, timeout)
+        ready = wait_for(f"{base}/ready", started, timeout)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"serving_s": serving, "ready_s": ready}
+
+
+def main(args) -> int:
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {**os.environ, "LLM_PROVIDER": os.environ.get("LLM_PROVIDER", "fake"), "CODECOMPANION_DATA_DIR": data_dir}
+        imports = [measure_import(env) for _ in range(args.repeat)]
+        starts = [measure_cold_start(env, args.timeout) for _ in range(args.repeat)]
+        slowest = slowest_imports(env, args.top)
+
+    def median(key: str) -> float | None:
+        values = [s[key] for s in starts if s[key] is not None]
+        return round(statistics.median(values), 3) if len(values) == len(starts) else None
+
+    report = {
+        "repeat": args.repeat,
+        "import_s": round(statistics.median(imports), 3),
+        "serving_s": median("serving_s"),
+        "ready_s": median("ready_s"),
+        "slowest_imports": slowest,
+    }
+    print(json.dumps(report, indent=2))
+
+    over = []
+    for key, budget in (("import_s", args.import_budget), ("serving_s", args.serve_budget), ("ready_s", args.ready_budget)):
+        if budget is not None and (report[key] is None or report[key] > budget):
+            over.append(f"{key}={report[key]} (budget {budget}s)")
+    if over:
+        print(f"Over budget: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure server import time and cold start")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement (default: 3)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for each endpoint")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list (default: 8)")
+    parser.add_argument("--import-budget", type=float, default=0.8, help="Max seconds for `import server` (default: 0.8)")
+    parser.add_argument("--serve-budget", type=float, default=0.95,
+                        help="Max seconds from spawn to the first /history answer (default: 0.95)")
+    parser.add_argument("--ready-budget", type=float, default=2.5,
+                        help="Max seconds from spawn to /ready (default: 2.5)")
+    sys.exit(main(parser.parse_args()))
@@ -1,30 +1,211 @@
 import argparse
+import asyncio
+import hashlib
+import json
+import pathlib
 import sys
+import time
 import traceback
+import uuid
 
-from agent.graph import agent
+from dotenv import load_dotenv
+
+# Before the agent modules read their settings from the environment
+load_dotenv()
+
+from agent.metrics import RunMetrics
+
+
+async def run(user_prompt: str | None, run_id: str, recursion_limit: int, metrics: RunMetrics | None = None,
+              edit_path: str | None = None):
+    """Runs (or resumes, when no prompt is given) a checkpointed generation.
+
+    With `edit_path` the prompt is a change request applied to that existing project.
+    """
+    # Loaded on first use so argument errors and --help do not wait for LangGraph
+    from agent.graph import checkpointed_agent, mark_cancelled, mark_failed, prepare_resume, run_config
+
+    config = run_config(run_id, recursion_limit, metrics)
+    async with checkpointed_agent() as agent:
+        try:
+            if user_prompt is None:
+                await prepare_resume(agent, config)
+                return await agent.ainvoke(None, config, durability="sync")
+            inputs = {"user_prompt": user_prompt}
+            if edit_path:
+                inputs.update(mode="edit", project_path=edit_path)
+            return await agent.ainvoke(inputs, config, durability="sync")
+        except asyncio.CancelledError:
+            await mark_cancelled(agent, config, "interrupted")
+            raise
+        except Exception:
+            await mark_failed(agent, config)
+            raise
+
+
+def resolve_project(folder: str) -> str | None:
+    """Accepts a project path or a folder name under projects/ and returns its absolute path."""
+    for candidate in (pathlib.Path(folder), pathlib.Path("projects") / folder):
+        if candidate.is_dir():
+            return str(candidate.resolve())
+    return None
+
+
+def load_batch(path: pathlib.Path) -> list[dict]:
+    """Reads prompts from a JSONL file: `{"prompt": ..., "id": ...}` objects or bare strings.
+
+    Lines without an id are keyed on their prompt text, so reruns map to the same run; a repeated
+    prompt also gets its line number, so each copy has its own run and checkpoint. Two lines with
+    the same explicit id are rejected.
+    """
+    items = []
+    seen: dict[str, int] = {}
+    for line_no, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"prompt": record}
+        prompt = record.get("prompt")
+        if not prompt:
+            raise ValueError(f"{path}:{line_no}: missing 'prompt'")
+        if record.get("id"):
+            item_id = str(record["id"])
+            if item_id in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id '{item_id}' (first used on line {seen[item_id]})")
+        else:
+            item_id = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+            if item_id in seen:
+                item_id = f"{item_id}-{line_no}"
+        seen[item_id] = line_no
+        items.append({"id": item_id, "prompt": prompt})
+    return items
+
+
+def finished_ids(results_path: pathlib.Path) -> set[str]:
+    """Ids whose latest result is DONE; everything else is retried on the next batch run."""
+    latest = {}
+    if results_path.exists():
+        for line in results_path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partial line from a crash mid-write
+            latest[record["id"]] = record["status"]
+    return {item_id for item_id, status in latest.items() if status == "DONE"}
+
+
+async def run_batch(items: list[dict], results_path: pathlib.Path, workers: int, recursion_limit: int) -> list[dict]:
+    """Generates every prompt with at most `workers` runs at once, appending one result line each.
+
+    Run ids are derived from the item ids, so after a crash the unfinished items continue from
+    their last checkpoint instead of starting over.
+    """
+    from agent.graph import checkpointed_agent, mark_cancelled, mark_failed, prepare_resume, run_config
+
+    semaphore = asyncio.Semaphore(workers)
+    write_lock = asyncio.Lock()
+    results = []
+
+    async def generate(agent, item: dict):
+        async with semaphore:
+            run_id = f"batch-{item['id']}"
+            metrics = RunMetrics()
+            config = run_config(run_id, recursion_limit, metrics)
+            record = {"id": item["id"], "run_id": run_id, "prompt": item["prompt"]}
+            started = time.perf_counter()
+            try:
+                if (await agent.aget_state(config)).values:
+                    await prepare_resume(agent, config)
+                    result = await agent.ainvoke(None, config, durability="sync")
+                else:
+                    result = await agent.ainvoke({"user_prompt": item["prompt"]}, config, durability="sync")
+                record.update(status=result.get("status") or "FAILED", project_path=result.get("project_path"))
+            except asyncio.CancelledError:
+                await mark_cancelled(agent, config, "interrupted")
+                raise
+            except Exception as e:
+                await mark_failed(agent, config)
+                record.update(status="ERROR", error=str(e))
+            record.update(elapsed_s=round(time.perf_counter() - started, 3), metrics=metrics.snapshot())
+            print(f"--- BATCH: {item['id']} {record['status']} in {record['elapsed_s']}s ---")
+            async with write_lock:
+                with results_path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            results.append(record)
+
+    async with checkpointed_agent() as agent:
+        await asyncio.gather(*(generate(agent, item) for item in items))
+    return results
+
+
+def main_batch(args) -> int:
+    batch_path = pathlib.Path(args.batch)
+    results_path = pathlib.Path(args.output or batch_path.with_name(f"{batch_path.stem}.results.jsonl"))
+    items = load_batch(batch_path)
+    done = finished_ids(results_path)
+    pending = [item for item in items if item["id"] not in done]
+    print(f"Batch: {len(items)} prompt(s), {len(items) - len(pending)} already done, {args.workers} worker(s)")
+    print(f"Results: {results_path}")
+
+    results = asyncio.run(run_batch(pending, results_path, args.workers, args.recursion_limit))
+    failed = [r["id"] for r in results if r["status"] != "DONE"]
+    print(f"Batch finished: {len(results) - len(failed)} done, {len(failed)} failed")
+    if failed:
+        print(f"Rerun the same command to retry: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run engineering project planner")
     parser.add_argument("--recursion-limit", "-r", type=int, default=100,
                         help="Recursion limit for processing (default: 100)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume a failed or interrupted run from its last checkpoint")
+    parser.add_argument("--edit", metavar="FOLDER",
+                        help="Change an existing project (a path or a folder name under projects/) instead of creating one")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Generate every prompt in a JSONL file instead of reading one from stdin")
+    parser.add_argument("--workers", "-w", type=int, default=4,
+                        help="Concurrent generations in batch mode (default: 4)")
+    parser.add_argument("--output", "-o", metavar="FILE",
+                        help="Batch results file (default: <batch>.results.jsonl next to the input)")
 
     args = parser.parse_args()
+    if args.batch:
+        sys.exit(main_batch(args))
+    run_id = args.resume or uuid.uuid4().hex
+    edit_path = None
+    if args.edit and not args.resume:
+        edit_path = resolve_project(args.edit)
+        if edit_path is None:
+            print(f"Project not found: {args.edit}", file=sys.stderr)
+            sys.exit(1)
 
     try:
-        user_prompt = input("Enter your project prompt: ")
-        result = agent.invoke(
-            {"user_prompt": user_prompt},
-            {"recursion_limit": args.recursion_limit}
-        )
+        if args.resume:
+            user_prompt = None
+        elif edit_path:
+            user_prompt = input(f"Describe the change to {pathlib.Path(edit_path).name}: ")
+        else:
+            user_prompt = input("Enter your project prompt: ")
+        print(f"Run ID: {run_id}")
+        metrics = RunMetrics()
+        result = asyncio.run(run(user_prompt, run_id, args.recursion_limit, metrics, edit_path))
         print("Final State:", result)
+        print("Metrics:", json.dumps(metrics.snapshot(), indent=2))
+        if result.get("status") == "FAILED":
+            print(f"Some files failed. Retry them with: python main.py --resume {run_id}", file=sys.stderr)
+            sys.exit(1)
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
+        print(f"Resume with: python main.py --resume {run_id}")
         sys.exit(0)
     except Exception as e:
         traceback.print_exc()
         print(f"Error: {e}", file=sys.stderr)
+        print(f"Resume with: python main.py --resume {run_id}", file=sys.stderr)
         sys.exit(1)
 
 
@@ -1,24 +1,45 @@
-import uvicorn
+import asyncio
 import os
 import sys
-import platform
-import subprocess
 import json
-from fastapi import FastAPI, HTTPException
+import mimetypes
+import pathlib
+import re
+import uuid
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse, RedirectResponse
+from fastapi.responses import StreamingResponse, RedirectResponse, PlainTextResponse, FileResponse, JSONResponse, Response
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Before the agent modules read their settings from the environment
+load_dotenv()
+
 try:
-    from agent.graph import agent
+    from agent.events import close_run_events, get_run_events, open_run_events
+    from agent.manifest import project_manifest
+    from agent.metrics import RunMetrics, registry
+    from agent.project_index import project_index
+    from agent.runtime import WARM_ON_STARTUP, runtime
+    from agent.storage import safe_path_for_project
 except ImportError as e:
     print(f"CRITICAL ERROR: {e}")
     sys.exit(1)
 
-app = FastAPI(title="CodeCompanion GUI")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The graph and model clients load on their first run; warming them here keeps that run fast
+    if WARM_ON_STARTUP:
+        runtime.start_warmup()
+    yield
+
+
+app = FastAPI(title="CodeCompanion GUI", lifespan=lifespan)
 
 @app.get("/")
 async def root():
@@ -27,7 +48,8 @@ async def root():
 @app.middleware("http")
 async def add_no_cache_header(request, call_next):
     response = await call_next(request)
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    # Endpoints that send ETags choose their own policy so clients can revalidate
+    response.headers.setdefault("Cache-Control", "no-cache, no-store, must-revalidate")
     return response
 
 
@@ -40,7 +62,6 @@ app.add_middleware(
 )
 
 os.makedirs("projects", exist_ok=True)
-app.mount("/projects", StaticFiles(directory="projects"), name="projects")
 
 if os.path.exists("web"):
     app.mount("/static", StaticFiles(directory="web"), name="static")
@@ -51,123 +72,415 @@ class ProjectRequest(BaseModel):
     recursion_limit: int = 100
 
 
-@app.post("/generate-stream")
-async def generate_stream(request: ProjectRequest):
-    """Streams events from the LangGraph agent to the frontend."""
+# Runs currently being driven by this process, by run id, so they can be cancelled
+active_runs: dict[str, asyncio.Task] = {}
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "1.0"))
 
-    async def event_generator():
-        try:
-            inputs = {"user_prompt": request.prompt}
-            config = {"recursion_limit": request.recursion_limit}
 
-            project_path = None
+async def run_events(inputs, run_id: str, recursion_limit: int):
+    """Drives a checkpointed run and yields NDJSON progress events tagged with its run id."""
+
+    metrics = RunMetrics()
+    status = None
+    graph = None
+
+    def emit(payload: dict) -> str:
+        return json.dumps({**payload, "run_id": run_id, "metrics": metrics.snapshot()}) + "\n"
+
+    try:
+        graph = await runtime.aload()
+        config = graph.run_config(run_id, recursion_limit, metrics)
+
+        async with graph.checkpointed_agent() as agent:
+            # Edits target an existing folder from the start
+            project_path = (inputs or {}).get("project_path")
             final_plan = None
 
-            for event in agent.stream(inputs, config):
+            if inputs is None:
+                state = await graph.prepare_resume(agent, config)
+                project_path = state.project_path
+                final_plan = state.plan
+                status = state.status
+                yield emit({
+                    "phase": "resume",
+                    "message": "Resuming from last checkpoint...",
+                    "details": f"Dir: {os.path.basename(project_path)}" if project_path else "Restarting plan..."
+                })
+
+            async for event in agent.astream(inputs, config, durability="sync"):
 
                 if "planner" in event:
                     final_plan = event["planner"]["plan"]
-                    yield json.dumps({
+                    source = event["planner"].get("plan_source")
+                    yield emit({
                         "phase": "planning",
-                        "message": "Drafting engineering plan...",
+                        "message": f"Reusing the plan of {source}..." if source else "Drafting engineering plan...",
                         "details": f"Planned: {final_plan.name}"
-                    }) + "\n"
+                    })
+
+                elif "change_planner" in event:
+                    final_plan = event["change_planner"]["plan"]
+                    changing = ", ".join(f.path for f in final_plan.files) or "nothing to change"
+                    yield emit({
+                        "phase": "change_plan",
+                        "message": "Planning changes...",
+                        "details": f"Changing: {changing}",
+                        "project_folder": os.path.basename(project_path),
+                        "project_name": final_plan.name
+                    })
 
                 elif "create_project_workspace" in event:
                     project_path = event["create_project_workspace"]["project_path"]
-                    yield json.dumps({
+                    yield emit({
                         "phase": "workspace",
                         "message": "Setting up workspace...",
-                        "details": f"Dir: {os.path.basename(project_path)}"
-                    }) + "\n"
+                        "details": f"Dir: {os.path.basename(project_path)}",
+                        "project_folder": os.path.basename(project_path)
+                    })
 
                 elif "architect" in event:
-                    yield json.dumps({
+                    early = event["architect"]["coder_state"].current_step_idx
+                    yield emit({
                         "phase": "architect",
                         "message": "Designing architecture...",
-                        "details": "Breaking down tasks..."
-                    }) + "\n"
+                        "details": f"Breaking down tasks... ({early} file(s) already written)" if early else "Breaking down tasks..."
+                    })
 
                 elif "coder" in event:
+                    status = event["coder"].get("status")
                     coder_state = event["coder"].get("coder_state")
                     if coder_state:
                         current = coder_state.current_step_idx
-                        total = len(coder_state.task_plan.implementation_steps)
-                        yield json.dumps({
+                        steps = coder_state.task_plan.implementation_steps
+                        written = ", ".join(steps[idx].filepath for idx in coder_state.last_completed)
+                        yield emit({
                             "phase": "coding",
-                            "message": f"Writing code ({current}/{total})...",
-                            "details": f"Task: {coder_state.task_plan.implementation_steps[current - 1].filepath}"
-                        }) + "\n"
+                            "message": f"Writing code ({current}/{len(steps)})...",
+                            "details": f"Task: {written}"
+                        })
+
+                elif "validator" in event:
+                    status = event["validator"].get("status")
+                    report = event["validator"]["validation"]
+                    problems = sum(len(errors) for errors in report.errors.values())
+                    yield emit({
+                        "phase": "validating",
+                        "message": "Checking the project..." if problems else "All checks passed.",
+                        "details": f"{problems} problem(s) in {', '.join(report.errors)}" if problems else "",
+                        "validation": report.errors
+                    })
+
+                elif "repair" in event:
+                    yield emit({
+                        "phase": "repairing",
+                        "message": f"Repairing files (round {event['repair']['repair_round']})...",
+                        "details": ""
+                    })
+
+        if status == "FAILED":
+            yield emit({
+                "phase": "error",
+                "message": "Some files could not be generated. Resume the run to retry them.",
+                "project_path": project_path
+            })
+            return
+
+        yield emit({
+            "phase": "complete",
+            "message": "Project ready!",
+            "project_path": project_path,
+            "project_name": final_plan.name if final_plan else "Project"
+        })
+
+    except asyncio.CancelledError as e:
+        status = "CANCELLED"
+        reason = str(e) or "cancelled"
+        project_path = None
+        if graph is not None:
+            async with graph.checkpointed_agent() as agent:
+                project_path = await graph.mark_cancelled(agent, config, reason)
+        yield emit({"phase": "cancelled", "message": f"Generation cancelled ({reason}).", "project_path": project_path})
+        raise
+    except Exception as e:
+        status = "ERROR"
+        print(f"Stream Error: {e}")
+        if graph is not None:
+            try:
+                async with graph.checkpointed_agent() as agent:
+                    project_path = await graph.mark_failed(agent, config)
+            except Exception as record_error:
+                print(f"Could not record the failure: {record_error}")
+        yield emit({"phase": "error", "message": str(e)})
+    finally:
+        registry.inc("codecompanion_runs_total", 1, "Generation runs by final status", status=(status or "UNKNOWN").lower())
+        registry.observe("codecompanion_run_duration_seconds", metrics.snapshot()["elapsed_s"], "Wall time per generation run")
 
-            yield json.dumps({
-                "phase": "complete",
-                "message": "Project ready!",
-                "project_path": project_path,
-                "project_name": final_plan.name if final_plan else "Project"
-            }) + "\n"
 
-        except Exception as e:
-            print(f"Stream Error: {e}")
-            yield json.dumps({"phase": "error", "message": str(e)}) + "\n"
+async def _watch_disconnect(request: Request, driver: asyncio.Task):
+    while not driver.done():
+        if await request.is_disconnected():
+            driver.cancel("client disconnected")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
 
-    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
 
+async def stream_run(inputs, run_id: str, recursion_limit: int, request: Request):
+    """Runs the generation in its own task and relays its events to the client.
 
-@app.get("/project-files")
-async def get_project_files(folder: str):
-    """Returns a list of files and their content for the code viewer."""
-    project_root = os.path.join("projects", folder)
-    if not os.path.exists(project_root):
+    The run is cancelled when the client disconnects or `POST /cancel/{run_id}` is called, so
+    no further coder steps are scheduled and the in-flight LLM calls are aborted.
+    """
+    if run_id in active_runs:
+        yield json.dumps({"phase": "error", "message": "This run is already in progress.", "run_id": run_id}) + "\n"
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_file_event(event: dict | None):
+        if event is not None:
+            queue.put_nowait(json.dumps({"phase": "file", **event, "run_id": run_id}) + "\n")
+
+    # File writes of this run are interleaved with the progress events as they land
+    unsubscribe = open_run_events(run_id).subscribe(on_file_event)
+
+    async def drive():
+        try:
+            async for line in run_events(inputs, run_id, recursion_limit):
+                queue.put_nowait(line)
+        finally:
+            active_runs.pop(run_id, None)
+            close_run_events(run_id)
+            queue.put_nowait(None)
+
+    driver = asyncio.create_task(drive())
+    active_runs[run_id] = driver
+    watcher = asyncio.create_task(_watch_disconnect(request, driver))
+    try:
+        while (line := await queue.get()) is not None:
+            yield line
+    finally:
+        unsubscribe()
+        watcher.cancel()
+        if not driver.done():
+            driver.cancel("client disconnected")
+
+
+@app.post("/generate-stream")
+async def generate_stream(body: ProjectRequest, request: Request):
+    """Streams events from the LangGraph agent to the frontend."""
+    run_id = uuid.uuid4().hex
+    inputs = {"user_prompt": body.prompt}
+    return StreamingResponse(stream_run(inputs, run_id, body.recursion_limit, request), media_type="application/x-ndjson")
+
+
+@app.post("/projects/{folder}/edit")
+async def edit_project_stream(folder: str, body: ProjectRequest, request: Request):
+    """Applies a change request to an existing project, rewriting only the files it affects."""
+    root = project_root_for(folder)
+    run_id = uuid.uuid4().hex
+    inputs = {"user_prompt": body.prompt, "mode": "edit", "project_path": str(root)}
+    return StreamingResponse(stream_run(inputs, run_id, body.recursion_limit, request), media_type="application/x-ndjson")
+
+
+@app.post("/resume/{run_id}")
+async def resume_stream(run_id: str, request: Request, recursion_limit: int = 100):
+    """Continues a failed or interrupted run from its last checkpoint."""
+    return StreamingResponse(stream_run(None, run_id, recursion_limit, request), media_type="application/x-ndjson")
+
+
+@app.get("/runs/{run_id}/events")
+async def run_file_events(run_id: str):
+    """Server-sent events for each file a running generation writes, for viewers other than its stream."""
+    bus = get_run_events(run_id)
+    if bus is None:
+        raise HTTPException(404, "No running generation with this id")
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        unsubscribe = bus.subscribe(queue.put_nowait)
+        try:
+            if get_run_events(run_id) is None:
+                return  # Finished before we subscribed
+            while (event := await queue.get()) is not None:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/cancel/{run_id}")
+async def cancel_run(run_id: str):
+    """Stops a running generation; its project folder is kept and marked as partial."""
+    driver = active_runs.get(run_id)
+    if driver is None:
+        raise HTTPException(404, "No running generation with this id")
+    driver.cancel("cancelled by request")
+    return {"status": "cancelling", "run_id": run_id}
+
+
+@app.get("/ready")
+async def get_ready():
+    """Readiness probe: 200 once the graph, model clients and coder agents are built, 503 until then.
+
+    With WARM_ON_STARTUP off nothing is built ahead of time, so the server is ready as soon as it
+    accepts requests and the first run pays for loading the graph.
+    """
+    if WARM_ON_STARTUP:
+        # Retries a failed warm-up, so a transient failure does not keep the probe at 503
+        runtime.start_warmup()
+    status = runtime.status()
+    ready = runtime.ready or (not WARM_ON_STARTUP and not status["error"])
+    return JSONResponse(status, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for graph nodes, LLM calls and tool calls across all runs."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def project_root_for(folder: str) -> pathlib.Path:
+    """Resolves a project folder name, refusing anything outside `projects/`."""
+    projects_dir = pathlib.Path("projects").resolve()
+    root = (projects_dir / folder).resolve()
+    if root.parent != projects_dir or not root.is_dir():
         raise HTTPException(404, "Project not found")
+    return root
 
-    files_data = []
 
-    for root, _, files in os.walk(project_root):
-        for file in files:
-            if file.startswith('.') or file.endswith(('.png', '.jpg', '.jpeg', '.ico')):
-                continue
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison: `*`, `W/` prefixes and comma-separated lists of tags."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
 
-            full_path = os.path.join(root, file)
-            rel_path = os.path.relpath(full_path, project_root)
 
-            try:
-                with open(full_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                files_data.append({
-                    "name": file,
-                    "path": rel_path,
-                    "content": content,
-                    "language": file.split('.')[-1]
-                })
-            except Exception:
-                pass
+def _loaded_manifest(root: pathlib.Path):
+    manifest = project_manifest(root)
+    manifest.reload_if_changed()
+    return manifest
+
+
+@app.get("/projects/{folder}/manifest")
+async def get_project_manifest(folder: str, request: Request):
+    """Lists the project's files (path, size, mtime, hash, language) without their content.
+
+    Clients send the returned ETag as If-None-Match and get 304 while nothing has changed,
+    then fetch only the files whose hash differs from what they already have.
+    """
+    root = project_root_for(folder)
+    manifest = await asyncio.to_thread(_loaded_manifest, root)
+    etag = f'"{manifest.etag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({"folder": folder, "etag": manifest.etag, "files": manifest.entries()}, headers=headers)
+
+
+@app.get("/projects/{folder}/files/{path:path}")
+async def get_project_file(folder: str, path: str, request: Request):
+    """Serves one project file with its content hash as ETag; Range requests get 206."""
+    root = project_root_for(folder)
+    try:
+        target = safe_path_for_project(root, path)
+    except ValueError:
+        raise HTTPException(404, "File not found")
+    if not target.is_file() or target.name.startswith("."):
+        raise HTTPException(404, "File not found")
+
+    entry = await asyncio.to_thread(project_manifest(root).current, target.relative_to(root).as_posix())
+    headers = {"Cache-Control": "no-cache"}
+    if entry:
+        headers["ETag"] = f'"{entry["hash"]}"'
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    media_type = mimetypes.guess_type(target.name)[0] or "text/plain"
+    return FileResponse(target, media_type=media_type, headers=headers)
+
+
+def _patterns(value: str | None) -> list[str] | None:
+    return [p.strip() for p in value.split(",") if p.strip()] if value else None
+
+
+@app.get("/projects/{folder}/archive")
+async def get_project_archive(folder: str, request: Request, fmt: str = Query("zip", alias="format"),
+                              include: str | None = None, exclude: str | None = None):
+    """Downloads a project as zip or tar.gz, optionally filtered by comma-separated globs.
+
+    The archive is streamed while it is built and cached on disk under the manifest hash,
+    so repeat downloads of an unchanged project are served straight from the cache.
+    """
+    from agent.archive import ProjectArchive  # zip/tar support is only loaded for downloads
 
+    root = project_root_for(folder)
+    try:
+        archive = await asyncio.to_thread(ProjectArchive, root, fmt, _patterns(include), _patterns(exclude))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if not archive.files:
+        raise HTTPException(404, "No files match the export filters")
+
+    headers = {"ETag": f'"{archive.key}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    cached = await asyncio.to_thread(archive.cached)
+    if cached:
+        return FileResponse(cached, media_type=archive.media_type, filename=archive.filename, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{archive.filename}"'
+    return StreamingResponse(archive.stream(), media_type=archive.media_type, headers=headers)
+
+
+def _read_project_files(project_root: pathlib.Path) -> list[dict]:
+    manifest = _loaded_manifest(project_root)
+    files_data = []
+    for entry in manifest.entries():
+        if entry["language"] in ('png', 'jpg', 'jpeg', 'ico'):
+            continue
+        try:
+            content = (project_root / entry["path"]).read_text(encoding="utf-8")
+        except Exception:
+            continue
+        files_data.append({
+            "name": os.path.basename(entry["path"]),
+            "path": entry["path"],
+            "content": content,
+            "language": entry["language"]
+        })
     return files_data
 
 
+@app.get("/project-files")
+async def get_project_files(folder: str):
+    """Returns every file with its content; prefer the manifest and per-file endpoints."""
+    project_root = project_root_for(folder)
+    return await asyncio.to_thread(_read_project_files, project_root)
+
+
 @app.get("/history")
-async def get_project_history():
-    projects_dir = "projects"
-    if not os.path.exists(projects_dir):
-        return []
-    project_list = []
-    for folder_name in os.listdir(projects_dir):
-        folder_path = os.path.join(projects_dir, folder_name)
-        if os.path.isdir(folder_path):
-            try:
-                timestamp = os.path.getmtime(folder_path)
-                parts = folder_name.split('_')
-                display_name = " ".join(parts[:-2]) if len(parts) > 2 else folder_name
-                project_list.append({
-                    "name": display_name,
-                    "folder": folder_name,
-                    "created": timestamp
-                })
-            except Exception:
-                pass
-    project_list.sort(key=lambda x: x["created"], reverse=True)
-    return project_list
+async def get_project_history(limit: int = 50, cursor: str | None = None, prefix: str | None = None,
+                              q: str | None = None, sort: str = "newest"):
+    """Pages through generated projects from the project index.
+
+    `prefix` filters on the start of the name, `q` searches name and prompt, and `sort` is one of
+    newest, oldest, name or name_desc. Pass the returned `next_cursor` back to get the next page.
+    """
+    if not project_index.built:
+        # First start after upgrading: index the folders already on disk, once
+        await asyncio.to_thread(project_index.ensure_built)
+    try:
+        # SQLite behind a thread lock plus a folder check per row: kept off the event loop
+        items, next_cursor = await asyncio.to_thread(
+            project_index.page, limit=limit, cursor=cursor, prefix=prefix, query=q, sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    for item in items:
+        item["partial"] = item["status"] == "CANCELLED"
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @app.post("/open-folder")
@@ -177,6 +490,9 @@ async def open_folder(request: dict):
         path = os.path.abspath(path)
     if not path or not os.path.exists(path):
         raise HTTPException(status_code=404, detail="Path not found on server")
+    import platform
+    import subprocess
+
     try:
         if platform.system() == "Windows":
             os.startfile(path)
@@ -189,5 +505,20 @@ async def open_folder(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class ProjectStaticFiles(StaticFiles):
+    """Static project files without the hidden metadata (.project.json, .manifest.json, ...) kept next to them."""
+
+    async def get_response(self, path: str, scope):
+        if any(part.startswith(".") for part in re.split(r"[\\/]", path)):
+            raise HTTPException(404, "File not found")
+        return await super().get_response(path, scope)
+
+
+# Mounted last so the /projects/{folder}/... API routes above take precedence over static files
+app.mount("/projects", ProjectStaticFiles(directory="projects"), name="projects")
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import json
+import pathlib
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+import agent.graph as graph
+from main import finished_ids, load_batch, run_batch
+
+
+class BatchFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = pathlib.Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name: str, lines: list[str]) -> pathlib.Path:
+        path = self.folder / name
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    def test_repeated_prompts_get_their_own_ids(self):
+        path = self._write("prompts.jsonl", [
+            json.dumps("Create a ToDo App"),
+            "",
+            json.dumps({"prompt": "Create a ToDo App"}),
+            json.dumps({"id": "calc", "prompt": "Create a Calculator"}),
+        ])
+        items = load_batch(path)
+        ids = [item["id"] for item in items]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(ids[1], f"{ids[0]}-3")
+        self.assertEqual(ids[2], "calc")
+        # Reruns of the same file map to the same runs
+        self.assertEqual([item["id"] for item in load_batch(path)], ids)
+
+    def test_duplicate_explicit_ids_are_rejected(self):
+        path = self._write("prompts.jsonl", [
+            json.dumps({"id": "todo", "prompt": "Create a ToDo App"}),
+            json.dumps({"id": "todo", "prompt": "Create a ToDo List"}),
+        ])
+        with self.assertRaisesRegex(ValueError, "duplicate id 'todo'"):
+            load_batch(path)
+
+    def test_missing_prompt_is_rejected(self):
+        path = self._write("prompts.jsonl", [json.dumps({"id": "empty"})])
+        with self.assertRaisesRegex(ValueError, ":1: missing 'prompt'"):
+            load_batch(path)
+
+    def test_finished_ids_use_the_latest_result(self):
+        path = self._write("results.jsonl", [
+            json.dumps({"id": "a", "status": "DONE"}),
+            json.dumps({"id": "b", "status": "DONE"}),
+            json.dumps({"id": "b", "status": "FAILED"}),
+            json.dumps({"id": "c", "status": "ERROR"}),
+            json.dumps({"id": "c", "status": "DONE"}),
+            '{"id": "d", "sta',  # Cut off by a crash
+        ])
+        self.assertEqual(finished_ids(path), {"a", "c"})
+        self.assertEqual(finished_ids(self.folder / "missing.jsonl"), set())
+
+
+
+class _Agent:
+    """Stands in for the checkpointed graph: `checkpointed` run ids have saved state to resume."""
+
+    def __init__(self, checkpointed: set[str], failing: set[str]):
+        self.checkpointed = checkpointed
+        self.failing = failing
+        self.calls = []
+
+    async def aget_state(self, config):
+        run_id = config["configurable"]["thread_id"]
+        return SimpleNamespace(values={"user_prompt": "saved"} if run_id in self.checkpointed else {})
+
+    async def ainvoke(self, inputs, config, durability=None):
+        run_id = config["configurable"]["thread_id"]
+        self.calls.append((run_id, inputs))
+        if run_id in self.failing:
+            raise RuntimeError("model unavailable")
+        return {"status": "DONE", "project_path": f"projects/{run_id}"}
+
+
+class RunBatchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results = pathlib.Path(self.tmp.name) / "results.jsonl"
+        self.agent = _Agent(checkpointed={"batch-resumed"}, failing={"batch-broken"})
+        self.prepare_resume = mock.AsyncMock()
+        self.mark_failed = mock.AsyncMock()
+
+        @asynccontextmanager
+        async def checkpointed_agent():
+            yield self.agent
+
+        self.patches = [
+            mock.patch.object(graph, "checkpointed_agent", checkpointed_agent),
+            mock.patch.object(graph, "prepare_resume", self.prepare_resume),
+            mock.patch.object(graph, "mark_failed", self.mark_failed),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    async def test_checkpointed_items_resume_and_every_result_is_appended(self):
+        self.results.write_text(json.dumps({"id": "earlier", "status": "DONE"}) + "\n", encoding="utf-8")
+        items = [
+            {"id": "fresh", "prompt": "Create a ToDo App"},
+            {"id": "resumed", "prompt": "Create a Calculator"},
+            {"id": "broken", "prompt": "Create a Stopwatch"},
+        ]
+        results = await run_batch(items, self.results, workers=2, recursion_limit=50)
+
+        calls = dict(self.agent.calls)
+        self.assertEqual(calls["batch-fresh"], {"user_prompt": "Create a ToDo App"})
+        self.assertIsNone(calls["batch-resumed"])
+        self.assertEqual(self.prepare_resume.await_count, 1)
+        self.assertEqual(self.mark_failed.await_count, 1)
+
+        by_id = {record["id"]: record for record in results}
+        self.assertEqual(by_id["fresh"]["status"], "DONE")
+        self.assertEqual(by_id["resumed"]["project_path"], "projects/batch-resumed")
+        self.assertEqual(by_id["broken"]["status"], "ERROR")
+        self.assertEqual(by_id["broken"]["error"], "model unavailable")
+
+        lines = [json.loads(line) for line in self.results.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(lines[0]["id"], "earlier")
+        self.assertEqual(sorted(line["id"] for line in lines[1:]), ["broken", "fresh", "resumed"])
+        self.assertEqual(finished_ids(self.results), {"earlier", "fresh", "resumed"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import pathlib
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import agent.graph as graph
+from agent.cache import CacheMissError, LLMCache
+
+
+class LLMCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tmp.name) / "cache.sqlite3"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_responses_are_keyed_on_model_and_prompt(self):
+        cache = LLMCache(self.path)
+        cache.put("fast", "plan a todo app", '{"name": "Todo"}')
+        self.assertEqual(cache.get("fast", "plan a todo app"), '{"name": "Todo"}')
+        self.assertIsNone(cache.get("large", "plan a todo app"))
+        self.assertIsNone(cache.get("fast", "plan a calculator"))
+        cache.delete("fast", "plan a todo app")
+        self.assertIsNone(cache.get("fast", "plan a todo app"))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_off_mode_stores_nothing(self):
+        cache = LLMCache(self.path, mode="off")
+        cache.put("fast", "prompt", "answer")
+        self.assertIsNone(cache.get("fast", "prompt"))
+
+    def test_expired_entries_are_dropped_but_replay_keeps_them(self):
+        LLMCache(self.path).put("fast", "prompt", "answer")
+        later = time.time() + 120
+        with mock.patch("agent.cache.time.time", return_value=later):
+            self.assertEqual(LLMCache(self.path, mode="replay", ttl_seconds=60).get("fast", "prompt"), "answer")
+            self.assertIsNone(LLMCache(self.path, ttl_seconds=60).get("fast", "prompt"))
+
+    def test_replay_mode_never_writes(self):
+        cache = LLMCache(self.path, mode="replay")
+        cache.put("fast", "prompt", "answer")
+        self.assertIsNone(cache.get("fast", "prompt"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LLMCache(self.path, max_entries=2)
+        cache.put("m", "a", "1")
+        cache.put("m", "b", "2")
+        with mock.patch("agent.cache.time.time", return_value=time.time() + 1):
+            cache.get("m", "a")
+            cache.put("m", "c", "3")
+        self.assertEqual([cache.get("m", p) for p in "abc"], ["1", None, "3"])
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            LLMCache(self.path, mode="sometimes")
+
+
+class _Model:
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+        self.calls = 0
+
+    async def astream(self, prompt: str):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield SimpleNamespace(content=chunk, response_metadata={})
+
+
+class CompletionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model = _Model(['{"name": ', '"Todo"}'])
+        router = SimpleNamespace(primary=lambda route: "fast", model=lambda route: self.model)
+        self.patches = [mock.patch.object(graph, "router", router)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def _use_cache(self, mode: str) -> LLMCache:
+        cache = LLMCache(pathlib.Path(self.tmp.name) / "cache.sqlite3", mode=mode)
+        patch = mock.patch.object(graph, "llm_cache", cache)
+        patch.start()
+        self.patches.append(patch)
+        return cache
+
+    async def _collect(self, completion: graph.Completion) -> str:
+        return "".join([chunk async for chunk in completion.stream()])
+
+    async def test_answer_is_cached_only_once_saved(self):
+        cache = self._use_cache("on")
+        first = graph.Completion("plan a todo app", "planner")
+        self.assertEqual(await self._collect(first), '{"name": "Todo"}')
+        self.assertIsNone(cache.get("fast", "plan a todo app"))
+        await first.save()
+
+        second = graph.Completion("plan a todo app", "planner")
+        self.assertEqual(await self._collect(second), '{"name": "Todo"}')
+        self.assertTrue(second.cached)
+        self.assertEqual(self.model.calls, 1)
+
+        await second.discard()
+        self.assertIsNone(cache.get("fast", "plan a todo app"))
+
+    async def test_replay_mode_raises_on_a_miss(self):
+        self._use_cache("replay")
+        with self.assertRaises(CacheMissError):
+            await self._collect(graph.Completion("plan a todo app", "planner"))
+        self.assertEqual(self.model.calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import pathlib
+import tempfile
+import unittest
+
+from agent.context import pack_context, truncate_to_tokens
+from agent.overlay import workspace_overlay
+from agent.ratelimit import count_tokens
+
+SCRIPT = "\n".join(f"function step{i}() {{ return {i}; }}" for i in range(200))
+
+
+class TruncateToTokensTest(unittest.TestCase):
+    def test_short_text_is_unchanged(self):
+        self.assertEqual(truncate_to_tokens("one\ntwo", 100), "one\ntwo")
+
+    def test_long_text_keeps_whole_head_lines(self):
+        text = truncate_to_tokens(SCRIPT, 50)
+        head, note = text.rsplit("\n", 1)
+        self.assertTrue(SCRIPT.startswith(head + "\n"))
+        self.assertLessEqual(count_tokens(head), 50)
+        self.assertEqual(note, f"... [truncated {SCRIPT.count(chr(10)) - head.count(chr(10))} more lines]")
+
+
+class PackContextTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        files = {
+            "index.html": '<div id="app" class="card"></div>',
+            "style.css": ".card { color: red; }",
+            "app.js": SCRIPT,
+            "README.md": "# Notes\n" * 50,
+        }
+        for rel, content in files.items():
+            (self.root / rel).write_text(content, encoding="utf-8")
+        self.baseline = sum(count_tokens(content) for content in files.values())
+
+    def tearDown(self):
+        # Leave no pending writes behind in the shared overlay
+        workspace_overlay(self.root).commit("step", "run-1")
+        self.tmp.cleanup()
+
+    def test_sections_in_priority_order(self):
+        packed = pack_context(str(self.root), "style.css", ["app.js"], budget=2000)
+        text = packed.text
+        positions = [text.index(marker) for marker in (
+            "index.html: ids [app]", "[CURRENT CONTENT OF style.css]", "[EXCERPT OF app.js]", "[PROJECT FILES]",
+        )]
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn(".card { color: red; }", text)
+        self.assertEqual(packed.tokens, count_tokens(text))
+        self.assertEqual(packed.baseline_tokens, self.baseline)
+
+    def test_budget_is_respected(self):
+        packed = pack_context(str(self.root), "style.css", ["app.js"], budget=200)
+        self.assertLessEqual(packed.tokens, 200 + 50)  # Truncation notes and section headers
+        self.assertIn("[truncated", packed.text)
+        self.assertGreater(packed.saved_tokens, 0)
+        self.assertEqual(packed.saved_tokens, packed.baseline_tokens - packed.tokens)
+
+    def test_dependency_sections_are_dropped_when_the_budget_is_spent(self):
+        packed = pack_context(str(self.root), "app.js", ["index.html"], budget=20)
+        self.assertNotIn("[EXCERPT OF index.html]", packed.text)
+        self.assertNotIn("[PROJECT FILES]", packed.text)
+
+    def test_pending_writes_of_the_run_are_visible(self):
+        workspace_overlay(self.root).write("timer.js", "function tick() {}", "step", "run-1")
+        packed = pack_context(str(self.root), "app.js", ["timer.js"], run_id="run-1")
+        self.assertIn("[EXCERPT OF timer.js]\nfunction tick() {}", packed.text)
+        self.assertIn("timer.js", packed.text.split("[PROJECT FILES]")[1])
+
+        other = pack_context(str(self.root), "app.js", ["timer.js"], run_id="run-2")
+        self.assertNotIn("timer.js", other.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import agent.graph as graph
+from agent.cache import LLMCache
+from agent.fake_llm import FakeChatModel
+from agent.project_index import ProjectIndex
+from agent.routing import ModelRouter
+from agent.states import GraphState
+
+FILES = {
+    "index.html": '<link rel="stylesheet" href="style.css"><div id="app"></div><script src="app.js"></script>',
+    "style.css": "body { color: black; }",
+    "app.js": "document.getElementById('app');",
+}
+
+
+class ChangePlannerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.root = self.tmp / "Todo_20260101_120000"
+        self.root.mkdir()
+        for rel, content in FILES.items():
+            (self.root / rel).write_text(content, encoding="utf-8")
+        self.index = ProjectIndex(str(self.tmp / "projects.sqlite3"), self.tmp)
+        self.index.record_workspace(str(self.root), "Todo", "Create a ToDo App", "create-run")
+        self.index.record_status(str(self.root), "DONE")
+
+        model = FakeChatModel()
+        self.patches = [
+            mock.patch.object(graph, "router", ModelRouter({"default": ["fake"]}, build=lambda name: model)),
+            mock.patch.object(graph, "llm_cache", LLMCache(self.tmp / "cache.sqlite3", mode="off")),
+            mock.patch.object(graph, "project_index", self.index),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp)
+
+    async def _plan(self, prompt: str) -> dict:
+        state = GraphState(user_prompt=prompt, mode="edit", project_path=str(self.root))
+        return await graph.change_planner_agent(state, {"configurable": {"thread_id": "edit-run"}})
+
+    async def test_only_the_affected_files_are_planned(self):
+        result = await self._plan("Add a dark mode")
+        steps = result["task_plan"].implementation_steps
+        self.assertEqual([step.filepath for step in steps], ["style.css"])
+        self.assertIn("Add a dark mode", steps[0].task_description)
+        self.assertEqual(result["plan"].name, "Todo")
+        self.assertEqual(result["coder_state"].task_plan, result["task_plan"])
+        # Problems the project already had are recorded so the repair loop leaves them alone
+        self.assertTrue(result["validation_baseline"].ok, result["validation_baseline"].errors)
+        # Nothing outside the plan is rewritten
+        self.assertEqual((self.root / "app.js").read_text(encoding="utf-8"), FILES["app.js"])
+
+    async def test_edit_is_recorded_with_the_previous_status(self):
+        await self._plan("Add a dark mode")
+        row = self.index.page()[0][0]
+        self.assertEqual(row["status"], "IN_PROGRESS")
+        meta = self.index._read_meta(self.root)
+        self.assertEqual(meta["run_id"], "edit-run")
+        self.assertEqual(meta["edits"][-1]["prompt"], "Add a dark mode")
+        self.assertEqual(meta["edits"][-1]["previous_status"], "DONE")
+
+    async def test_steps_outside_the_project_or_on_metadata_are_skipped(self):
+        change_plan = {"techstack": "HTML", "implementation_steps": [
+            {"filepath": "../escape.js", "task_description": "x", "depends_on": []},
+            {"filepath": ".manifest.json", "task_description": "x", "depends_on": []},
+            {"filepath": "app.js", "task_description": "x", "depends_on": []},
+            {"filepath": "app.js", "task_description": "again", "depends_on": []},
+        ]}
+        with mock.patch.object(FakeChatModel, "_change_plan", lambda self, prompt: change_plan):
+            result = await self._plan("Refactor")
+        self.assertEqual([step.filepath for step in result["task_plan"].implementation_steps], ["app.js"])
+
+    async def test_missing_project_is_rejected(self):
+        shutil.rmtree(self.root)
+        with self.assertRaisesRegex(ValueError, "Project folder not found"):
+            await self._plan("Add a dark mode")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import pathlib
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from agent.events import close_run_events, get_run_events, open_run_events
+from agent.overlay import workspace_overlay
+
+
+class RunEventBusTest(unittest.IsolatedAsyncioTestCase):
+    async def test_events_from_worker_threads_reach_the_subscriber_loop(self):
+        bus = open_run_events("run-events")
+        received = asyncio.Queue()
+        bus.subscribe(received.put_nowait)
+        thread = threading.Thread(target=bus.publish, args=({"type": "file", "path": "app.js"},))
+        thread.start()
+        thread.join()
+        self.assertEqual(await asyncio.wait_for(received.get(), 1), {"type": "file", "path": "app.js"})
+
+        close_run_events("run-events")
+        self.assertIsNone(await asyncio.wait_for(received.get(), 1))
+        self.assertIsNone(get_run_events("run-events"))
+
+    async def test_unsubscribed_callbacks_get_nothing(self):
+        bus = open_run_events("run-events")
+        self.assertIs(get_run_events("run-events"), bus)
+        received = []
+        unsubscribe = bus.subscribe(received.append)
+        unsubscribe()
+        close_run_events("run-events")
+        await asyncio.sleep(0)
+        self.assertEqual(received, [])
+
+    def test_runs_without_a_stream_have_no_bus(self):
+        self.assertIsNone(get_run_events(None))
+        self.assertIsNone(get_run_events("never-streamed"))
+
+
+class OverlayFileEventsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.overlay = workspace_overlay(self.root)
+        self.received = asyncio.Queue()
+        open_run_events("run-files").subscribe(self.received.put_nowait)
+
+    async def asyncTearDown(self):
+        close_run_events("run-files")
+        self.tmp.cleanup()
+
+    async def _commit(self, files: dict[str, str]) -> list[dict]:
+        for rel, content in files.items():
+            self.overlay.write(rel, content, "step", "run-files")
+        await asyncio.to_thread(self.overlay.commit, "step", "run-files")
+        await asyncio.sleep(0)
+        events = []
+        while not self.received.empty():
+            events.append(self.received.get_nowait())
+        return events
+
+    async def test_committed_files_are_announced_with_their_content(self):
+        [created] = await self._commit({"app.js": "let a = 1;"})
+        self.assertEqual(created["type"], "file")
+        self.assertEqual(created["path"], "app.js")
+        self.assertEqual(created["content"], "let a = 1;")
+        self.assertIsNone(created["previous_hash"])
+        self.assertEqual(created["hash"], hashlib.sha256(b"let a = 1;").hexdigest())
+
+        [changed] = await self._commit({"app.js": "let a = 2;"})
+        self.assertEqual(changed["previous_hash"], created["hash"])
+
+        # Writing back what is already on disk is not a change
+        self.assertEqual(await self._commit({"app.js": "let a = 2;"}), [])
+
+    async def test_large_files_are_announced_without_content(self):
+        with mock.patch("agent.overlay.LIVE_CONTENT_MAX_BYTES", 4):
+            [event] = await self._commit({"app.js": "let a = 1;"})
+        self.assertNotIn("content", event)
+        self.assertEqual(event["size"], len("let a = 1;"))
+
+
+if __name__ == "__main__":
+    unittest.main()
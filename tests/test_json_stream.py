@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from agent.json_stream import ARRAY_ITEM, JSONStreamParser
+
+PLAN = {
+    "name": "Todo",
+    "implementation_steps": [
+        {"filepath": "index.html", "task_description": "Markup with a {placeholder} and \"quotes\""},
+        {"filepath": "app.js", "task_description": "Logic \\ escaped", "depends_on": ["index.html"]},
+    ],
+    "count": 2,
+}
+STEPS = ("implementation_steps", ARRAY_ITEM)
+
+
+def feed_in_chunks(parser: JSONStreamParser, text: str, size: int) -> list:
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+
+class JSONStreamParserTest(unittest.TestCase):
+    def test_watched_items_are_emitted_for_any_chunk_size(self):
+        text = json.dumps(PLAN)
+        for size in (1, 3, 7, len(text)):
+            with self.subTest(size=size):
+                parser = JSONStreamParser(watch=[STEPS])
+                events = feed_in_chunks(parser, text, size)
+                self.assertEqual(events, [(STEPS, step) for step in PLAN["implementation_steps"]])
+                self.assertTrue(parser.done)
+                self.assertEqual(parser.result(), PLAN)
+
+    def test_items_arrive_before_the_object_closes(self):
+        text = json.dumps(PLAN)
+        first_step_end = text.index("app.js") - len('{"filepath": "')
+        parser = JSONStreamParser(watch=[STEPS])
+        events = parser.feed(text[:first_step_end])
+        self.assertEqual([value for _, value in events], PLAN["implementation_steps"][:1])
+        self.assertFalse(parser.done)
+
+    def test_top_level_keys_and_scalars_can_be_watched(self):
+        parser = JSONStreamParser(watch=[("name",), ("count",)])
+        events = feed_in_chunks(parser, json.dumps(PLAN), 5)
+        self.assertEqual(events, [(("name",), "Todo"), (("count",), 2)])
+
+    def test_prose_and_fence_before_the_object_are_skipped(self):
+        text = "Here is the plan:\n```json\n" + json.dumps(PLAN) + "\n```\nLet me know!"
+        parser = JSONStreamParser(watch=[STEPS])
+        events = feed_in_chunks(parser, text, 4)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(parser.result(), PLAN)
+        self.assertEqual(parser.text, text)
+
+    def test_incomplete_stream_raises(self):
+        text = json.dumps(PLAN)
+        parser = JSONStreamParser(watch=[STEPS])
+        parser.feed(text[:-1])
+        self.assertFalse(parser.done)
+        with self.assertRaises(ValueError):
+            parser.result()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from agent.project_index import PROJECT_META, ProjectIndex
+
+
+class ProjectIndexRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.projects = self.tmp / "projects"
+        self.projects.mkdir()
+        self.index = ProjectIndex(self.tmp / "projects.sqlite3", self.projects)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _project(self, folder: str, files: dict[str, str]) -> pathlib.Path:
+        root = self.projects / folder
+        root.mkdir()
+        for rel, content in files.items():
+            (root / rel).write_text(content, encoding="utf-8")
+        (root / PROJECT_META).write_text(json.dumps({"name": folder, "status": "DONE"}), encoding="utf-8")
+        return root
+
+    def test_rebuild_reads_stat_only(self):
+        root = self._project("Todo_20260101_120000", {"index.html": "<p>", "app.js": "1;"})
+        self.assertEqual(self.index.rebuild(), 1)
+        items, _ = self.index.page()
+        self.assertEqual((items[0]["file_count"], items[0]["total_size"]), (2, 5))
+        self.assertEqual(sorted(p.name for p in root.iterdir()), [PROJECT_META, "app.js", "index.html"])
+
+    def test_empty_projects_folder_is_rebuilt_once(self):
+        self.assertTrue(self.index.ensure_built())
+        self._project("Todo_20260101_120000", {"index.html": "<p>"})
+        self.assertFalse(self.index.ensure_built())
+        self.assertTrue(ProjectIndex(self.index.path, self.projects).built)
+        self.assertEqual(self.index.count(), 0)
+
+    def test_deleted_folders_are_dropped(self):
+        self._project("Kept_20260101_120000", {"index.html": "<p>"})
+        gone = self._project("Gone_20260101_120000", {"index.html": "<p>"})
+        self.index.rebuild()
+        shutil.rmtree(gone)
+        items, _ = self.index.page()
+        self.assertEqual([item["folder"] for item in items], ["Kept_20260101_120000"])
+        self.assertEqual(self.index.count(), 1)
+
+
+
+class RunStatusTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.index = ProjectIndex(self.tmp / "projects.sqlite3", self.tmp)
+        self.root = self.tmp / "Todo_20260101_120000"
+        self.root.mkdir()
+        self.index.record_workspace(str(self.root), "Todo", "Create a ToDo App", "create-run")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _status(self) -> str:
+        return self.index.page()[0][0]["status"]
+
+    def test_cancelled_edit_restores_the_previous_status(self):
+        self.index.record_status(str(self.root), "DONE")
+        self.index.record_edit(str(self.root), "Add dark mode", "edit-run")
+        self.assertEqual(self._status(), "IN_PROGRESS")
+        self.assertFalse(self.index.record_cancelled(str(self.root), "edit-run"))
+        self.assertEqual(self._status(), "DONE")
+
+    def test_cancelled_create_run_is_partial(self):
+        self.assertTrue(self.index.record_cancelled(str(self.root), "create-run"))
+        self.assertEqual(self._status(), "CANCELLED")
+
+    def test_failed_edit_restores_and_failed_create_is_failed(self):
+        self.index.record_failure(str(self.root), "create-run")
+        self.assertEqual(self._status(), "FAILED")
+        self.index.record_edit(str(self.root), "Add dark mode", "edit-run")
+        self.index.record_failure(str(self.root), "edit-run")
+        self.assertEqual(self._status(), "FAILED")
+
+
+if __name__ == "__main__":
+    unittest.main()
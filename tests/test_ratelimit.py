@@ -0,0 +1,38 @@
+import asyncio
+import unittest
+
+from agent.ratelimit import AdaptiveConcurrency
+
+
+class AdaptiveConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiters_do_not_release_twice(self):
+        limiter = AdaptiveConcurrency(minimum=2, maximum=2, latency_factor=3.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        queued = [asyncio.create_task(limiter.acquire()) for _ in range(4)]
+        await asyncio.sleep(0)
+        for task in queued:
+            task.cancel()
+        # The slots come back before the cancelled callers get to run their cleanup
+        limiter.release()
+        limiter.release()
+        await asyncio.gather(*queued, return_exceptions=True)
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_slot_handed_to_cancelled_waiter_is_passed_on(self):
+        limiter = AdaptiveConcurrency(minimum=1, maximum=1, latency_factor=3.0)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()  # Hands the slot to `first`, which is cancelled before it wakes
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.wait_for(second, timeout=1)
+        self.assertEqual(limiter.in_flight, 1)
+        limiter.release()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
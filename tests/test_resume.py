@@ -0,0 +1,110 @@
+import asyncio
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import agent.graph as graph
+from agent.journal import StepJournal
+from agent.project_index import PARTIAL_MARKER
+from agent.states import CoderState, GraphState, ImplementationTask, Plan, TaskPlan
+
+RUN_ID = "resume-test"
+FILES = ["index.html", "style.css", "app.js", "README.md"]
+
+
+class _FakeCoder:
+    """Stands in for the ReAct coder: writes the step's file through the overlay, or hangs on `block`."""
+
+    def __init__(self, block: str | None = None):
+        self.block = block
+        self.started: list[str] = []
+
+    async def ainvoke(self, messages: dict, config: dict):
+        path = config["metadata"]["coder_file"]
+        self.started.append(path)
+        if path == self.block:
+            await asyncio.Event().wait()
+        configurable = config["configurable"]
+        configurable["overlay"].write(path, f"/* {path} */\n", configurable["step"], configurable["run_id"])
+
+
+class CoderResumeTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # Each step depends on the previous one, so they run in order
+        steps = [
+            ImplementationTask(filepath=path, task_description=f"Write {path}", depends_on=FILES[:i][-1:])
+            for i, path in enumerate(FILES)
+        ]
+        task_plan = TaskPlan(implementation_steps=steps)
+        self.state = GraphState(
+            user_prompt="A page",
+            plan=Plan(name="Page", description="A page", techstack="html", features=[], files=[]),
+            project_path=self.tmp.name,
+            task_plan=task_plan,
+            coder_state=CoderState(task_plan=task_plan),
+        )
+        self.config = {"configurable": {"thread_id": RUN_ID}}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def _run_coder(self, coder: _FakeCoder) -> dict:
+        with mock.patch.object(graph, "get_coder_agent", return_value=coder):
+            return await graph.coder_agent(self.state.model_copy(deep=True), self.config)
+
+    async def test_resume_after_cancel_runs_only_unfinished_steps(self):
+        k = 2
+        interrupted = _FakeCoder(block=FILES[k])
+        run = asyncio.create_task(self._run_coder(interrupted))
+        while len(interrupted.started) <= k:
+            await asyncio.sleep(0.01)
+        run.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await run
+        self.assertEqual(len(StepJournal.load(self.tmp.name, RUN_ID).done), k)
+
+        # The checkpoint still holds the coder state from before the interrupted node
+        resumed = _FakeCoder()
+        result = await self._run_coder(resumed)
+        self.assertEqual(resumed.started, FILES[k:])
+        self.assertEqual(sorted(result["coder_state"].completed_steps), list(range(len(FILES))))
+
+    async def test_journal_of_another_run_is_ignored(self):
+        await self._run_coder(_FakeCoder())
+        self.assertEqual(StepJournal.load(self.tmp.name, "another-run").done, set())
+
+
+
+class _Checkpointed:
+    def __init__(self, values: dict):
+        self.values = values
+
+    async def aget_state(self, config: dict):
+        return self
+
+
+class MarkCancelledTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.checkpointed = _Checkpointed({"project_path": self.tmp.name})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_cancelled_edit_is_not_flagged_partial(self):
+        with mock.patch.object(graph.project_index, "record_cancelled", return_value=False) as record:
+            await graph.mark_cancelled(self.checkpointed, {"configurable": {"thread_id": "edit-run"}}, "stopped")
+        record.assert_called_once_with(self.tmp.name, "edit-run")
+        self.assertFalse((self.root / PARTIAL_MARKER).exists())
+
+    async def test_cancelled_create_run_is_flagged_partial(self):
+        with mock.patch.object(graph.project_index, "record_cancelled", return_value=True):
+            await graph.mark_cancelled(self.checkpointed, {"configurable": {"thread_id": "create-run"}}, "stopped")
+        self.assertTrue((self.root / PARTIAL_MARKER).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
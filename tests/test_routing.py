@@ -0,0 +1,120 @@
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import agent.graph as graph
+import agent.routing as routing
+from agent.cache import LLMCache
+from agent.fake_llm import FakeChatModel
+from agent.routing import ROUTED_MODEL_KEY, ModelLatency, ModelRouter, parse_routes
+
+PLANNER_PROMPT = "You are ARCHITECT. Plan the steps."
+
+
+class _Unavailable(FakeChatModel):
+    """Fails every call, before any output."""
+
+    def _respond(self, messages):
+        raise ConnectionError("model is down")
+
+
+class _DropsMidStream(FakeChatModel):
+    """Fails after the first streamed chunk."""
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
+            raise ConnectionError("connection reset")
+
+
+def make_router(models: dict[str, FakeChatModel], routes: dict[str, list[str]], **kwargs) -> ModelRouter:
+    return ModelRouter(routes, build=lambda name: models[name], **kwargs)
+
+
+class ParseRoutesTest(unittest.TestCase):
+    def test_overrides_are_layered_and_end_with_the_default_model(self):
+        routes = parse_routes(" Planner = small|medium ; .CSS=small", {"default": ["large"], "architect": ["small"]})
+        self.assertEqual(routes["planner"], ["small", "medium", "large"])
+        self.assertEqual(routes[".css"], ["small", "large"])
+        self.assertEqual(routes["architect"], ["small", "large"])
+        self.assertEqual(routes["default"], ["large"])
+
+    def test_malformed_entries_are_rejected(self):
+        for spec in ("planner", "=small", "planner=|"):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                parse_routes(spec)
+
+
+class ModelRouterTest(unittest.TestCase):
+    def test_files_route_by_extension_and_clients_are_shared(self):
+        built = []
+        router = ModelRouter({".md": ["small", "large"], "default": ["large"]},
+                             build=lambda name: built.append(name) or FakeChatModel(model_name=name))
+        self.assertEqual(router.route_for_file("docs/README.MD"), ".md")
+        self.assertEqual(router.route_for_file("app.js"), "default")
+        self.assertEqual(router.primary("planner"), "large")
+        self.assertIs(router.model(".md"), router.model(".md"))
+        router.model("default")
+        self.assertEqual(built, ["small", "large"])
+
+
+class FallbackTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patch = mock.patch.object(routing, "model_latency", ModelLatency())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def test_failed_model_falls_back_to_the_next(self):
+        router = make_router({"small": _Unavailable(), "large": FakeChatModel()}, {"default": ["small", "large"]})
+        message = await router.model("architect").ainvoke(PLANNER_PROMPT)
+        self.assertIn("implementation_steps", message.content)
+
+    async def test_streamed_chunks_are_tagged_with_the_answering_model(self):
+        router = make_router({"small": _Unavailable(), "large": FakeChatModel(chunk_size=8)}, {"default": ["small", "large"]})
+        chunks = [chunk async for chunk in router.model("architect").astream(PLANNER_PROMPT)]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual({chunk.response_metadata[ROUTED_MODEL_KEY] for chunk in chunks}, {"large"})
+
+    async def test_no_fallback_once_output_was_streamed(self):
+        router = make_router({"small": _DropsMidStream(), "large": FakeChatModel()}, {"default": ["small", "large"]})
+        with self.assertRaises(ConnectionError):
+            async for _ in router.model("architect").astream(PLANNER_PROMPT):
+                pass
+
+    async def test_last_model_error_is_raised(self):
+        router = make_router({"small": _Unavailable(), "large": _Unavailable()}, {"default": ["small", "large"]})
+        with self.assertRaisesRegex(ConnectionError, "model is down"):
+            await router.model("architect").ainvoke(PLANNER_PROMPT)
+
+    def test_latency_aware_order_prefers_the_faster_model(self):
+        router = make_router({"small": FakeChatModel(), "large": FakeChatModel()}, {"default": ["small", "large"]},
+                             latency_aware=True)
+        model = router.model("architect")
+        self.assertEqual(model.order(), [0, 1])
+        routing.model_latency.record("small", 5.0)
+        routing.model_latency.record("large", 1.0)
+        self.assertEqual(model.order(), [1, 0])
+
+
+class FallbackCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LLMCache(pathlib.Path(self.tmp.name) / "cache.sqlite3")
+        router = make_router({"small": _Unavailable(), "large": FakeChatModel()}, {"default": ["small", "large"]})
+        for patch in (mock.patch.object(graph, "router", router), mock.patch.object(graph, "llm_cache", self.cache)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    async def test_fallback_answers_are_not_cached_under_the_primary_model(self):
+        completion = graph.Completion(PLANNER_PROMPT, "architect")
+        text = "".join([chunk async for chunk in completion.stream()])
+        self.assertIn("implementation_steps", text)
+        self.assertEqual(completion.answered_by, "large")
+        await completion.save()
+        self.assertIsNone(self.cache.get("small", PLANNER_PROMPT))
+
+
+if __name__ == "__main__":
+    unittest.main()
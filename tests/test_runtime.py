@@ -0,0 +1,64 @@
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+from agent.runtime import GraphRuntime
+
+FLAKY_GRAPH = '''
+import os
+
+if not os.path.exists(os.environ["FLAKY_GRAPH_OK"]):
+    raise RuntimeError("models not configured yet")
+
+
+class _Router:
+    routes = {"planner": "m", ".css": "m"}
+
+    def model(self, route):
+        return route
+
+
+router = _Router()
+
+
+def get_coder_agent(variant, route="default"):
+    return (variant, route)
+'''
+
+
+class GraphRuntimeWarmupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        folder = pathlib.Path(self.tmp.name)
+        (folder / "flaky_graph.py").write_text(FLAKY_GRAPH, encoding="utf-8")
+        self.ok_flag = folder / "ok"
+        os.environ["FLAKY_GRAPH_OK"] = str(self.ok_flag)
+        sys.path.insert(0, self.tmp.name)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp.name)
+        sys.modules.pop("flaky_graph", None)
+        self.tmp.cleanup()
+
+    def _warm(self, runtime: GraphRuntime, **kwargs):
+        runtime.start_warmup(**kwargs)
+        runtime._thread.join(timeout=10)
+
+    def test_failed_warmup_is_retried(self):
+        runtime = GraphRuntime("flaky_graph")
+        self._warm(runtime)
+        self.assertEqual(runtime.status()["status"], "error")
+
+        self.ok_flag.touch()
+        failed = runtime._thread
+        runtime.start_warmup()  # Within WARM_RETRY_S of the failure: not retried yet
+        self.assertIs(runtime._thread, failed)
+        self._warm(runtime, retry_now=True)
+        self.assertTrue(runtime.ready)
+        self.assertEqual(runtime.status()["error"], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import agent.graph as graph
+from agent.scheduler import _normalize, ready_steps, resolve_dependencies
+from agent.states import CoderState, ImplementationTask, TaskPlan
+
+
+def _task(filepath: str, depends_on: list[str] | None = None) -> ImplementationTask:
+    return ImplementationTask(filepath=filepath, task_description="", depends_on=depends_on)
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_keeps_leading_dots_of_file_names(self):
+        self.assertEqual(_normalize(".env"), ".env")
+        self.assertEqual(_normalize("../shared/app.js"), "../shared/app.js")
+
+    def test_drops_current_directory_prefixes(self):
+        self.assertEqual(_normalize("./index.html"), "index.html")
+        self.assertEqual(_normalize(" ././src/app.js "), "src/app.js")
+
+
+class ResolveDependenciesTest(unittest.TestCase):
+    def test_dot_file_does_not_match_its_undotted_name(self):
+        steps = [_task("env"), _task(".env"), _task("config.js", depends_on=[".env"])]
+        self.assertEqual(resolve_dependencies(steps), [set(), set(), {1}])
+
+    def test_styles_and_scripts_wait_for_markup_when_nothing_is_declared(self):
+        steps = [_task("index.html"), _task("README.md"), _task("style.css"), _task("app.js")]
+        self.assertEqual(resolve_dependencies(steps), [set(), set(), {0}, {0}])
+
+    def test_declared_dependencies_only_point_backwards(self):
+        steps = [_task("a.js", depends_on=["b.js"]), _task("b.js", depends_on=["./a.js"]), _task("c.js", depends_on=[])]
+        self.assertEqual(resolve_dependencies(steps), [set(), {0}, set()])
+
+    def test_repeated_steps_on_one_file_are_chained(self):
+        steps = [_task("app.js", depends_on=[]), _task("style.css", depends_on=[]), _task("app.js", depends_on=[])]
+        self.assertEqual(resolve_dependencies(steps), [set(), set(), {0}])
+
+
+class ReadyStepsTest(unittest.TestCase):
+    def test_steps_with_finished_dependencies_are_ready(self):
+        deps = [set(), {0}, {0}, {1, 2}]
+        self.assertEqual(ready_steps(deps, [], limit=3), [0])
+        self.assertEqual(ready_steps(deps, [0], limit=3), [1, 2])
+        self.assertEqual(ready_steps(deps, [0, 1, 2], limit=3), [3])
+        self.assertEqual(ready_steps(deps, [0], limit=1), [1])
+
+    def test_dependents_of_failed_steps_never_become_ready(self):
+        deps = [set(), {0}, set()]
+        self.assertEqual(ready_steps(deps, [], failed=[0], limit=3), [2])
+        self.assertEqual(ready_steps(deps, [2], failed=[0], limit=3), [])
+
+
+class CoderSchedulingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_each_step_starts_when_its_own_dependencies_finish(self):
+        delays = {"slow.js": 0.3, "a.js": 0.05, "b.js": 0.05, "c.js": 0.05}
+        started = {}
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+
+        async def fake_step(state, task, dependencies, run_id=None, journal=None):
+            started[task.filepath] = loop.time() - begin
+            await asyncio.sleep(delays[task.filepath])
+            return task.filepath != "c.js", 7
+
+        steps = [_task("slow.js", []), _task("a.js", []), _task("b.js", ["a.js"]), _task("c.js", ["b.js"])]
+        state = SimpleNamespace(coder_state=CoderState(task_plan=TaskPlan(implementation_steps=steps)),
+                                project_path=tempfile.gettempdir())
+        with mock.patch.object(graph, "_run_coder_step", fake_step), mock.patch.object(graph, "MAX_CODER_CONCURRENCY", 2):
+            result = await graph.coder_agent(state, {"configurable": {}})
+
+        # b.js and c.js run while slow.js is still going, instead of waiting for its level to finish
+        self.assertLess(started["c.js"], delays["slow.js"])
+        coder_state = result["coder_state"]
+        self.assertEqual(sorted(coder_state.completed_steps), [0, 1, 2])
+        self.assertEqual(coder_state.failed_steps, [3])
+        self.assertEqual(coder_state.context_tokens_saved["slow.js"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import json
+import pathlib
+import shutil
+import unittest
+import uuid
+
+from fastapi.testclient import TestClient
+
+import server
+
+
+class ProjectFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = f"Server_Test_{uuid.uuid4().hex[:8]}_20260101_000000"
+        self.root = pathlib.Path("projects") / self.folder
+        (self.root / "css").mkdir(parents=True)
+        (self.root / "index.html").write_text("<p>Hi</p>", encoding="utf-8")
+        (self.root / "css" / "style.css").write_text("p{}", encoding="utf-8")
+        (self.root / ".project.json").write_text(json.dumps({"prompt": "secret"}), encoding="utf-8")
+        self.client = TestClient(server.app)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_static_mount_hides_metadata(self):
+        base = f"/projects/{self.folder}"
+        self.assertEqual(self.client.get(f"{base}/index.html").status_code, 200)
+        self.assertEqual(self.client.get(f"{base}/css/style.css").status_code, 200)
+        for path in (".project.json", "css/../.project.json", "%2Eproject.json"):
+            self.assertEqual(self.client.get(f"{base}/{path}").status_code, 404, path)
+
+    def test_manifest_revalidates_with_weak_and_listed_etags(self):
+        url = f"/projects/{self.folder}/manifest"
+        etag = self.client.get(url).headers["etag"]
+        for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            self.assertEqual(self.client.get(url, headers={"If-None-Match": header}).status_code, 304, header)
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import agent.graph as graph
+from agent.cache import LLMCache
+from agent.fake_llm import FakeChatModel
+from agent.routing import ModelRouter
+from agent.similarity import PLAN_FILENAME, PLAN_HINT_THRESHOLD, PLAN_REUSE_THRESHOLD, PlanIndex, tokenize
+from agent.states import GraphState
+
+TODO_PLAN = {
+    "name": "Todo List",
+    "description": "A todo list",
+    "techstack": "HTML, CSS, JavaScript",
+    "features": ["Add tasks", "Mark tasks done"],
+    "files": [{"path": "index.html", "purpose": "Markup"}],
+}
+TODO_TASK_PLAN = {"implementation_steps": [{"filepath": "index.html", "task_description": "Markup", "depends_on": []}]}
+
+
+class PlanIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.projects = self.tmp / "projects"
+        self.projects.mkdir()
+        self.index = PlanIndex(str(self.tmp / "plans.sqlite3"), self.projects)
+        for folder, prompt in (
+            ("Todo_1", "Create a todo list app with due dates"),
+            ("Calculator_1", "Build a scientific calculator"),
+            ("Weather_1", "Make a weather dashboard using a public API"),
+        ):
+            (self.projects / folder).mkdir()
+            self.index.add(str(self.projects / folder), prompt, {**TODO_PLAN, "name": folder}, TODO_TASK_PLAN)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_boilerplate_words_are_ignored(self):
+        self.assertEqual(tokenize("Please build a simple Todo app using HTML"), ["todo"])
+        self.assertEqual(tokenize("todo lists"), ["todo", "list", "todo_list"])
+
+    def test_near_duplicate_prompt_is_reused(self):
+        match = self.index.best_match("Please build me a Todo List application with due dates")
+        self.assertEqual(match.folder, "Todo_1")
+        self.assertGreaterEqual(match.score, PLAN_REUSE_THRESHOLD)
+        self.assertEqual(match.plan["name"], "Todo_1")
+        self.assertEqual(match.task_plan, TODO_TASK_PLAN)
+
+    def test_related_prompt_is_only_a_hint(self):
+        match = self.index.best_match("A todo list with due reminders")
+        self.assertEqual(match.folder, "Todo_1")
+        self.assertGreaterEqual(match.score, PLAN_HINT_THRESHOLD)
+        self.assertLess(match.score, PLAN_REUSE_THRESHOLD)
+
+    def test_unrelated_prompt_has_no_match(self):
+        self.assertIsNone(self.index.best_match("A memory card matching game"))
+        self.assertEqual(self.index.search("Create a simple app"), [])
+
+    def test_index_is_rebuilt_from_the_project_folders(self):
+        record = json.loads((self.projects / "Todo_1" / PLAN_FILENAME).read_text(encoding="utf-8"))
+        self.assertEqual(record["prompt"], "Create a todo list app with due dates")
+        rebuilt = PlanIndex(str(self.tmp / "rebuilt.sqlite3"), self.projects)
+        self.assertEqual(rebuilt.rebuild(), 3)
+        self.assertEqual(rebuilt.search("scientific calculator", limit=1)[0][0], "Calculator_1")
+
+
+class PlannerReuseTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.index = PlanIndex(str(self.tmp / "plans.sqlite3"), self.tmp)
+        (self.tmp / "Todo_1").mkdir()
+        self.index.add(str(self.tmp / "Todo_1"), "Create a todo list app with due dates", TODO_PLAN, TODO_TASK_PLAN)
+        self.model = FakeChatModel()
+        self.prompts = []
+        respond = FakeChatModel._respond
+
+        def recording_respond(model, messages):
+            self.prompts.append(messages[-1].content)
+            return respond(model, messages)
+
+        workspaces = iter(range(100))
+        patches = [
+            mock.patch.object(graph, "plan_index", self.index),
+            mock.patch.object(graph, "router", ModelRouter({"default": ["fake"]}, build=lambda name: self.model)),
+            mock.patch.object(graph, "llm_cache", LLMCache(self.tmp / "cache.sqlite3", mode="off")),
+            mock.patch.object(graph, "_claim_workspace", lambda name: self.tmp / f"workspace_{next(workspaces)}"),
+            mock.patch.object(FakeChatModel, "_respond", recording_respond),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    async def test_near_duplicate_reuses_the_plan_without_calling_the_model(self):
+        result = await graph.planner_agent(GraphState(user_prompt="Build a todo list app with due dates"))
+        self.assertEqual(result["plan"].name, "Todo List")
+        self.assertEqual(result["plan_source"], "Todo_1")
+        self.assertEqual(self.prompts, [])
+
+    async def test_related_prompt_passes_the_plan_as_an_example(self):
+        result = await graph.planner_agent(GraphState(user_prompt="A todo list with due reminders"))
+        self.assertNotIn("plan_source", result)
+        [prompt] = self.prompts
+        self.assertIn('"name":"Todo List"', prompt)
+
+    async def test_unrelated_prompt_is_planned_from_scratch(self):
+        result = await graph.planner_agent(GraphState(user_prompt="A memory card matching game"))
+        self.assertNotIn("plan_source", result)
+        [prompt] = self.prompts
+        self.assertNotIn("Todo List", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
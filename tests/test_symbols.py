@@ -0,0 +1,158 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+from agent.storage import RootCache
+from agent.symbols import INDEX_FILENAME, SymbolIndex, parse_symbols
+
+MARKUP = """<link rel="stylesheet" href="style.css">
+<a href="https://example.com">x</a> <a href="#top">top</a>
+<div id="app" class="card  wide"><button id='start' class=primary>Go</button></div>
+<script src="app.js"></script>"""
+STYLE = """/* .commented-out {} */
+#app .card > .title, button.primary:hover { color: red; }
+a[href$=".pdf"] { }
+@media (max-width: 600px) { .wide { width: 100%; } }"""
+SCRIPT = """const app = document.getElementById('app');
+document.querySelectorAll('.card .title').forEach(render);
+export function render(el) { el.classList.add('active', "done"); }
+const reset = () => { item.className = 'row'; item.id = `row-${n}`; };
+node.setAttribute('id', 'toast');
+export { reset as clear };"""
+
+
+class ParseSymbolsTest(unittest.TestCase):
+    def test_markup(self):
+        symbols = parse_symbols("index.html", MARKUP)
+        self.assertEqual(symbols["kind"], "markup")
+        self.assertEqual(symbols["ids"], ["app", "start"])
+        self.assertEqual(symbols["classes"], ["card", "primary", "wide"])
+        # External links and in-page anchors are not project files
+        self.assertEqual(symbols["references"], ["app.js", "style.css"])
+
+    def test_style(self):
+        symbols = parse_symbols("style.css", STYLE)
+        self.assertEqual(symbols["kind"], "style")
+        self.assertEqual(symbols["ids"], ["app"])
+        self.assertEqual(symbols["classes"], ["card", "primary", "title", "wide"])
+
+    def test_script(self):
+        symbols = parse_symbols("app.js", SCRIPT)
+        self.assertEqual(symbols["kind"], "script")
+        self.assertEqual(symbols["ids_used"], ["app"])
+        self.assertEqual(symbols["classes_used"], ["card", "title"])
+        self.assertEqual(symbols["ids_created"], ["toast"])
+        self.assertEqual(symbols["classes_created"], ["active", "done", "row"])
+        self.assertEqual(symbols["functions"], ["render", "reset"])
+        self.assertEqual(symbols["exports"], ["clear", "render"])
+
+    def test_other_files_are_not_indexed(self):
+        self.assertIsNone(parse_symbols("README.md", "# Title"))
+
+
+class SymbolIndexContextTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        for rel, content in (("index.html", MARKUP), ("style.css", STYLE), ("app.js", SCRIPT)):
+            (self.root / rel).write_text(content, encoding="utf-8")
+        self.index = SymbolIndex(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_defined_selectors_include_script_created_ones(self):
+        self.assertEqual(self.index.defined_ids(), {"app", "start", "toast"})
+        self.assertEqual(self.index.defined_classes(), {"active", "card", "done", "primary", "row", "wide"})
+
+    def test_outline(self):
+        self.assertEqual(self.index.outline("index.html"), "index.html: ids [app, start]; classes [card, primary, wide]")
+        self.assertIsNone(self.index.outline("missing.js"))
+
+    def test_context_block_describes_the_other_files(self):
+        block = self.index.context_block("app.js")
+        self.assertIn("index.html: ids [app, start]", block)
+        self.assertIn("style.css: styles ids [app]", block)
+        self.assertNotIn("app.js:", block)
+        self.index.update("index.html", "<p>plain</p>")
+        self.assertNotIn("index.html", self.index.context_block("app.js"))
+
+    def test_index_is_updated_one_file_at_a_time(self):
+        self.index.update("app.js", "function only() {}")
+        self.assertEqual(self.index.files["app.js"]["functions"], ["only"])
+        reloaded = json.loads((self.root / INDEX_FILENAME).read_text())["files"]
+        self.assertEqual(reloaded["app.js"]["functions"], ["only"])
+
+
+class SymbolIndexLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self._write("index.html", '<div id="app"></div>')
+        self._write("app.js", "function start() {}")
+        SymbolIndex(self.root)  # Writes .symbols.json
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, rel: str, content: str):
+        path = self.root / rel
+        path.write_text(content, encoding="utf-8")
+        # A later write within the same mtime tick must still look changed
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+
+    def test_changes_made_outside_the_tools_are_picked_up_on_load(self):
+        self._write("index.html", '<div id="main"></div>')
+        (self.root / "app.js").unlink()
+        self._write("extra.css", ".card {}")
+        index = SymbolIndex(self.root)
+        self.assertEqual(index.files["index.html"]["ids"], ["main"])
+        self.assertNotIn("app.js", index.files)
+        self.assertEqual(index.files["extra.css"]["classes"], ["card"])
+        self.assertEqual(sorted(json.loads((self.root / INDEX_FILENAME).read_text())["files"]), ["extra.css", "index.html"])
+
+    def test_unreadable_index_is_rebuilt(self):
+        read_text = pathlib.Path.read_text
+
+        def failing_read(path, *args, **kwargs):
+            if path.name == INDEX_FILENAME:
+                raise PermissionError(13, "Permission denied", str(path))
+            return read_text(path, *args, **kwargs)
+
+        with mock.patch.object(pathlib.Path, "read_text", failing_read):
+            index = SymbolIndex(self.root)
+        self.assertEqual(sorted(index.files), ["app.js", "index.html"])
+
+
+class RootCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+        self.cache = RootCache(self._create, max_size=2)
+
+    def _create(self, root: pathlib.Path):
+        self.created.append(root.name)
+        return object()
+
+    def test_evicts_least_recently_used(self):
+        a = self.cache.get("/tmp/a")
+        self.cache.get("/tmp/b")
+        self.assertIs(self.cache.get("/tmp/a"), a)  # Hit moves a to the end
+        self.cache.get("/tmp/c")  # Evicts b
+        self.assertIs(self.cache.get("/tmp/a"), a)
+        self.cache.get("/tmp/b")
+        self.assertEqual(self.created, ["a", "b", "c", "b"])
+
+    def test_pinned_instances_are_not_evicted(self):
+        with self.cache.pinned("/tmp/a") as a:
+            self.cache.get("/tmp/b")
+            self.cache.get("/tmp/c")
+            self.cache.get("/tmp/d")
+            self.assertIs(self.cache.get("/tmp/a"), a)
+        self.assertEqual(self.created.count("a"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
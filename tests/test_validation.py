@@ -0,0 +1,121 @@
+import pathlib
+import tempfile
+import unittest
+
+from agent.symbols import parse_symbols
+from agent.states import ValidationReport
+from agent.validation import _scan_js, check_script_syntax, validate_project
+
+APP_JSX = """export default function App() {
+  return (<div className="card active">Hello</div>);
+}
+"""
+
+
+class ScriptSyntaxTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path: str, content: str):
+        (self.root / path).write_text(content, encoding="utf-8")
+
+    def test_jsx_is_not_read_as_a_regular_expression(self):
+        self._write("App.jsx", APP_JSX)
+        self.assertIsNone(check_script_syntax(self.root, "App.jsx"))
+
+    def test_unbalanced_script_is_reported(self):
+        self._write("broken.ts", "function f() {\n  return [1, 2;\n}\n")
+        self.assertIsNotNone(check_script_syntax(self.root, "broken.ts"))
+
+    def test_react_class_selectors_are_defined(self):
+        self._write("index.html", '<div id="root"></div><script type="module" src="main.jsx"></script>')
+        self._write("App.jsx", APP_JSX)
+        self._write("main.jsx", "document.querySelector('.card').focus();\n"
+                                "document.getElementById('root');\n")
+        report = validate_project(str(self.root))
+        self.assertTrue(report.ok, report.errors)
+
+
+class ClassNameSymbolsTest(unittest.TestCase):
+    def test_class_name_attributes_create_classes(self):
+        symbols = parse_symbols("App.jsx", APP_JSX + '<p className={styles.note}></p>\n')
+        self.assertEqual(symbols["classes_created"], ["active", "card"])
+
+
+
+class ValidateProjectTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self._write("index.html", '<link rel="stylesheet" href="style.css">\n'
+                                  '<div id="app" class="card"></div>\n<script src="app.js"></script>')
+        self._write("style.css", ".card { color: red; }")
+        self._write("app.js", "document.getElementById('app').classList.add('ready');\n"
+                              "document.querySelector('.ready');\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path: str, content: str):
+        (self.root / path).write_text(content, encoding="utf-8")
+
+    def test_consistent_project_passes(self):
+        report = validate_project(str(self.root))
+        self.assertTrue(report.ok, report.errors)
+
+    def test_selectors_nothing_defines_are_reported(self):
+        self._write("app.js", "document.getElementById('missing');\ndocument.querySelector('.ghost');\n")
+        report = validate_project(str(self.root))
+        self.assertEqual(report.errors["app.js"], [
+            "selects id '#missing' but no HTML element or script defines it",
+            "selects class '.ghost' but no HTML element or script defines it",
+        ])
+        self.assertEqual(report.related["app.js"], ["index.html"])
+
+    def test_missing_references_and_unloaded_files_are_reported(self):
+        self._write("index.html", '<div id="app" class="card"></div><script src="main.js"></script>')
+        self._write("extra.js", "import { x } from './lib.js';\n")
+        report = validate_project(str(self.root))
+        self.assertIn("references 'main.js' but main.js does not exist", report.errors["index.html"])
+        self.assertIn('never loads style.css; add <link rel="stylesheet" href="style.css">', report.errors["index.html"])
+        self.assertIn('never loads app.js; add <script src="app.js"></script>', report.errors["index.html"])
+        self.assertEqual(report.errors["extra.js"], ["imports './lib.js' but lib.js does not exist"])
+
+    def test_invalid_json_and_scripts_are_reported(self):
+        self._write("data.json", '{"items": [1, 2,]}')
+        self._write("index.html", '<div id="app" class="card"></div><link rel="stylesheet" href="style.css">'
+                                  '<script src="app.js"></script><script src="bad.js"></script>')
+        self._write("bad.js", "function f() {\n  return (1;\n}\n")
+        report = validate_project(str(self.root))
+        self.assertTrue(report.errors["data.json"][0].startswith("is not valid JSON"))
+        self.assertTrue(report.errors["bad.js"][0].startswith("does not parse: line "))
+        self.assertEqual(sorted(report.errors), ["bad.js", "data.json"])
+
+    def test_problems_already_in_the_baseline_are_dropped(self):
+        baseline = ValidationReport()
+        baseline.add("app.js", "selects id '#old' but no HTML element or script defines it", ["index.html"])
+        self._write("app.js", "document.getElementById('old');\ndocument.getElementById('new');\n")
+        report = validate_project(str(self.root)).without(baseline)
+        self.assertEqual(report.errors, {"app.js": ["selects id '#new' but no HTML element or script defines it"]})
+        self.assertEqual(report.related, {"app.js": ["index.html"]})
+
+
+class ScanJsTest(unittest.TestCase):
+    def test_balanced_code_passes(self):
+        code = ("const re = /[(]\\)/g;\n// ) in a comment\n/* ] */\n"
+                "const s = `${items.map(i => `<li>${i}</li>`).join('')}`;\n"
+                "if (a) { return '}'; }\n")
+        self.assertIsNone(_scan_js(code))
+
+    def test_unclosed_and_mismatched_brackets_are_located(self):
+        self.assertEqual(_scan_js("function f() {\n  return 1;\n"), "line 1: '{' is never closed")
+        self.assertIsNotNone(_scan_js("const a = [1, 2);\n"))
+        self.assertIsNotNone(_scan_js("const s = 'unterminated;\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
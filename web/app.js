@@ -1,6 +1,37 @@
-document.addEventListener('DOMContentLoaded', loadHistory);
+document.addEventListener('DOMContentLoaded', () => loadHistory());
 
 let currentProjectFolder = null;
+// The generation being streamed: its run id and the controller that closes the stream
+let activeRun = null;
+// Folder the next prompt changes instead of building a new project
+let editFolder = null;
+
+function startEditing() {
+    if (!currentProjectFolder) return;
+    editFolder = currentProjectFolder;
+    document.getElementById('editTargetName').textContent = document.getElementById('liveProjectName').textContent;
+    document.getElementById('editTarget').classList.remove('hidden');
+    const promptInput = document.getElementById('promptInput');
+    promptInput.placeholder = "Describe the change (e.g., 'make the buttons blue')...";
+    promptInput.focus();
+}
+
+function stopEditing() {
+    editFolder = null;
+    document.getElementById('editTarget').classList.add('hidden');
+    document.getElementById('promptInput').placeholder = "Describe your app (e.g., 'create a modern todo app using HTML, CSS and JavaScript')...";
+}
+
+async function cancelGeneration() {
+    if (!activeRun) return;
+    const { runId, controller } = activeRun;
+    if (runId) {
+        await fetch(`/cancel/${runId}`, { method: 'POST' }).catch(() => {});
+    } else {
+        // No event yet; closing the stream makes the server cancel the run
+        controller.abort();
+    }
+}
 
 async function generateProject() {
     const promptInput = document.getElementById('promptInput');
@@ -15,32 +46,47 @@ async function generateProject() {
     if (!prompt) return alert("Please enter a description");
 
     generateBtn.disabled = true;
+    activeRun = { runId: null, controller: new AbortController() };
     statusContainer.classList.remove('hidden');
     document.getElementById('liveProjectArea').classList.add('hidden');
     progressBar.style.width = '5%';
 
     try {
-        const response = await fetch('/generate-stream', {
+        const url = editFolder ? `/projects/${encodeURIComponent(editFolder)}/edit` : '/generate-stream';
+        const response = await fetch(url, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ prompt: prompt })
+            body: JSON.stringify({ prompt: prompt }),
+            signal: activeRun.controller.signal
         });
 
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
+        // File events carry whole files, so a line can span several chunks
+        let buffered = '';
+        let plannedName = null;
+        let liveFolder = null;
 
         while (true) {
             const { done, value } = await reader.read();
             if (done) break;
 
-            const chunk = decoder.decode(value, { stream: true });
-            const lines = chunk.split('\n');
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
 
             for (const line of lines) {
                 if (!line.trim()) continue;
 
                 try {
                     const data = JSON.parse(line);
+                    if (data.run_id) activeRun.runId = data.run_id;
+
+                    if (data.phase === 'file') {
+                        statusDetails.textContent = `Wrote ${data.path}`;
+                        if (liveFolder) applyFileEvent(liveFolder, data);
+                        continue;
+                    }
 
                     if (data.phase !== 'error') {
                         statusPhase.textContent = data.message;
@@ -50,6 +96,17 @@ async function generateProject() {
                     switch (data.phase) {
                         case 'planning':
                             progressBar.style.width = '25%';
+                            plannedName = data.details.replace(/^Planned: /, '');
+                            break;
+                        case 'workspace':
+                            // Show the project while it is being written; file events fill it in
+                            liveFolder = data.project_folder;
+                            activateProject({ name: plannedName || liveFolder, folder: liveFolder });
+                            break;
+                        case 'change_plan':
+                            progressBar.style.width = '50%';
+                            liveFolder = data.project_folder;
+                            activateProject({ name: data.project_name, folder: liveFolder });
                             break;
                         case 'architect':
                             progressBar.style.width = '50%';
@@ -57,10 +114,18 @@ async function generateProject() {
                         case 'coding':
                             progressBar.style.width = '75%';
                             break;
+                        case 'validating':
+                        case 'repairing':
+                            progressBar.style.width = '90%';
+                            break;
                         case 'complete':
                             progressBar.style.width = '100%';
                             await handleGenerationComplete(data);
                             break;
+                        case 'cancelled':
+                            progressBar.style.width = '0%';
+                            await loadHistory();
+                            break;
                         case 'error':
                             alert("Error: " + data.message);
                             break;
@@ -73,8 +138,9 @@ async function generateProject() {
 
     } catch (error) {
         console.error(error);
-        statusPhase.textContent = "Connection Error";
+        statusPhase.textContent = error.name === 'AbortError' ? "Generation cancelled." : "Connection Error";
     } finally {
+        activeRun = null;
         generateBtn.disabled = false;
         setTimeout(() => {
             statusContainer.classList.add('hidden');
@@ -102,36 +168,97 @@ function refreshPreview() {
     frame.src = `/projects/${currentProjectFolder}/index.html?t=${new Date().getTime()}`;
 }
 
+function downloadProject() {
+    if (!currentProjectFolder) return;
+    window.location.href = `/projects/${encodeURIComponent(currentProjectFolder)}/archive?format=zip`;
+}
+
+// File contents by "folder/path", reused while the manifest reports the same hash
+const fileCache = new Map();
+
+async function loadFileContent(folder, file) {
+    const key = `${folder}/${file.path}`;
+    const cached = fileCache.get(key);
+    if (cached && cached.hash === file.hash) return cached.content;
+
+    // Each segment is encoded on its own so names with '#', '?' or '%' reach the server intact
+    const path = file.path.split('/').map(encodeURIComponent).join('/');
+    const res = await fetch(`/projects/${encodeURIComponent(folder)}/files/${path}`);
+    const content = await res.text();
+    fileCache.set(key, { hash: file.hash, content });
+    return content;
+}
+
+// Files of the open project (manifest entries) and the tab being shown
+let currentFiles = [];
+let activeFilePath = null;
+let previewTimer = null;
+
+function isViewable(file) {
+    return !['png', 'jpg', 'jpeg', 'ico'].includes(file.language);
+}
+
 async function loadProjectFiles(folder) {
-    const res = await fetch(`/project-files?folder=${folder}`);
-    const files = await res.json();
+    const res = await fetch(`/projects/${encodeURIComponent(folder)}/manifest`);
+    const manifest = await res.json();
+    currentFiles = manifest.files.filter(isViewable);
+    activeFilePath = null;
+    await renderFileTabs(folder);
+}
 
+async function renderFileTabs(folder) {
     const tabsContainer = document.getElementById('codeTabs');
     const codeContent = document.getElementById('codeContent');
 
     tabsContainer.innerHTML = '';
 
-    if (files.length === 0) {
+    if (currentFiles.length === 0) {
         codeContent.textContent = "// No readable files found.";
         return;
     }
 
     const priority = { 'html': 1, 'css': 2, 'js': 3 };
-    files.sort((a, b) => (priority[a.language] || 99) - (priority[b.language] || 99));
+    currentFiles.sort((a, b) => (priority[a.language] || 99) - (priority[b.language] || 99));
+    const active = currentFiles.find(f => f.path === activeFilePath) || currentFiles[0];
+    activeFilePath = active.path;
 
-    files.forEach((file, index) => {
+    // Contents are fetched when a tab is opened, and only if the file changed since last time
+    const showFile = async (file) => {
+        codeContent.textContent = await loadFileContent(folder, file);
+    };
+
+    currentFiles.forEach(file => {
         const tab = document.createElement('button');
-        tab.className = `tab-btn ${index === 0 ? 'active' : ''}`;
-        tab.textContent = file.name;
+        tab.className = `tab-btn ${file === active ? 'active' : ''}`;
+        tab.textContent = file.path.split('/').pop();
+        tab.title = file.path;
         tab.onclick = () => {
             document.querySelectorAll('.tab-btn').forEach(b => b.classList.remove('active'));
             tab.classList.add('active');
-            codeContent.textContent = file.content;
+            activeFilePath = file.path;
+            showFile(file);
         };
         tabsContainer.appendChild(tab);
     });
 
-    codeContent.textContent = files[0].content;
+    await showFile(active);
+}
+
+function applyFileEvent(folder, event) {
+    const file = { path: event.path, size: event.size, mtime: event.mtime, hash: event.hash, language: event.language };
+    if (event.content !== undefined) {
+        fileCache.set(`${folder}/${file.path}`, { hash: file.hash, content: event.content });
+    }
+    if (folder !== currentProjectFolder || !isViewable(file)) return;
+
+    const index = currentFiles.findIndex(f => f.path === file.path);
+    if (index >= 0) currentFiles[index] = file;
+    else currentFiles.push(file);
+    renderFileTabs(folder);
+
+    // Several files often land together; reload the preview once they have
+    clearTimeout(previewTimer);
+    previewTimer = setTimeout(refreshPreview, 300);
 }
 
 function switchView(view) {
@@ -159,67 +286,84 @@ function closeProject() {
 
     document.getElementById('previewFrame').src = '';
     currentProjectFolder = null;
+    stopEditing();
 }
 
-async function loadHistory() {
+const HISTORY_PAGE_SIZE = 24;
+
+async function loadHistory(cursor = null) {
     const container = document.getElementById('projectCards');
     try {
-        const res = await fetch('/history');
-        const projects = await res.json();
-
-        container.innerHTML = '';
-        if (!projects || projects.length === 0) {
+        const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE });
+        if (cursor) params.set('cursor', cursor);
+        const res = await fetch(`/history?${params}`);
+        const page = await res.json();
+        const projects = page.items;
+
+        if (!cursor) container.innerHTML = '';
+        container.querySelector('.load-more-btn')?.remove();
+        if (!cursor && (!projects || projects.length === 0)) {
             container.innerHTML = '<p class="empty-msg">No projects yet.</p>';
             return;
         }
 
-        projects.forEach(proj => {
-            const card = document.createElement('div');
-            card.className = 'project-card';
-            const dateStr = new Date(proj.created * 1000).toLocaleDateString();
-            const projectUrl = `/projects/${proj.folder}/index.html`;
+        projects.forEach(proj => container.appendChild(renderProjectCard(proj)));
 
-            card.innerHTML = `
-                <div class="card-preview">
-                    <iframe src="${projectUrl}" class="thumbnail-frame" loading="lazy" scrolling="no"></iframe>
-                    <div class="card-overlay"></div>
-                </div>
-                <div class="card-info">
-                    <div class="card-title">${proj.name}</div>
-
-                    <div class="card-footer">
-                        <div class="card-date">${dateStr}</div>
-                        <div class="card-actions">
-                            <button class="mini-btn btn-load" title="Edit / Preview">
-                                <i class="fa-solid fa-pen-to-square"></i>
-                            </button>
-
-                            <a href="${projectUrl}" target="_blank" class="mini-btn btn-newtab" title="Open in New Tab">
-                                <i class="fa-solid fa-external-link-alt"></i>
-                            </a>
-                        </div>
-                    </div>
+        if (page.next_cursor) {
+            const more = document.createElement('button');
+            more.className = 'load-more-btn';
+            more.textContent = 'Load more';
+            more.onclick = () => loadHistory(page.next_cursor);
+            container.appendChild(more);
+        }
+    } catch (e) {
+        console.error("Failed history", e);
+    }
+}
+
+function renderProjectCard(proj) {
+    const card = document.createElement('div');
+    card.className = 'project-card';
+    const dateStr = new Date(proj.created * 1000).toLocaleDateString();
+    const projectUrl = `/projects/${proj.folder}/index.html`;
+
+    card.innerHTML = `
+        <div class="card-preview">
+            <iframe src="${projectUrl}" class="thumbnail-frame" loading="lazy" scrolling="no"></iframe>
+            <div class="card-overlay"></div>
+        </div>
+        <div class="card-info">
+            <div class="card-title">${proj.name}${proj.partial ? '<span class="partial-badge" title="Generation was cancelled; resume the run to finish it">partial</span>' : ''}</div>
+
+            <div class="card-footer">
+                <div class="card-date">${dateStr}</div>
+                <div class="card-actions">
+                    <button class="mini-btn btn-load" title="Edit / Preview">
+                        <i class="fa-solid fa-pen-to-square"></i>
+                    </button>
+
+                    <a href="${projectUrl}" target="_blank" class="mini-btn btn-newtab" title="Open in New Tab">
+                        <i class="fa-solid fa-external-link-alt"></i>
+                    </a>
                 </div>
-            `;
+            </div>
+        </div>
+    `;
 
-            card.onclick = () => activateProject(proj);
+    card.onclick = () => activateProject(proj);
 
-            const loadBtn = card.querySelector('.btn-load');
-            loadBtn.onclick = (e) => {
-                e.stopPropagation();
-                activateProject(proj);
-            };
+    const loadBtn = card.querySelector('.btn-load');
+    loadBtn.onclick = (e) => {
+        e.stopPropagation();
+        activateProject(proj);
+    };
 
-            const newTabBtn = card.querySelector('.btn-newtab');
-            newTabBtn.onclick = (e) => {
-                e.stopPropagation();
-            };
+    const newTabBtn = card.querySelector('.btn-newtab');
+    newTabBtn.onclick = (e) => {
+        e.stopPropagation();
+    };
 
-            container.appendChild(card);
-        });
-    } catch (e) {
-        console.error("Failed history", e);
-    }
+    return card;
 }
 
 function activateProject(proj) {